@@ -0,0 +1,200 @@
+import asyncio
+import itertools
+from collections import Counter
+from contextlib import asynccontextmanager
+
+
+# Quality tiers, from most to least expensive
+QUALITY_TIERS = {
+    'full': {
+        'summarizer': 'abstractive',
+        'translate': True,
+        'defer_audio': False,
+        'max_articles': None
+    },
+    'reduced': {
+        'summarizer': 'extractive',
+        'translate': False,
+        'defer_audio': False,
+        'max_articles': None
+    },
+    'minimal': {
+        'summarizer': 'extractive',
+        'translate': False,
+        'defer_audio': True,
+        'max_articles': 5
+    }
+}
+
+
+class Overloaded(Exception):
+    """Raised when a request is rejected because the server is past its hard limit."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Server overloaded, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Class for admitting requests and choosing a quality tier from the current load.
+
+    Model slots are handed out by weighted fair queuing. Each request is
+    tagged with a virtual finish time, its tenant's previous finish time (or
+    the current virtual time, if later) plus its cost divided by the
+    tenant's weight. A free slot goes to the waiting request with the
+    earliest tag whose tenant is under its concurrency cap. A tenant with a
+    backlog of large requests therefore can't starve one sending small
+    ones, and tenants share capacity in proportion to their weights.
+
+    The tier and rejection thresholds apply to each tenant's own load,
+    scaled by its share of the weight of the tenants with requests in the
+    system. A tenant with a deep backlog is degraded and rejected without
+    affecting the others, which its backlog doesn't delay.
+    """
+
+    def __init__(self, max_in_flight=2, reduced_at=2, minimal_at=4, reject_at=8, retry_after=30):
+        """
+        Args:
+            max_in_flight (int): Number of requests allowed to run model work at once
+            reduced_at (int): Load (queued + in-flight) at which the reduced tier is used, for a tenant
+                with the whole capacity; a tenant with a smaller share reaches it proportionally sooner
+            minimal_at (int): Load at which the minimal tier is used
+            reject_at (int): Load at which new requests are rejected
+            retry_after (int): Seconds clients are told to wait when rejected
+        """
+        self.max_in_flight = max_in_flight
+        self.reduced_at = reduced_at
+        self.minimal_at = minimal_at
+        self.reject_at = reject_at
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.queued = 0
+        self.tenant_in_flight = Counter()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._weights = {}
+
+    @property
+    def load(self):
+        """Number of requests either waiting for or holding a model slot."""
+        return self.in_flight + self.queued
+
+    def tenant_load(self, tenant):
+        """Number of the tenant's requests either waiting for or holding a model slot."""
+        return self.tenant_in_flight[tenant] + sum(1 for waiter in self._waiters if waiter['tenant'] == tenant)
+
+    def share(self, tenant, weight=1.0):
+        """Fraction of model capacity the tenant gets, among the tenants with requests in the system."""
+        active = {waiter['tenant'] for waiter in self._waiters} | set(self.tenant_in_flight) | {tenant}
+        total = sum(weight if name == tenant else self._weights.get(name, 1.0) for name in active)
+        return weight / total
+
+    def choose_tier(self, tenant='', weight=1.0):
+        """
+        Pick the quality tier for a tenant's new request from its load and share of capacity.
+
+        Args:
+            tenant (str): Name of the tenant the request belongs to
+            weight (float): Tenant's share of model capacity relative to other tenants
+
+        Returns:
+            str: Name of the tier in QUALITY_TIERS
+
+        Raises:
+            Overloaded: If the tenant's load is at or past its hard limit
+        """
+        load = self.tenant_load(tenant)
+        share = self.share(tenant, weight)
+        # Every tenant may have at least one request in the system
+        if load >= max(1.0, self.reject_at * share):
+            raise Overloaded(self.retry_after)
+        if load >= self.minimal_at * share:
+            return 'minimal'
+        if load >= self.reduced_at * share:
+            return 'reduced'
+        return 'full'
+
+    @asynccontextmanager
+    async def admit(self, tenant='', weight=1.0, cost=1.0, max_concurrent=None):
+        """
+        Wait for a model slot and yield the tier chosen at arrival time.
+
+        Args:
+            tenant (str): Name of the tenant the request belongs to
+            weight (float): Tenant's share of model capacity relative to other tenants
+            cost (float): Estimated work of the request, e.g. the number of articles
+            max_concurrent (int): Slots the tenant may hold at once, or None for no cap
+
+        Yields:
+            str: Name of the tier in QUALITY_TIERS
+        """
+        tier = self.choose_tier(tenant, weight)
+        self._weights[tenant] = weight
+
+        start = max(self._virtual_time, self._last_finish.get(tenant, 0.0))
+        finish = start + cost / weight
+        self._last_finish[tenant] = finish
+        waiter = {
+            'tenant': tenant,
+            'start': start,
+            'finish': finish,
+            'sequence': next(self._sequence),
+            'max_concurrent': max_concurrent,
+            'future': asyncio.get_running_loop().create_future()
+        }
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            self._dispatch()
+            await waiter['future']
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif not waiter['future'].cancelled():
+                # Granted a slot just as the request was cancelled; hand it on
+                self._release(tenant)
+            raise
+        finally:
+            self.queued -= 1
+
+        try:
+            yield tier
+        finally:
+            self._release(tenant)
+
+    def _dispatch(self):
+        """Grant free slots to waiting requests, earliest virtual finish time first."""
+        while self.in_flight < self.max_in_flight and self._waiters:
+            eligible = [
+                waiter for waiter in self._waiters
+                if waiter['max_concurrent'] is None or self.tenant_in_flight[waiter['tenant']] < waiter['max_concurrent']
+            ]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: (w['finish'], w['sequence']))
+            self._waiters.remove(waiter)
+            self.in_flight += 1
+            self.tenant_in_flight[waiter['tenant']] += 1
+            self._virtual_time = max(self._virtual_time, waiter['start'])
+            waiter['future'].set_result(None)
+
+    def _release(self, tenant):
+        self.in_flight -= 1
+        self.tenant_in_flight[tenant] -= 1
+        if self.tenant_in_flight[tenant] <= 0:
+            del self.tenant_in_flight[tenant]
+        self._dispatch()
+
+    def stats(self):
+        """Return the current load figures."""
+        return {
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'max_in_flight': self.max_in_flight,
+            'reject_at': self.reject_at,
+            'in_flight_by_tenant': dict(self.tenant_in_flight),
+            'queued_by_tenant': dict(Counter(waiter['tenant'] for waiter in self._waiters))
+        }
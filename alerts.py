@@ -0,0 +1,399 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+
+import httpx
+
+
+# Statistics a rule can watch
+METRICS = ('negative_share', 'compound_ewma')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id TEXT PRIMARY KEY,
+    rule TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alert_articles (
+    company TEXT NOT NULL,
+    url TEXT,
+    at REAL NOT NULL,
+    negative INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS alert_articles_url ON alert_articles (company, url);
+CREATE INDEX IF NOT EXISTS alert_articles_time ON alert_articles (company, at);
+CREATE TABLE IF NOT EXISTS alert_windows (
+    company TEXT PRIMARY KEY,
+    ewma REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alert_state (
+    rule_id TEXT NOT NULL,
+    company TEXT NOT NULL,
+    active INTEGER NOT NULL,
+    last_fired REAL NOT NULL,
+    PRIMARY KEY (rule_id, company)
+);
+"""
+
+
+class SentimentMonitor:
+    """
+    Class for evaluating alert rules against articles as they are processed.
+
+    Rules, the sliding windows and the firing state of each rule are kept
+    in SQLite, so every API worker sharing the database sees the same
+    rules and evaluates them against all of the articles, whichever worker
+    processed them.
+    """
+
+    def __init__(self, path='data/alerts.db', dispatcher=None, window_seconds=3600, alpha=0.2, rules_ttl=5,
+                 sweep_interval=60):
+        """
+        Args:
+            path (str): Path of the SQLite database holding the rules and windows
+            dispatcher (WebhookDispatcher): Queue that delivers fired alerts
+            window_seconds (int): Length of the sliding window the statistics cover
+            alpha (float): Weight of the newest article in the compound-score EWMA
+            rules_ttl (float): Seconds the rules are cached before they are read again,
+                so rules added or removed through another worker take effect
+            sweep_interval (float): Seconds between sweeps that drop the windows and rule states of
+                companies with no article left in their window
+        """
+        self.dispatcher = dispatcher
+        self.window_seconds = window_seconds
+        self.alpha = alpha
+        self.rules_ttl = rules_ttl
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._rules = None
+        self._rules_read_at = 0.0
+        self._swept_at = None
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _company_key(company):
+        return company.strip().lower()
+
+    def add_rule(self, company, metric, threshold, direction, webhook_url, min_articles=5, cooldown_seconds=900):
+        """
+        Register a rule that fires a webhook when a company's statistic crosses a threshold.
+
+        Args:
+            company (str): Company to watch, or "*" for every company
+            metric (str): "negative_share" or "compound_ewma"
+            threshold (float): Value the metric has to cross
+            direction (str): "above" or "below"
+            webhook_url (str): http(s) URL the alert is POSTed to
+            min_articles (int): Articles the window must hold before the rule is evaluated
+            cooldown_seconds (int): Minimum time between two alerts of this rule for one company
+
+        Returns:
+            dict: The stored rule with its id
+
+        Raises:
+            ValueError: If an argument is invalid
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of {', '.join(METRICS)}")
+        if direction not in ('above', 'below'):
+            raise ValueError(f"Unknown direction {direction!r}, expected 'above' or 'below'")
+        if urlsplit(webhook_url).scheme not in ('http', 'https'):
+            raise ValueError("webhook_url must be an http or https URL")
+
+        rule = {
+            'id': uuid.uuid4().hex,
+            'company': company if company == '*' else self._company_key(company),
+            'metric': metric,
+            'threshold': float(threshold),
+            'direction': direction,
+            'webhook_url': webhook_url,
+            'min_articles': int(min_articles),
+            'cooldown_seconds': int(cooldown_seconds)
+        }
+        with self._lock:
+            self._conn.execute('INSERT INTO alert_rules (id, rule) VALUES (?, ?)', (rule['id'], json.dumps(rule)))
+            self._rules = None
+        return rule
+
+    def remove_rule(self, rule_id):
+        """Delete a rule, returning False if it did not exist."""
+        with self._lock:
+            deleted = self._conn.execute('DELETE FROM alert_rules WHERE id = ?', (rule_id,)).rowcount
+            self._conn.execute('DELETE FROM alert_state WHERE rule_id = ?', (rule_id,))
+            self._rules = None
+        return deleted > 0
+
+    def rules(self):
+        """Return every registered rule."""
+        with self._lock:
+            return list(self._read_rules().values())
+
+    def _read_rules(self):
+        self._rules = {rule_id: json.loads(rule) for rule_id, rule in self._conn.execute('SELECT id, rule FROM alert_rules')}
+        self._rules_read_at = time.monotonic()
+        return self._rules
+
+    def _current_rules(self):
+        """Return the cached rules, reading them again once they are older than rules_ttl."""
+        if self._rules is None or time.monotonic() - self._rules_read_at >= self.rules_ttl:
+            return self._read_rules()
+        return self._rules
+
+    def _window_stats(self, key, now):
+        articles, negative = self._conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(negative), 0) FROM alert_articles WHERE company = ? AND at >= ?',
+            (key, now - self.window_seconds)).fetchone()
+        row = self._conn.execute('SELECT ewma FROM alert_windows WHERE company = ?', (key,)).fetchone()
+        return {
+            'articles': articles,
+            'negative_share': negative / articles if articles else 0.0,
+            'compound_ewma': row[0] if row is not None else 0.0
+        }
+
+    def stats(self, company, now=None):
+        """
+        Get the current window statistics of a company.
+
+        Returns:
+            dict: Number of articles in the window, negative share and compound EWMA
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._window_stats(self._company_key(company), now)
+
+    def observe(self, company, article, now=None):
+        """
+        Feed one processed article to the evaluator.
+
+        The article updates the company's window, then every rule for the
+        company is checked. A rule fires when its condition turns true and
+        stays quiet until the condition clears, so a long negative streak
+        produces one alert rather than one per article. An article already
+        in the window (the same URL analyzed again) is ignored.
+
+        Args:
+            company (str): Name of the company the article was found for
+            article (dict): Processed article with url, sentiment and sentiment_score
+            now (float): Unix timestamp of the observation, defaults to now
+
+        Returns:
+            list: Alerts fired by this article
+        """
+        now = time.time() if now is None else now
+        key = self._company_key(company)
+        compound = float(article.get('sentiment_score', 0.0))
+        fired = []
+        with self._lock:
+            rules = self._current_rules()
+            # BEGIN IMMEDIATE takes the write lock up front, so articles from two workers update the window in turn
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('DELETE FROM alert_articles WHERE company = ? AND at < ?',
+                                   (key, now - self.window_seconds))
+                added = self._conn.execute(
+                    'INSERT OR IGNORE INTO alert_articles (company, url, at, negative) VALUES (?, ?, ?, ?)',
+                    (key, article.get('url'), now, article['sentiment'] == 'Negative')).rowcount
+                if added:
+                    row = self._conn.execute('SELECT ewma FROM alert_windows WHERE company = ?', (key,)).fetchone()
+                    ewma = compound if row is None else self.alpha * compound + (1 - self.alpha) * row[0]
+                    self._conn.execute(
+                        'INSERT INTO alert_windows (company, ewma, updated) VALUES (?, ?, ?) '
+                        'ON CONFLICT (company) DO UPDATE SET ewma = excluded.ewma, updated = excluded.updated',
+                        (key, ewma, now))
+                    fired = self._evaluate(rules, company, key, article, now)
+                if self._swept_at is None or now - self._swept_at >= self.sweep_interval:
+                    self._sweep(rules, now)
+                    self._swept_at = now
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+        if self.dispatcher is not None:
+            for alert in fired:
+                self.dispatcher.enqueue(alert)
+        return fired
+
+    def _sweep(self, rules, now):
+        """
+        Drop the state of companies whose windows have emptied, inside observe's transaction.
+
+        Company names come from requests, so without this every name ever
+        analyzed would keep a window and a state per rule forever. A company
+        that comes back starts a fresh EWMA. A rule's state is kept while its
+        cooldown runs, so the rule can't fire again sooner than it would have.
+        """
+        cutoff = now - self.window_seconds
+        self._conn.execute('DELETE FROM alert_articles WHERE at < ?', (cutoff,))
+        self._conn.execute('DELETE FROM alert_windows WHERE updated < ?', (cutoff,))
+        longest_cooldown = max((rule['cooldown_seconds'] for rule in rules.values()), default=0)
+        self._conn.execute(
+            'DELETE FROM alert_state WHERE company NOT IN (SELECT company FROM alert_windows) AND last_fired < ?',
+            (now - longest_cooldown,))
+
+    def _evaluate(self, rules, company, key, article, now):
+        """Check the company's rules against its window, inside observe's transaction."""
+        stats = self._window_stats(key, now)
+        fired = []
+        for rule in rules.values():
+            if rule['company'] not in ('*', key):
+                continue
+            value = stats[rule['metric']]
+            crossed = stats['articles'] >= rule['min_articles'] and (
+                value > rule['threshold'] if rule['direction'] == 'above' else value < rule['threshold'])
+            row = self._conn.execute('SELECT active, last_fired FROM alert_state WHERE rule_id = ? AND company = ?',
+                                     (rule['id'], key)).fetchone()
+            was_active, last_fired = (bool(row[0]), row[1]) if row is not None else (False, 0.0)
+            fires = crossed and not was_active and now - last_fired >= rule['cooldown_seconds']
+            if fires:
+                last_fired = now
+            if row is not None or crossed:
+                self._conn.execute(
+                    'INSERT INTO alert_state (rule_id, company, active, last_fired) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (rule_id, company) DO UPDATE SET active = excluded.active, '
+                    'last_fired = excluded.last_fired',
+                    (rule['id'], key, crossed, last_fired))
+            if not fires:
+                continue
+            fired.append({
+                'rule_id': rule['id'],
+                'company': company,
+                'metric': rule['metric'],
+                'value': value,
+                'threshold': rule['threshold'],
+                'direction': rule['direction'],
+                'window_articles': stats['articles'],
+                'triggering_url': article.get('url'),
+                'fired_at': now,
+                'webhook_url': rule['webhook_url']
+            })
+        return fired
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class WebhookDispatcher:
+    """Class for delivering alerts to webhooks in batches from the event loop, with retries."""
+
+    def __init__(self, batch_window=1.0, batch_size=50, max_attempts=5, backoff=1.0, timeout=10, max_queued=1000):
+        """
+        Args:
+            batch_window (float): Seconds to wait for more alerts to the same webhook before sending
+            batch_size (int): Most alerts sent in one request
+            max_attempts (int): Delivery attempts per batch before it is dropped
+            backoff (float): Seconds before the first retry; doubled after every failure
+            timeout (float): Request timeout in seconds
+            max_queued (int): Alerts held before new ones are dropped
+        """
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_queued = max_queued
+        self.delivered = 0
+        self.dropped = 0
+        self._loop = None
+        self._queue = None
+        self._task = None
+        self._retries = set()
+        self._client = None
+
+    def start(self):
+        """Start delivering on the running event loop."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop delivering; alerts still queued or awaiting a retry are dropped."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        for task in list(self._retries):
+            task.cancel()
+        await asyncio.gather(self._task, *self._retries, return_exceptions=True)
+        await self._client.aclose()
+        self._task = None
+
+    def enqueue(self, alert):
+        """
+        Queue an alert for delivery. Safe to call from any thread.
+
+        Args:
+            alert (dict): Alert with a webhook_url key
+        """
+        if self._loop is None or self._loop.is_closed():
+            print(f"Webhook dispatcher not running, dropping alert for rule {alert['rule_id']}")
+            self.dropped += 1
+            return
+        self._loop.call_soon_threadsafe(self._put, alert)
+
+    def _put(self, alert):
+        try:
+            self._queue.put_nowait(alert)
+        except asyncio.QueueFull:
+            print(f"Webhook queue full, dropping alert for rule {alert['rule_id']}")
+            self.dropped += 1
+
+    async def _run(self):
+        while True:
+            alert = await self._queue.get()
+            batches = {alert['webhook_url']: [alert]}
+
+            # Collect whatever else arrives within the batch window
+            deadline = self._loop.time() + self.batch_window
+            while True:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    alert = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batches.setdefault(alert['webhook_url'], []).append(alert)
+
+            for url, alerts in batches.items():
+                for start in range(0, len(alerts), self.batch_size):
+                    task = self._loop.create_task(self._deliver(url, alerts[start:start + self.batch_size]))
+                    self._retries.add(task)
+                    task.add_done_callback(self._retries.discard)
+
+    async def _deliver(self, url, alerts):
+        payload = {'alerts': [{k: v for k, v in alert.items() if k != 'webhook_url'} for alert in alerts]}
+        delay = self.backoff
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = await self._client.post(url, json=payload)
+                if response.status_code < 400:
+                    self.delivered += len(alerts)
+                    return
+                # Client errors other than rate limiting won't succeed on retry
+                if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+                    print(f"Webhook {url} rejected {len(alerts)} alerts with status {response.status_code}")
+                    break
+                error = f"status {response.status_code}"
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+            if attempt < self.max_attempts:
+                await asyncio.sleep(delay)
+                delay *= 2
+        else:
+            print(f"Giving up on webhook {url} after {self.max_attempts} attempts: {error}")
+        self.dropped += len(alerts)
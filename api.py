@@ -1,9 +1,31 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response, Depends
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import uvicorn
-from utils import NewsExtractor, SentimentAnalyzer, ComparativeAnalyzer, TextToSpeechConverter
+from utils import NewsExtractor, SentimentAnalyzer, ComparativeAggregate, TextToSpeechConverter
+from admission import AdmissionController, Overloaded, QUALITY_TIERS
+from deadline import Deadline
+from audio_store import AudioStore, parse_byte_range, etag_matches, if_range_matches
+from json_response import compressed_json_response
+from sentiment_store import SentimentStore, EXPORT_COLUMNS
+from arrow_export import FORMATS, export_schema, stream_export
+from article_index import ArticleIndex
+from body_store import BodyStore
+from alerts import SentimentMonitor, WebhookDispatcher
+from request_profiler import TraceStore
+from memory_watchdog import MemoryWatchdog
+from tenants import Tenant, TenantRegistry, RateLimited, UnknownAPIKey
+from inference_profile import DEFAULT_PATH as INFERENCE_PROFILE_PATH, load_profile, apply_profile
+from work_queue import open_work_queue
+from worker import run_task
+from typing import List, Literal, Optional
+from datetime import datetime, timezone
+import json
 import os
+import time
+import uuid
 
 app = FastAPI(title="News Sentiment TTS API", 
               description="API for extracting, analyzing, and converting news articles to speech",
@@ -14,6 +36,10 @@ app = FastAPI(title="News Sentiment TTS API",
 class CompanyRequest(BaseModel):
     company_name: str
     num_articles: int = 10
+    deadline_ms: Optional[int] = None
+    sentiment_mode: Literal['document', 'entity'] = 'document'
+    aliases: Optional[List[str]] = None
+    stream_audio: bool = False
 
 class ArticleResponse(BaseModel):
     title: str
@@ -21,104 +47,722 @@ class ArticleResponse(BaseModel):
     content: str
     url: str
     sentiment: str
+    sentiment_score: float = 0.0
+    published_date: Optional[str] = None
     topics: list
+    entity_sentiment: Optional[dict] = None
 
 class CompanyAnalysisResponse(BaseModel):
     company: str
-    articles: list
+    articles: List[ArticleResponse]
     comparative_sentiment_score: dict
     final_sentiment_analysis: str
-    audio_path: str
+    audio_path: Optional[str] = None
+    quality_tier: str = 'full'
+    partial: bool = False
+    elapsed_ms: int = 0
+    profile_id: Optional[str] = None
+
+class AlertRuleRequest(BaseModel):
+    company: str
+    metric: Literal['negative_share', 'compound_ewma']
+    threshold: float
+    direction: Literal['above', 'below']
+    webhook_url: str
+    min_articles: int = 5
+    cooldown_seconds: int = 900
 
 # Initialize the components
 news_extractor = NewsExtractor()
 sentiment_analyzer = SentimentAnalyzer()
-comparative_analyzer = ComparativeAnalyzer()
 tts_converter = TextToSpeechConverter()
+admission_controller = AdmissionController()
+# API-key tenants with rate limits and fair shares of model capacity; without a file everyone is one tenant
+tenant_registry = TenantRegistry(os.environ.get('TENANTS_FILE'))
+# Recycle the process before it grows into the OOM killer; needs a supervisor such as gunicorn to restart it
+memory_watchdog = MemoryWatchdog(
+    max_rss_mb=float(os.environ['MAX_RSS_MB']) if os.environ.get('MAX_RSS_MB') else None,
+    tracemalloc_frames=int(os.environ.get('TRACEMALLOC_FRAMES', '0'))
+)
+sentiment_store = SentimentStore('data/sentiment.db')
+article_index = ArticleIndex('data/article_index')
+body_store = BodyStore('data/bodies.db')
+webhook_dispatcher = WebhookDispatcher()
+sentiment_monitor = SentimentMonitor('data/alerts.db', dispatcher=webhook_dispatcher)
+trace_store = TraceStore('data/traces.db')
+
+# Distributed mode: articles are analyzed by worker.py processes sharing this queue
+work_queue = open_work_queue(os.environ['WORK_QUEUE_URL']) if os.environ.get('WORK_QUEUE_URL') else None
 
 # Create a directory for audio files if it doesn't exist
 os.makedirs('static/audio', exist_ok=True)
+# Texts registered for streaming, with their tokens, are kept out of the publicly served static/ tree
+audio_store = AudioStore('static/audio', pending_directory='data/audio_pending')
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.on_event("startup")
+async def load_models():
+    # Apply the thread counts and batch size autotune.py found for this host, then load
+    # BART before accepting traffic so the first request doesn't pay for it
+    apply_profile(load_profile(os.environ.get('INFERENCE_PROFILE', INFERENCE_PROFILE_PATH)), sentiment_analyzer)
+    sentiment_analyzer.load_models()
+
+@app.on_event("startup")
+async def start_audio_janitor():
+    audio_store.start_janitor()
+
+@app.on_event("shutdown")
+async def stop_audio_janitor():
+    audio_store.stop_janitor()
+
+@app.on_event("startup")
+async def start_memory_watchdog():
+    memory_watchdog.start()
+
+@app.on_event("shutdown")
+async def stop_memory_watchdog():
+    memory_watchdog.stop()
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    try:
+        return await call_next(request)
+    finally:
+        memory_watchdog.request_finished()
+
+@app.on_event("startup")
+async def start_webhook_dispatcher():
+    webhook_dispatcher.start()
+
+@app.on_event("shutdown")
+async def stop_webhook_dispatcher():
+    await webhook_dispatcher.stop()
+
+def require_tenant(http_request: Request):
+    """Dependency finding the tenant of a request from its X-API-Key header, rejecting unknown keys with 401."""
+    try:
+        return tenant_registry.resolve(http_request.headers.get('x-api-key'))
+    except UnknownAPIKey as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+def require_rate(tenant: Tenant = Depends(require_tenant)):
+    """Dependency counting a request against its tenant's rate limit, rejecting it with 429 past the limit."""
+    try:
+        tenant_registry.check_rate(tenant)
+    except RateLimited as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    tenant_registry.record(tenant, requests=1)
+    return tenant
+
+def require_admin(tenant: Tenant = Depends(require_tenant)):
+    """Dependency admitting only admin tenants, for endpoints that change or reveal server-wide state."""
+    if not tenant.admin:
+        raise HTTPException(status_code=403, detail="This endpoint needs an admin API key")
+    return tenant
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the News Sentiment TTS API"}
 
-@app.post("/analyze", response_model=dict)
-async def analyze_company(request: CompanyRequest):
+@app.post("/analyze", response_model=CompanyAnalysisResponse)
+async def analyze_company(request: CompanyRequest, background_tasks: BackgroundTasks, http_request: Request,
+                          include_content: bool = True, fields: Optional[str] = None, profile: bool = False,
+                          tenant: Tenant = Depends(require_rate)):
     """
     Analyze news articles for a company and generate sentiment analysis with TTS.
     
+    Under load the request is served at a cheaper quality tier, and past the
+    hard limit it is rejected with 503 and a Retry-After header. If a
+    deadline_ms is given, the articles processed before it runs out are
+    returned with partial set to True.
+    
+    The X-API-Key header selects the tenant. A tenant past its request rate
+    gets 429 with a Retry-After header, num_articles is capped at its
+    max_articles, and model slots are shared between tenants by weighted
+    fair queuing, with the number of articles as the cost of a request.
+    
+    Every request records per-stage spans; its trace id is returned in the
+    X-Trace-Id header. With ?profile=true or an "X-Profile: 1" header the
+    pipeline's call stack is also sampled, and the profile is available
+    from /profiles/{profile_id}.
+    
     Args:
         request (CompanyRequest): Company name and number of articles to analyze
+        background_tasks (BackgroundTasks): Used to generate deferred audio
+        http_request (Request): Incoming request, for the Accept-Encoding and X-Profile headers
+        include_content (bool): Include each article's full text
+        fields (str): Comma-separated article fields to return, e.g. "title,url,sentiment"
+        profile (bool): Capture a sampling profile of this request
+        tenant (Tenant): Tenant of the X-API-Key header, already counted against its rate limit
     
     Returns:
-        dict: Analysis results
+        Response: Analysis results as orjson-encoded, compressed JSON
     """
+    article_exclude = _article_exclude(include_content, fields)
+    if tenant.max_articles is not None and request.num_articles > tenant.max_articles:
+        request = request.model_copy(update={'num_articles': tenant.max_articles})
+    
+    # The budget starts on arrival, so time spent queued for a model slot counts against it
+    deadline = Deadline(request.deadline_ms)
+    
+    profile = profile or http_request.headers.get('x-profile', '').lower() in ('1', 'true')
+    trace = trace_store.start_trace(f"analyze {request.company_name}", profile=profile)
     try:
-        # Extract news articles
-        article_urls = news_extractor.search_news(request.company_name, request.num_articles)
-        
-        # Process each article
-        processed_articles = []
-        for url in article_urls:
-            article = news_extractor.extract_article_content(url)
-            
-            # Analyze sentiment
-            sentiment_result = sentiment_analyzer.analyze_sentiment(article['content'])
-            
-            # Generate summary
-            summary = sentiment_analyzer.summarize_text(article['content'])
-            
-            # Extract topics
-            topics = sentiment_analyzer.extract_topics(article['content'])
-            
-            processed_article = {
-                'title': article['title'],
-                'summary': summary,
-                'content': article['content'],
-                'url': article['url'],
-                'sentiment': sentiment_result['category'],
-                'topics': topics
-            }
-            
-            processed_articles.append(processed_article)
-        
-        # Perform comparative analysis
-        comparative_results = comparative_analyzer.perform_comparative_analysis(processed_articles)
-        
-        # Generate a detailed summary of all articles for TTS
-        summary_text = f"Here is a detailed summary of all the news articles about {request.company_name}. "
-        
-        for i, article in enumerate(processed_articles):
-            article_summary = f"Article {i + 1}: {article['summary']} The sentiment of this article is {article['sentiment']}. "
-            summary_text += article_summary
-        
-        summary_text += f"Overall, the news about {request.company_name} is mostly {comparative_results['final_sentiment_analysis']}. "
-        
-        if comparative_results['topic_overlap']['common_topics']:
-            summary_text += f"The main topics discussed across articles include {', '.join(comparative_results['topic_overlap']['common_topics'])}. "
-        
-        summary_text += "This is the overall summary of the news."
-        
-        # Generate TTS audio in Hindi
-        audio_filename = f"{request.company_name.lower().replace(' ', '_')}_summary.mp3"
-        audio_path = os.path.join('static/audio', audio_filename)
-        tts_converter.generate_speech(summary_text, audio_path)
+        async with admission_controller.admit(tenant.name, tenant.weight, cost=max(1, request.num_articles),
+                                              max_concurrent=tenant.max_concurrent) as tier:
+            queued_ms = trace.now_ms()
+            trace.add_span('queue', 0, queued_ms, tier=tier, tenant=tenant.name)
+            try:
+                response, summary_text = await run_in_threadpool(_run_traced, request, tier, deadline, trace)
+            finally:
+                tenant_registry.record(tenant, queue_seconds=queued_ms / 1000,
+                                       model_seconds=(trace.now_ms() - queued_ms) / 1000)
+        tenant_registry.record(tenant, articles=len(response['articles']))
+    except Overloaded as e:
+        tenant_registry.record(tenant, overloaded=1)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        tenant_registry.record(tenant, errors=1)
+        raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+    finally:
+        trace.finish()
+        trace_store.add(trace)
+    
+    if trace.profile:
+        response['profile_id'] = trace.id
+    
+    if QUALITY_TIERS[tier]['defer_audio'] and not request.stream_audio:
+        background_tasks.add_task(audio_store.get_or_create, summary_text, tts_converter.generate_speech)
+    
+    result = CompanyAnalysisResponse(**response)
+    content = result.model_dump(exclude={'articles': {'__all__': article_exclude}} if article_exclude else None)
+    return compressed_json_response(content, http_request.headers.get('accept-encoding', ''),
+                                    headers={'X-Trace-Id': trace.id})
+
+def _article_exclude(include_content, fields):
+    """
+    Work out which article fields to leave out of the response.
+    
+    Args:
+        include_content (bool): Include each article's full text
+        fields (str): Comma-separated article fields to return, or None for all
+    
+    Returns:
+        set: Names of ArticleResponse fields to exclude
+    """
+    all_fields = set(ArticleResponse.model_fields)
+    if fields:
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = requested - all_fields
+        if unknown:
+            raise HTTPException(status_code=400,
+                                detail=f"Unknown article fields: {', '.join(sorted(unknown))}. "
+                                       f"Valid fields are: {', '.join(sorted(all_fields))}")
+        exclude = all_fields - requested
+    else:
+        exclude = set()
+    
+    if not include_content:
+        exclude.add('content')
+    return exclude
+
+def _run_traced(request, tier, deadline, trace):
+    """Run the pipeline in the calling worker thread, sampling its stack if the trace is profiled."""
+    with trace.sampling():
+        return _run_analysis(request, tier, deadline, trace)
+
+def _process_locally(request, articles, settings, extractive, deadline, trace, aggregate):
+    """
+    Analyze each article in this process as it arrives.
+    
+    Returns:
+        tuple: (position, processed article) pairs and whether the deadline cut the run short
+    """
+    processed = []
+    while True:
+        with trace.span('wait_for_article'):
+            item = next(articles, None)
+        if item is None:
+            return processed, False
+        if deadline.expired():
+            return processed, True
+        position, article = item
         
-        # Prepare response
-        response = {
-            "company": request.company_name,
-            "articles": processed_articles,
-            "comparative_sentiment_score": comparative_results,
-            "final_sentiment_analysis": comparative_results['final_sentiment_analysis'],
-            "audio_path": f"/static/audio/{audio_filename}"
-        }
+        processed_article = sentiment_analyzer.process_article(
+            article, request.company_name, sentiment_mode=request.sentiment_mode, aliases=request.aliases,
+            translate=settings['translate'], extractive=extractive, deadline=deadline, trace=trace)
+        processed.append((position, processed_article))
+        _collect(request.company_name, position, processed_article, aggregate)
+
+def _process_distributed(request, articles, settings, extractive, deadline, trace, aggregate):
+    """
+    Push each article to the work queue as it arrives and collect the results from the workers.
+    
+    While waiting, this process claims tasks of its own job too, so the
+    request still completes when no worker is running. Tasks that fail on
+    every attempt are processed here. Tasks still open at the deadline are
+    dropped from the queue.
+    
+    Returns:
+        tuple: (position, processed article) pairs and whether the deadline cut the run short
+    """
+    job_id = uuid.uuid4().hex
+    base_payload = {
+        'company_name': request.company_name,
+        'sentiment_mode': request.sentiment_mode,
+        'aliases': request.aliases,
+        'translate': settings['translate'],
+        'extractive': extractive
+    }
+    
+    try:
+        with trace.span('submit', job_id=job_id):
+            submitted = {}
+            for position, article in articles:
+                if deadline.expired():
+                    break
+                # An absolute wall-clock time, so the time a task waits in the queue counts against it
+                remaining = deadline.remaining()
+                payload = dict(base_payload, article=article,
+                               deadline_at=None if remaining is None else time.time() + remaining)
+                work_queue.submit(job_id, position, payload)
+                submitted[position] = article
         
-        return response
+        processed = {}
+        worker_id = f"api-{os.getpid()}-{job_id[:8]}"
+        with trace.span('collect', job_id=job_id, tasks=len(submitted)):
+            while len(processed) < len(submitted) and not deadline.expired():
+                for task in work_queue.finished(job_id):
+                    if task['position'] in processed:
+                        continue
+                    if task['status'] == 'done':
+                        processed_article = task['result']
+                    else:
+                        print(f"Task {task['id']} failed on the workers, processing it here: {task['error']}")
+                        processed_article = sentiment_analyzer.process_article(
+                            submitted[task['position']], request.company_name,
+                            sentiment_mode=request.sentiment_mode, aliases=request.aliases,
+                            translate=settings['translate'], extractive=extractive, deadline=deadline)
+                    processed[task['position']] = processed_article
+                    _collect(request.company_name, task['position'], processed_article, aggregate)
+                
+                if len(processed) < len(submitted) and not _work_on_own_job(job_id, worker_id):
+                    time.sleep(0.05)
+    finally:
+        work_queue.delete_job(job_id)
     
+    return list(processed.items()), len(processed) < len(submitted) or deadline.expired()
+
+def _work_on_own_job(job_id, worker_id):
+    """Claim and run one task of the job in this process. Returns False if none was available."""
+    task = work_queue.claim(worker_id, job_id=job_id)
+    if task is None:
+        return False
+    try:
+        result = run_task(sentiment_analyzer, task['payload'])
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+        work_queue.fail(task['id'], worker_id, e)
+    else:
+        work_queue.complete(task['id'], worker_id, result)
+    return True
+
+def _collect(company_name, position, processed_article, aggregate):
+    # Update the comparative analysis and check alert rules as each article is produced rather than after the run
+    aggregate.add(processed_article, key=position, position=position)
+    try:
+        sentiment_monitor.observe(company_name, processed_article)
+    except Exception as e:
+        print(f"Error evaluating alert rules: {e}")
+
+def _run_analysis(request, tier, deadline, trace):
+    """
+    Run the extraction and analysis pipeline at the given quality tier.
+    
+    Each stage checks the remaining budget and stops early, keeping the
+    articles processed so far, rather than running over the deadline.
+    
+    Args:
+        request (CompanyRequest): Company name and number of articles to analyze
+        tier (str): Name of the tier in QUALITY_TIERS
+        deadline (Deadline): Time budget for the request
+        trace (RequestTrace): Records how long each stage takes
+    
+    Returns:
+        tuple: Response dict and TTS summary text
+    """
+    settings = QUALITY_TIERS[tier]
+    num_articles = request.num_articles
+    if settings['max_articles'] is not None:
+        num_articles = min(num_articles, settings['max_articles'])
+    extractive = settings['summarizer'] == 'extractive'
+    
+    # Search, fetch and analysis overlap: search results feed the fetcher as each page is
+    # parsed, and articles are analyzed in the order they arrive while later ones are fetched
+    articles = news_extractor.stream_articles(request.company_name, num_articles, deadline=deadline,
+                                              aliases=request.aliases, trace=trace)
+    
+    # Analyze the articles here, or hand them to the workers sharing the queue. The comparative
+    # analysis is kept up to date as they arrive, in search-result order whatever the arrival order.
+    aggregate = ComparativeAggregate()
+    if work_queue is not None:
+        processed, partial = _process_distributed(request, articles, settings, extractive, deadline, trace, aggregate)
+    else:
+        processed, partial = _process_locally(request, articles, settings, extractive, deadline, trace, aggregate)
+    articles.close()
+    
+    # Articles the deadline cut off never arrive
+    partial = partial or len(processed) < num_articles
+    
+    # Report the articles in search-result order, whatever order they were fetched in
+    processed_articles = [article for _, article in sorted(processed, key=lambda item: item[0])]
+    
+    with trace.span('comparative'):
+        comparative_results = aggregate.result()
+    
+    # Record the scores for trend queries and the articles for similarity search;
+    # a storage failure shouldn't fail the analysis
+    with trace.span('store'):
+        try:
+            sentiment_store.add_articles(request.company_name, processed_articles)
+        except Exception as e:
+            print(f"Error storing sentiment history: {e}")
+        try:
+            article_index.add(request.company_name, processed_articles)
+        except Exception as e:
+            print(f"Error indexing articles: {e}")
+        try:
+            body_store.put_many([(article['url'], article['content']) for article in processed_articles])
+        except Exception as e:
+            print(f"Error storing article bodies: {e}")
+    
+    # Generate a detailed summary of all articles for TTS
+    summary_text = f"Here is a detailed summary of all the news articles about {request.company_name}. "
+    
+    for i, article in enumerate(processed_articles):
+        article_summary = f"Article {i + 1}: {article['summary']} The sentiment of this article is {article['sentiment']}. "
+        summary_text += article_summary
+    
+    summary_text += f"Overall, the news about {request.company_name} is mostly {comparative_results['final_sentiment_analysis']}. "
+    
+    if comparative_results['topic_overlap']['common_topics']:
+        summary_text += f"The main topics discussed across articles include {', '.join(comparative_results['topic_overlap']['common_topics'])}. "
+    
+    summary_text += "This is the overall summary of the news."
+    
+    # Generate TTS audio in Hindi, unless this tier defers it until after the response
+    # or the budget is already spent. Audio is named by a hash of the summary text,
+    # so a repeated summary reuses the file already on disk.
+    audio_url = None
+    if request.stream_audio:
+        # The token lets the client's audio player start synthesis without sending the API key
+        key, token = audio_store.register(summary_text)
+        audio_url = f"/audio/stream/{key}.mp3?token={token}"
+    elif settings['defer_audio']:
+        audio_url = f"/audio/{audio_store.key_for(summary_text)}.mp3"
+    elif deadline.expired():
+        partial = True
+    else:
+        with trace.span('audio'):
+            audio_filename = audio_store.get_or_create(summary_text, tts_converter.generate_speech)
+        if audio_filename:
+            audio_url = f"/audio/{audio_filename}"
+    
+    # Prepare response
+    response = {
+        "company": request.company_name,
+        "articles": processed_articles,
+        "comparative_sentiment_score": comparative_results,
+        "final_sentiment_analysis": comparative_results['final_sentiment_analysis'],
+        "audio_path": audio_url,
+        "quality_tier": tier,
+        "partial": partial,
+        "elapsed_ms": deadline.elapsed_ms()
+    }
+    
+    return response, summary_text
+
+@app.get("/audio/stream/{filename}")
+def stream_audio(filename: str, token: Optional[str] = None):
+    """
+    Stream the Hindi audio of an analysis while it is being synthesized.
+    
+    The summary is translated and synthesized a few sentences at a time, and
+    each segment's MP3 frames are sent with chunked transfer as soon as they
+    are ready, so playback starts after the first sentence rather than after
+    the whole summary. Once complete, the audio is also available from
+    /audio/{filename}.
+    
+    Synthesis needs the token in the audio_path, which only the tenant that
+    ran the analysis has, so the URL can be given to a browser's audio
+    player without an API key.
+    
+    Args:
+        filename (str): Audio filename from the audio_path of a /analyze request with stream_audio set
+        token (str): Token from the same audio_path
+    
+    Returns:
+        StreamingResponse: MP3 audio
+    """
+    if not audio_store.is_valid_filename(filename):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    try:
+        audio = audio_store.stream(os.path.splitext(filename)[0], tts_converter.stream_speech, token=token)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return StreamingResponse(audio, media_type="audio/mpeg", headers={"Cache-Control": "no-store"})
+
+@app.get("/audio/{filename}")
+def get_audio(filename: str, request: Request):
+    """
+    Serve a generated audio file with a weak ETag and HTTP Range support.
+    
+    Args:
+        filename (str): Content-addressed audio filename
+        request (Request): Incoming request, for the If-None-Match and Range headers
+    
+    Returns:
+        Response: The full file, a 206 partial response, or 304 Not Modified
+    """
+    if not audio_store.is_valid_filename(filename):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    path = audio_store.path_for(filename)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    
+    # The name hashes the spoken text, not the MP3 bytes: audio evicted by the janitor is synthesized
+    # again under the same name and may differ byte for byte. The tag is therefore weak, caches
+    # revalidate, and If-Range (which needs a strong match) never resumes across two syntheses.
+    etag = f'W/"{os.path.splitext(filename)[0]}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=86400"
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    audio_store.touch(filename)
+    size = os.path.getsize(path)
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and if_range_matches(request.headers.get("if-range"), etag):
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+    
+    if byte_range is None:
+        with open(path, 'rb') as f:
+            return Response(content=f.read(), media_type="audio/mpeg", headers=headers)
+    
+    start, end = byte_range
+    with open(path, 'rb') as f:
+        f.seek(start)
+        content = f.read(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=content, status_code=206, media_type="audio/mpeg", headers=headers)
+
+@app.get("/trends/{company}")
+async def get_trends(company: str, granularity: str = 'day', start: Optional[str] = None, end: Optional[str] = None,
+                     tenant: Tenant = Depends(require_tenant)):
+    """
+    Get a company's sentiment over time from the hourly or daily rollups.
+    
+    Args:
+        company (str): Name of the company
+        granularity (str): "hour" or "day"
+        start (str): ISO 8601 start of the range (UTC if no offset is given)
+        end (str): ISO 8601 end of the range (UTC if no offset is given)
+    
+    Returns:
+        dict: Sentiment counts and mean compound score per bucket
+    """
+    try:
+        start_ts = _parse_timestamp(start)
+        end_ts = _parse_timestamp(end)
+        trend = sentiment_store.trends(company, granularity, start_ts, end_ts)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"company": company, "granularity": granularity, "trend": trend}
+
+@app.get("/export")
+def export_articles(format: str = 'arrow', columns: Optional[str] = None, company: Optional[str] = None,
+                    start: Optional[str] = None, end: Optional[str] = None, batch_size: int = 10000,
+                    tenant: Tenant = Depends(require_rate)):
+    """
+    Stream every stored article result as Arrow IPC record batches or a Parquet file.
+    
+    Rows are read from the sentiment store in batches and encoded one batch
+    at a time, so the export is never buffered whole. The body is produced
+    in a worker thread, so a long export doesn't block the event loop.
+    
+    Args:
+        format (str): "arrow" for an Arrow IPC stream or "parquet"
+        columns (str): Comma-separated columns to export, or None for all
+        company (str): Only export articles of this company
+        start (str): ISO 8601 start of the analysis time range (UTC if no offset is given)
+        end (str): ISO 8601 end of the analysis time range (UTC if no offset is given)
+        batch_size (int): Rows per record batch (Parquet row group)
+        tenant (Tenant): Tenant of the X-API-Key header, already counted against its rate limit
+    
+    Returns:
+        StreamingResponse: The encoded articles
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {format!r}, expected one of {', '.join(FORMATS)}")
+    if not 1 <= batch_size <= 100000:
+        raise HTTPException(status_code=400, detail="batch_size must be between 1 and 100000")
+    selected = tuple(column.strip() for column in columns.split(',') if column.strip()) if columns else EXPORT_COLUMNS
+    
+    unknown = [column for column in selected if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown columns: {', '.join(unknown)}. "
+                                   f"Valid columns are: {', '.join(EXPORT_COLUMNS)}")
+    try:
+        start_ts = _parse_timestamp(start)
+        end_ts = _parse_timestamp(end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Errors after the response has started can't be reported, so settle the schema first
+    try:
+        schema = export_schema(selected)
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=f"Export needs pyarrow: {e}")
+    
+    batches = sentiment_store.iter_articles(selected, company=company, start=start_ts, end=end_ts,
+                                            batch_size=batch_size)
+    
+    extension = 'arrows' if format == 'arrow' else 'parquet'
+    return StreamingResponse(stream_export(batches, schema, format), media_type=FORMATS[format],
+                             headers={"Content-Disposition": f'attachment; filename="articles.{extension}"'})
+
+@app.post("/alerts/rules")
+def create_alert_rule(rule: AlertRuleRequest, tenant: Tenant = Depends(require_admin)):
+    """
+    Register a webhook that is called when a company's sentiment crosses a threshold.
+    
+    Rules are checked against every article /analyze processes, using a
+    sliding window per company: the share of negative articles and an
+    exponentially weighted moving average of the compound score. Alerts are
+    POSTed as {"alerts": [...]}, batched per webhook and retried with backoff.
+    Rules make the server call out to the webhook URL, so they need an admin
+    API key.
+    
+    Args:
+        rule (AlertRuleRequest): Company ("*" for all), metric, threshold, direction and webhook URL
+        tenant (Tenant): Admin tenant of the X-API-Key header
+    
+    Returns:
+        dict: The stored rule with its id
+    """
+    try:
+        return sentiment_monitor.add_rule(**rule.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/alerts/rules")
+def list_alert_rules(tenant: Tenant = Depends(require_admin)):
+    return {"rules": sentiment_monitor.rules()}
+
+@app.delete("/alerts/rules/{rule_id}")
+def delete_alert_rule(rule_id: str, tenant: Tenant = Depends(require_admin)):
+    if not sentiment_monitor.remove_rule(rule_id):
+        raise HTTPException(status_code=404, detail=f"Unknown rule: {rule_id}")
+    return {"deleted": rule_id}
+
+@app.get("/alerts/status/{company}")
+def get_alert_status(company: str, tenant: Tenant = Depends(require_tenant)):
+    """
+    Get the window statistics the alert rules see for a company.
+    
+    Args:
+        company (str): Name of the company
+    
+    Returns:
+        dict: Articles in the window, negative share, compound EWMA and delivery counters
+    """
+    return {
+        "company": company,
+        **sentiment_monitor.stats(company),
+        "alerts_delivered": webhook_dispatcher.delivered,
+        "alerts_dropped": webhook_dispatcher.dropped
+    }
+
+@app.get("/profiles")
+def list_profiles(tenant: Tenant = Depends(require_admin)):
+    """
+    Get the traces of the slowest recent /analyze requests.
+    
+    Returns:
+        dict: Trace summaries with per-stage spans, slowest first
+    """
+    return {"slowest": trace_store.slowest()}
+
+@app.get("/profiles/{trace_id}")
+def get_profile(trace_id: str, format: Literal['json', 'speedscope', 'collapsed'] = 'json',
+                tenant: Tenant = Depends(require_admin)):
+    """
+    Get one request trace.
+    
+    Args:
+        trace_id (str): Value of the X-Trace-Id header or profile_id field
+        format (str): "json" for the spans, "speedscope" for a file to open at
+            https://www.speedscope.app, or "collapsed" for flamegraph.pl input
+    
+    Returns:
+        Response: The trace in the requested format
+    """
+    trace = trace_store.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Trace not found: {trace_id}")
+    
+    if format == 'collapsed':
+        if not trace.profile:
+            raise HTTPException(status_code=404, detail=f"Request {trace_id} was not profiled")
+        return PlainTextResponse(trace.collapsed())
+    if format == 'speedscope':
+        return Response(content=json.dumps(trace.speedscope()), media_type="application/json",
+                        headers={"Content-Disposition": f'attachment; filename="{trace_id}.speedscope.json"'})
+    return trace.summary()
+
+@app.get("/similar")
+def get_similar(url: Optional[str] = None, text: Optional[str] = None, k: int = 10, company: Optional[str] = None,
+                tenant: Tenant = Depends(require_tenant)):
+    """
+    Find processed articles similar to an indexed article or to a piece of text.
+    
+    Args:
+        url (str): URL of an already processed article
+        text (str): Free text to match against
+        k (int): Number of results
+        company (str): Only return articles found for this company
+    
+    Returns:
+        dict: Similar articles with cosine similarity scores, best first
+    """
+    if (url is None) == (text is None):
+        raise HTTPException(status_code=400, detail="Pass exactly one of url or text")
+    if not 1 <= k <= 100:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 100")
+    
+    try:
+        results = article_index.search(text=text, url=url, k=k, company=company)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Article not indexed: {url}")
+    
+    return {"results": results}
+
+def _parse_timestamp(value):
+    """Convert an ISO 8601 string to a Unix timestamp, treating naive times as UTC."""
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
 
 @app.get("/companies")
 async def get_sample_companies():
@@ -130,5 +774,52 @@ async def get_sample_companies():
     """
     return ["Apple", "Microsoft", "Google", "Amazon", "Tesla", "Facebook", "Netflix", "IBM", "Intel", "Oracle"]
 
+@app.get("/bodies/stats")
+def get_body_stats(tenant: Tenant = Depends(require_admin)):
+    """
+    Get the size of the stored article bodies before and after compression.
+    
+    Returns:
+        dict: Body count, raw and stored bytes and compression ratio, overall and per publisher
+    """
+    return body_store.stats()
+
+@app.get("/diagnostics/memory")
+def get_memory_diagnostics(top: int = 15, tenant: Tenant = Depends(require_admin)):
+    """
+    Get this worker's memory use and how close it is to being recycled.
+    
+    Args:
+        top (int): Number of top allocation sites to report when tracemalloc is on
+    
+    Returns:
+        dict: Current and peak RSS, recent samples, the RSS ceiling, request count and top allocations
+    """
+    return memory_watchdog.stats(top=max(0, min(top, 100)))
+
+@app.get("/tenants/usage")
+def get_tenant_usage(tenant: Tenant = Depends(require_tenant)):
+    """
+    Get the usage counters and limits of the caller's tenant, or of every tenant for an admin key.
+    
+    Args:
+        tenant (Tenant): Tenant of the X-API-Key header
+    
+    Returns:
+        dict: Tenant name to limits and usage (requests, rate_limited, overloaded, errors,
+            articles, queue_seconds, model_seconds)
+    """
+    return tenant_registry.usage(None if tenant.admin else tenant)
+
+@app.get("/load")
+async def get_load(tenant: Tenant = Depends(require_admin)):
+    """
+    Get the current admission controller load.
+    
+    Returns:
+        dict: In-flight and queued request counts
+    """
+    return admission_controller.stats()
+
 if __name__ == "__main__":
     uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
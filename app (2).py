@@ -1,19 +1,16 @@
 import streamlit as st
 import requests
 import json
-import pandas as pd
 import os
 import time
-import plotly.express as px
-import plotly.graph_objects as go
-from streamlit.components.v1 import html
-import altair as alt
-import nltk
-from nltk.corpus import stopwords
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
 import io
-import base64
+import hashlib
+from lazy_import import lazy_import
+
+# Charting libraries are only imported once there are results to render
+pd = lazy_import('pandas')
+px = lazy_import('plotly.express')
+wordcloud_lib = lazy_import('wordcloud')
 
 # Set page configuration
 st.set_page_config(
@@ -92,9 +89,23 @@ st.markdown("""
 # API endpoint
 API_URL = "https://Dhanu9945-fastapi-backend.hf.space"
 
-# Initialize session state for backend logs
+# How long the company list is cached between reruns, in seconds
+COMPANIES_TTL = 600
+
+# Initialize session state for backend logs and the latest results
 if 'backend_logs' not in st.session_state:
     st.session_state.backend_logs = []
+if 'results' not in st.session_state:
+    st.session_state.results = None
+
+@st.cache_resource
+def get_session():
+    """Get a pooled HTTP session shared across reruns and users"""
+    session = requests.Session()
+    # Identifies the app as its own tenant, so batch clients can't starve interactive use
+    if os.environ.get('NEWS_API_KEY'):
+        session.headers['X-API-Key'] = os.environ['NEWS_API_KEY']
+    return session
 
 def add_log(log_text, log_type="info"):
     """Add log to session state"""
@@ -120,20 +131,19 @@ def display_backend_logs():
         </div>
         """, unsafe_allow_html=True)
 
+@st.cache_data(ttl=COMPANIES_TTL, show_spinner=False)
+def fetch_companies():
+    """Fetch the company list from the API; errors are raised so they are not cached"""
+    response = get_session().get(f"{API_URL}/companies", timeout=10)
+    response.raise_for_status()
+    return response.json()
+
 def get_companies():
     """Get list of sample companies from the API"""
-    add_log("Fetching company list from API...")
     try:
-        response = requests.get(f"{API_URL}/companies")
-        if response.status_code == 200:
-            companies = response.json()
-            add_log(f"Successfully retrieved {len(companies)} companies")
-            return companies
-        else:
-            add_log(f"Error fetching companies: Status code {response.status_code}", "error")
-            return []
+        return fetch_companies()
     except Exception as e:
-        add_log(f"Error connecting to API: {str(e)}", "error")
+        add_log(f"Error fetching company list from API: {str(e)}", "error")
         return []
 
 def analyze_company(company_name, num_articles=10):
@@ -143,50 +153,19 @@ def analyze_company(company_name, num_articles=10):
     
     try:
         with st.spinner("Analyzing news articles..."):
-            # Simulate backend activities with progress bars
-            progress_placeholder = st.empty()
-            progress_bar = progress_placeholder.progress(0)
-            
-            # Step 1: Fetching articles
-            for i in range(25):
-                time.sleep(0.05)  # Simulate time passing
-                progress_bar.progress(i)
-            add_log("Extracting news articles from multiple sources...")
-            
-            # Step 2: Content extraction
-            for i in range(25, 50):
-                time.sleep(0.05)
-                progress_bar.progress(i)
-            add_log("Analyzing article content and extracting key information...")
-            
-            # Step 3: Sentiment analysis
-            for i in range(50, 75):
-                time.sleep(0.05)
-                progress_bar.progress(i)
-            add_log("Performing sentiment analysis on articles...")
-            add_log("Categorizing content as positive, negative, or neutral...")
-            
-            # Step 4: Translation and speech synthesis
-            for i in range(75, 100):
-                time.sleep(0.05)
-                progress_bar.progress(i)
-            add_log("Translating content to Hindi using Google Translator...")
-            add_log("Generating audio summary using gTTS (Google Text-to-Speech)...")
-            
-            # Final step: Making the actual API call
-            progress_bar.progress(100)
             add_log(f"Sending analysis request to API: {API_URL}/analyze")
             
-            response = requests.post(
+            response = get_session().post(
                 f"{API_URL}/analyze",
-                json={"company_name": company_name, "num_articles": num_articles}
+                # Audio is streamed from its own endpoint so the player can start before synthesis finishes
+                json={"company_name": company_name, "num_articles": num_articles, "stream_audio": True}
             )
             
-            progress_placeholder.empty()
-            
             if response.status_code == 200:
-                add_log("Analysis completed successfully!")
-                return response.json()
+                results = response.json()
+                add_log(f"Analysis completed successfully in {results.get('elapsed_ms', 0) / 1000:.1f}s "
+                        f"(quality tier: {results.get('quality_tier', 'full')})")
+                return results
             else:
                 add_log(f"Error analyzing company: Status code {response.status_code}", "error")
                 return None
@@ -273,35 +252,31 @@ def generate_wordcloud(articles):
     # Combine all article content
     all_text = " ".join([article.get('content', '') for article in articles])
     
-    # Generate word cloud
-    wordcloud = WordCloud(
+    # Key the cache on a digest so Streamlit doesn't hash the full text on every rerun
+    content_hash = hashlib.sha256(all_text.encode('utf-8')).hexdigest()
+    return render_wordcloud(content_hash, all_text)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_wordcloud(content_hash, _text):
+    """Render a word cloud to PNG bytes, cached by the hash of its text"""
+    wordcloud = wordcloud_lib.WordCloud(
         width=800, 
         height=400, 
         background_color='white',
         colormap='viridis',
         max_words=100
-    ).generate(all_text)
-    
-    # Convert to image
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis("off")
+    ).generate(_text)
     
-    # Save to buffer
+    # Render the image directly instead of through a matplotlib figure that has to be closed
     buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    
-    return buf
+    wordcloud.to_image().save(buf, format='png')
+    return buf.getvalue()
 
 def display_results(results):
     """Display analysis results"""
     if not results:
         return
     
-    # Clear previous logs for new analysis
-    st.session_state.backend_logs = []
-    
     # Company title with icon
     st.markdown(f"""
     <h1 style='text-align: center;'>
@@ -400,7 +375,7 @@ def display_results(results):
             st.metric("Topics Identified", len(results['comparative_sentiment_score']['topic_overlap']['common_topics'] + 
                                             results['comparative_sentiment_score']['topic_overlap']['unique_topics']))
         with col4:
-            st.metric("Processing Time", f"{round(len(results['articles']) * 1.5, 1)}s")
+            st.metric("Processing Time", f"{results.get('elapsed_ms', 0) / 1000:.1f}s")
             
         # Show example of translation process
         if len(results['articles']) > 0:
@@ -478,24 +453,25 @@ def main():
     if analyze_button and company_name:
         # Clear any previous results
         st.session_state.backend_logs = []
+        st.session_state.results = None
         
-        # Call API
-        results = analyze_company(company_name, num_articles)
-        
-        # Display results
-        if results:
-            display_results(results)
-            
-            # Add download button once results are available
-            download_placeholder.download_button(
-                label="📥 Download Results (JSON)",
-                data=json.dumps(results, indent=2),
-                file_name=f"{company_name.lower().replace(' ', '_')}_analysis.json",
-                mime="application/json"
-            )
+        # Call API and keep the results across reruns
+        st.session_state.results = analyze_company(company_name, num_articles)
     elif analyze_button:
         st.warning("Please select or enter a company name")
-    else:
+    
+    results = st.session_state.results
+    if results:
+        display_results(results)
+        
+        # Add download button once results are available
+        download_placeholder.download_button(
+            label="📥 Download Results (JSON)",
+            data=json.dumps(results, indent=2),
+            file_name=f"{results['company'].lower().replace(' ', '_')}_analysis.json",
+            mime="application/json"
+        )
+    elif not analyze_button:
         # Display landing page
         st.markdown("""
         <div style="text-align:center; padding: 30px;">
@@ -0,0 +1,114 @@
+from lazy_import import lazy_import
+
+pa = lazy_import('pyarrow')
+pa_ipc = lazy_import('pyarrow.ipc')
+pq = lazy_import('pyarrow.parquet')
+
+
+# Export formats and their media types
+FORMATS = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def export_schema(columns):
+    """
+    Build the Arrow schema of an export.
+
+    Args:
+        columns (tuple): Names from sentiment_store.EXPORT_COLUMNS, in output order
+
+    Returns:
+        pyarrow.Schema: Schema with one field per column
+    """
+    types = {
+        'id': pa.int64(),
+        'company': pa.string(),
+        'analyzed_at': pa.timestamp('ms', tz='UTC'),
+        'url': pa.string(),
+        'title': pa.string(),
+        'published_date': pa.string(),
+        'sentiment': pa.string(),
+        'compound': pa.float64(),
+        'topics': pa.list_(pa.string()),
+        'summary': pa.string()
+    }
+    return pa.schema([(column, types[column]) for column in columns])
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the generator streaming them."""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+        self._position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _record_batch(batch, schema):
+    arrays = []
+    for field in schema:
+        values = batch[field.name]
+        if field.name == 'analyzed_at':
+            # Stored as float seconds
+            values = [int(value * 1000) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def stream_export(batches, schema, fmt='arrow'):
+    """
+    Encode batches of stored articles as an Arrow IPC stream or a Parquet file, chunk by chunk.
+
+    Only one batch is held in memory at a time. In Parquet each batch
+    becomes a row group, and the footer is written after the last one.
+
+    Args:
+        batches: Iterable of column dicts, as yielded by SentimentStore.iter_articles
+        schema (pyarrow.Schema): Schema from export_schema
+        fmt (str): "arrow" or "parquet"
+
+    Yields:
+        bytes: Encoded output, ready to send
+    """
+    sink = _ChunkSink()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pa_ipc.new_stream(sink, schema)
+
+    try:
+        for batch in batches:
+            record_batch = _record_batch(batch, schema)
+            if fmt == 'parquet':
+                writer.write_table(pa.Table.from_batches([record_batch]))
+            else:
+                writer.write_batch(record_batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.drain()
+    if data:
+        yield data
@@ -0,0 +1,261 @@
+import os
+import time
+import sqlite3
+import threading
+import numpy as np
+from lazy_import import lazy_import
+
+sklearn_text = lazy_import('sklearn.feature_extraction.text')
+
+
+class ArticleIndex:
+    """
+    Class for finding similar articles with hashed-feature vectors and random-hyperplane LSH.
+
+    Several processes may share one directory. Row ids are allocated under
+    SQLite's write lock, and each process picks up rows added by the others
+    before it searches or inserts.
+    """
+
+    def __init__(self, directory='data/article_index', dim=256, num_tables=8, bits=12, seed=0,
+                 initial_capacity=1024):
+        """
+        Args:
+            directory (str): Directory holding the vector file and the metadata database
+            dim (int): Number of hashed features per article
+            num_tables (int): Number of LSH hash tables; more tables find more neighbours
+            bits (int): Hyperplanes per table; more bits make buckets smaller
+            seed (int): Seed for the hyperplanes, so codes are stable across restarts
+            initial_capacity (int): Rows allocated in the vector file before it first grows
+        """
+        self.directory = directory
+        self.dim = dim
+        self.num_tables = num_tables
+        self.bits = bits
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._vectorizer = None
+        rng = np.random.default_rng(seed)
+        self._hyperplanes = rng.standard_normal((num_tables * bits, dim)).astype(np.float32)
+        self._powers = (1 << np.arange(bits, dtype=np.int64))
+
+        self._conn = sqlite3.connect(os.path.join(directory, 'meta.db'), timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS articles ('
+            'id INTEGER PRIMARY KEY, url TEXT UNIQUE, title TEXT, company TEXT, '
+            'sentiment TEXT, summary TEXT, added_at REAL)')
+        self.count = self._stored_count()
+
+        self._vectors_path = os.path.join(directory, 'vectors.f32')
+        self._capacity = max(initial_capacity, self.count)
+        self._open_vectors(self._capacity)
+        self._buckets = [dict() for _ in range(num_tables)]
+        self._rebuild_buckets()
+
+    def _open_vectors(self, capacity):
+        """Map the vector file, growing it to hold capacity rows."""
+        size = capacity * self.dim * 4
+        mode = 'r+b' if os.path.exists(self._vectors_path) else 'w+b'
+        with open(self._vectors_path, mode) as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+        self._capacity = capacity
+
+    def _stored_count(self):
+        """Rows in the vector file that belong to committed articles, in every process."""
+        return self._conn.execute('SELECT COALESCE(MAX(id) + 1, 0) FROM articles').fetchone()[0]
+
+    def _refresh(self, count):
+        """Map and bucket the rows other processes added since this one last looked."""
+        if count <= self.count:
+            return
+        if count > self._capacity:
+            del self._vectors
+            self._open_vectors(max(self._capacity * 2, count))
+        self._add_to_buckets(np.arange(self.count, count), self._codes(self._vectors[self.count:count]))
+        self.count = count
+
+    def _rebuild_buckets(self):
+        """Recompute the LSH buckets of every stored vector, in chunks."""
+        for start in range(0, self.count, 8192):
+            end = min(start + 8192, self.count)
+            self._add_to_buckets(np.arange(start, end), self._codes(self._vectors[start:end]))
+
+    def _codes(self, vectors):
+        """LSH code of each vector in each table, shape (n, num_tables)."""
+        signs = (vectors @ self._hyperplanes.T) > 0
+        return signs.reshape(len(vectors), self.num_tables, self.bits).astype(np.int64) @ self._powers
+
+    def _add_to_buckets(self, ids, codes):
+        for row, article_id in zip(codes, ids):
+            for table, code in enumerate(row):
+                self._buckets[table].setdefault(int(code), []).append(int(article_id))
+
+    def vectorize(self, texts):
+        """
+        Turn texts into L2-normalized hashed-feature vectors.
+
+        Args:
+            texts (list): Texts to vectorize
+
+        Returns:
+            numpy.ndarray: float32 array of shape (len(texts), dim)
+        """
+        if self._vectorizer is None:
+            self._vectorizer = sklearn_text.HashingVectorizer(
+                n_features=self.dim, stop_words='english', alternate_sign=True, norm='l2')
+        return self._vectorizer.transform(texts).toarray().astype(np.float32)
+
+    @staticmethod
+    def _article_text(article):
+        return f"{article.get('title', '')} {article.get('content') or article.get('summary', '')}"
+
+    def add(self, company, articles):
+        """
+        Insert articles, skipping URLs that are already indexed.
+
+        Args:
+            company (str): Name of the company the articles were found for
+            articles (list): Processed article dictionaries
+
+        Returns:
+            int: Number of articles inserted
+        """
+        if not articles:
+            return 0
+        vectors = self.vectorize([self._article_text(article) for article in articles])
+
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so two processes can't claim the same rows
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._refresh(self._stored_count())
+                urls = [article['url'] for article in articles]
+                placeholders = ','.join('?' * len(urls))
+                known = {row[0] for row in self._conn.execute(
+                    f'SELECT url FROM articles WHERE url IN ({placeholders})', urls)}
+
+                new_rows = []
+                for i, article in enumerate(articles):
+                    if article['url'] not in known:
+                        known.add(article['url'])
+                        new_rows.append(i)
+                if not new_rows:
+                    self._conn.execute('COMMIT')
+                    return 0
+
+                start = self.count
+                end = start + len(new_rows)
+                if end > self._capacity:
+                    del self._vectors
+                    self._open_vectors(max(self._capacity * 2, end))
+                # The vectors are on disk before the rows that point at them are committed, so
+                # no process sees an article without its vector; a rollback leaves the rows unclaimed
+                self._vectors[start:end] = vectors[new_rows]
+                self._vectors.flush()
+
+                now = time.time()
+                self._conn.executemany(
+                    'INSERT INTO articles (id, url, title, company, sentiment, summary, added_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(start + offset, articles[i]['url'], articles[i].get('title'), company,
+                      articles[i].get('sentiment'), articles[i].get('summary'), now)
+                     for offset, i in enumerate(new_rows)])
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+            self._add_to_buckets(np.arange(start, end), self._codes(vectors[new_rows]))
+            self.count = end
+            return len(new_rows)
+
+    def search(self, text=None, url=None, k=10, company=None):
+        """
+        Find the articles most similar to a text or to an indexed article.
+
+        Candidates come from the LSH buckets the query falls into and are
+        ranked by exact cosine similarity. If the buckets hold fewer than k
+        candidates, every stored vector is scanned instead.
+
+        Args:
+            text (str): Text to find similar articles for
+            url (str): URL of an indexed article to find similar articles for
+            k (int): Number of results
+            company (str): Only return articles found for this company
+
+        Returns:
+            list: Article metadata dictionaries with a similarity score, best first
+
+        Raises:
+            KeyError: If url is given but not indexed
+        """
+        with self._lock:
+            self._refresh(self._stored_count())
+            exclude = None
+            if url is not None:
+                row = self._conn.execute('SELECT id FROM articles WHERE url = ?', (url,)).fetchone()
+                if row is None:
+                    raise KeyError(url)
+                exclude = row[0]
+                query = np.array(self._vectors[exclude], dtype=np.float32)
+            else:
+                query = self.vectorize([text or ''])[0]
+
+            if self.count == 0 or not query.any():
+                return []
+
+            candidates = set()
+            for table, code in enumerate(self._codes(query[None, :])[0]):
+                candidates.update(self._buckets[table].get(int(code), ()))
+            candidates.discard(exclude)
+
+            if len(candidates) >= k:
+                ids = np.sort(np.fromiter(candidates, dtype=np.int64))
+                scores = self._vectors[ids] @ query
+            else:
+                ids = np.arange(self.count)
+                scores = np.asarray(self._vectors[:self.count] @ query)
+                if exclude is not None:
+                    scores[exclude] = -np.inf
+
+            # Over-fetch when filtering by company, since the filter runs after ranking
+            limit = k if company is None else min(len(ids), k * 10)
+            top = np.argsort(-scores)[:limit]
+            results = self._metadata(ids[top], scores[top], company)
+            return results[:k]
+
+    def _metadata(self, ids, scores, company):
+        placeholders = ','.join('?' * len(ids))
+        rows = self._conn.execute(
+            f'SELECT id, url, title, company, sentiment, summary, added_at FROM articles WHERE id IN ({placeholders})',
+            [int(i) for i in ids]).fetchall()
+        by_id = {row[0]: row for row in rows}
+
+        results = []
+        for article_id, score in zip(ids, scores):
+            row = by_id.get(int(article_id))
+            if row is None or not np.isfinite(score):
+                continue
+            if company is not None and (row[3] or '').lower() != company.lower():
+                continue
+            results.append({
+                'url': row[1],
+                'title': row[2],
+                'company': row[3],
+                'sentiment': row[4],
+                'summary': row[5],
+                'added_at': row[6],
+                'score': float(score)
+            })
+        return results
+
+    def close(self):
+        with self._lock:
+            self._vectors.flush()
+            self._conn.close()
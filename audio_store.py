@@ -0,0 +1,393 @@
+import os
+import re
+import hmac
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import secrets
+import threading
+from contextlib import contextmanager
+
+
+class AudioStore:
+    """Class for storing generated audio under content-addressed filenames."""
+
+    FILENAME_PATTERN = re.compile(r'^[0-9a-f]{64}\.mp3$')
+
+    def __init__(self, directory='static/audio', max_bytes=200 * 1024 * 1024, janitor_interval=60,
+                 max_pending=256, pending_directory='data/audio_pending'):
+        """
+        Args:
+            directory (str): Directory holding the audio files
+            max_bytes (int): Disk quota for content-addressed audio files
+            janitor_interval (int): Seconds between janitor sweeps
+            max_pending (int): Texts registered for streaming that are remembered until first played
+            pending_directory (str): Directory holding the registered texts and their tokens; must not
+                be served to clients, as the tokens authorize synthesis
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.janitor_interval = janitor_interval
+        self.max_pending = max_pending
+        # Registered texts are kept on disk, so a stream request served by another worker finds them
+        self.pending_directory = pending_directory
+        # filename -> [lock, number of threads holding or waiting for it]
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._janitor = None
+        self._stop = threading.Event()
+        os.makedirs(self.directory, exist_ok=True)
+        os.makedirs(self.pending_directory, exist_ok=True)
+        # Texts used to be registered inside the audio directory, which is publicly served
+        shutil.rmtree(os.path.join(directory, 'pending'), ignore_errors=True)
+
+    def key_for(self, text, lang='hi'):
+        """
+        Get the content hash that names the audio for a piece of text.
+
+        Args:
+            text (str): Text that will be spoken
+            lang (str): Language the text is spoken in
+
+        Returns:
+            str: Hex SHA-256 digest
+        """
+        return hashlib.sha256(f"{lang}\0{text}".encode('utf-8')).hexdigest()
+
+    def path_for(self, filename):
+        """Return the on-disk path of a stored audio file."""
+        return os.path.join(self.directory, filename)
+
+    def is_valid_filename(self, filename):
+        """Return True if the filename is a content-addressed audio filename."""
+        return bool(self.FILENAME_PATTERN.match(filename))
+
+    def get_or_create(self, text, generate, lang='hi'):
+        """
+        Return the audio file for the text, generating it only if it is not on disk yet.
+
+        Concurrent calls for the same text in this process wait for a single
+        generation instead of each synthesizing it again.
+
+        Args:
+            text (str): Text to convert to speech
+            generate (callable): Called as generate(text, output_file); must write atomically
+            lang (str): Language the text is spoken in
+
+        Returns:
+            str: Filename of the audio, or None if generation failed
+        """
+        filename = f"{self.key_for(text, lang)}.mp3"
+        path = self.path_for(filename)
+
+        with self._generating(filename):
+            if os.path.exists(path):
+                self.touch(filename)
+                return filename
+            if generate(text, path) is None or not os.path.exists(path):
+                return None
+        return filename
+
+    def register(self, text, lang='hi'):
+        """
+        Remember a text so its audio can be streamed later by key.
+
+        The token that comes with the key authorizes synthesizing the audio,
+        so a stream URL can be handed to a browser without an API key.
+
+        Args:
+            text (str): Text that will be spoken
+            lang (str): Language the text is spoken in
+
+        Returns:
+            tuple: Key naming the audio, and the token stream needs to synthesize it
+        """
+        key = self.key_for(text, lang)
+        # Registering the same text again keeps the token already handed out for it
+        pending = self._pending(key)
+        token = pending['token'] if pending is not None else secrets.token_urlsafe(16)
+        path = self._pending_path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'text': text, 'token': token}, f)
+        os.replace(tmp_path, path)
+        self._prune_pending()
+        return key, token
+
+    def _pending_path(self, key):
+        return os.path.join(self.pending_directory, f"{key}.json")
+
+    def _pending(self, key):
+        """Read a registered text and its token, or None if it isn't registered."""
+        try:
+            with open(self._pending_path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _prune_pending(self):
+        """Forget the least recently registered texts beyond max_pending."""
+        entries = []
+        for name in os.listdir(self.pending_directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.pending_directory, name)
+            try:
+                entries.append((os.stat(path).st_mtime, path))
+            except OSError:
+                continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_pending)]:
+            self._forget(path)
+
+    def _forget(self, path):
+        """Remove a registered text; another worker may have removed it already."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stream(self, key, synthesize, token=None, chunk_size=64 * 1024):
+        """
+        Yield the audio for a key, synthesizing it progressively if it is not on disk yet.
+
+        Synthesized data is sent as soon as it is produced and written to a
+        temporary file alongside; only a stream that runs to completion is
+        renamed into place, so an interrupted or failed one leaves nothing
+        behind. Concurrent requests for a key in this process wait for the
+        one synthesizing it and then read the finished file.
+
+        Args:
+            key (str): Key returned by register
+            synthesize (callable): Called as synthesize(text), yielding MP3 data
+            token (str): Token returned by register; not needed once the audio is on disk
+            chunk_size (int): Bytes read at a time when the file is already on disk
+
+        Yields:
+            bytes: MP3 data
+
+        Raises:
+            KeyError: If the audio is not on disk, and isn't registered or the token doesn't match
+        """
+        filename = f"{key}.mp3"
+        path = self.path_for(filename)
+        if os.path.exists(path):
+            return self._stream(key, None, synthesize, chunk_size)
+        pending = self._pending(key)
+        if pending is None or not hmac.compare_digest(token or '', pending['token']):
+            raise KeyError(key)
+        return self._stream(key, pending['text'], synthesize, chunk_size)
+
+    def _read(self, path, chunk_size):
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def _stream(self, key, text, synthesize, chunk_size):
+        filename = f"{key}.mp3"
+        path = self.path_for(filename)
+        if os.path.exists(path):
+            self.touch(filename)
+            yield from self._read(path, chunk_size)
+            return
+
+        with self._generating(filename):
+            if os.path.exists(path):
+                self.touch(filename)
+                yield from self._read(path, chunk_size)
+                return
+
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            complete = False
+            try:
+                with open(tmp_path, 'wb') as f:
+                    for data in synthesize(text):
+                        f.write(data)
+                        yield data
+                complete = True
+            finally:
+                if complete and os.path.getsize(tmp_path) > 0:
+                    os.replace(tmp_path, path)
+                    self._forget(self._pending_path(key))
+                elif os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def touch(self, filename):
+        """Mark a file as recently used so the janitor evicts it last."""
+        try:
+            os.utime(self.path_for(filename))
+        except OSError:
+            pass
+
+    @contextmanager
+    def _generating(self, filename):
+        """
+        Hold the lock guarding generation of one file.
+
+        Locks exist only while a thread holds or waits for them, so a
+        long-lived process doesn't keep one for every text it ever spoke.
+        It is a plain Lock, since a stream may be resumed on a different
+        threadpool thread than the one that acquired it.
+        """
+        with self._locks_guard:
+            entry = self._locks.setdefault(filename, [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+        try:
+            yield
+        finally:
+            with self._locks_guard:
+                entry[0].release()
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[filename]
+
+    def enforce_quota(self):
+        """
+        Evict least recently used audio files until the store fits in its quota.
+
+        Only content-addressed files are considered, and temporary files left
+        behind by interrupted writes are removed once they are stale.
+
+        Returns:
+            int: Number of files removed
+        """
+        entries = []
+        total = 0
+        removed = 0
+        now = time.time()
+
+        for name in os.listdir(self.directory):
+            path = self.path_for(name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            if name.endswith('.tmp'):
+                if now - stat.st_mtime > self.janitor_interval:
+                    removed += self._remove(path)
+                continue
+
+            if self.is_valid_filename(name):
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total -= size
+
+        return removed
+
+    def _remove(self, path):
+        """Remove a file, returning 1 if it was removed and 0 otherwise."""
+        try:
+            os.remove(path)
+            return 1
+        except OSError as e:
+            print(f"Error removing audio file {path}: {e}")
+            return 0
+
+    def start_janitor(self):
+        """Start the background thread that enforces the disk quota."""
+        if self._janitor is not None:
+            return
+        self._stop.clear()
+        self._janitor = threading.Thread(target=self._run_janitor, name='audio-janitor', daemon=True)
+        self._janitor.start()
+
+    def stop_janitor(self):
+        """Stop the background janitor thread."""
+        self._stop.set()
+        if self._janitor is not None:
+            self._janitor.join()
+            self._janitor = None
+
+    def _run_janitor(self):
+        while not self._stop.wait(self.janitor_interval):
+            try:
+                self.enforce_quota()
+            except Exception as e:
+                print(f"Error in audio janitor: {e}")
+
+
+def parse_byte_range(header, size):
+    """
+    Parse a single-range HTTP Range header.
+
+    Args:
+        header (str): Value of the Range header, e.g. "bytes=0-1023"
+        size (int): Size of the resource in bytes
+
+    Returns:
+        tuple: Inclusive (start, end) offsets, or None if the header should be ignored
+
+    Raises:
+        ValueError: If the range cannot be satisfied
+    """
+    match = re.match(r'^bytes=(\d*)-(\d*)$', header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+
+    start, end = match.group(1), match.group(2)
+    if start == '':
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+
+    start = int(start)
+    end = size - 1 if end == '' else min(int(end), size - 1)
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def etag_matches(header, etag):
+    """
+    Check an If-None-Match header against an entity tag, using weak comparison.
+
+    Args:
+        header (str): Value of the header, e.g. '"abc", W/"def"' or '*', or None
+        etag (str): Quoted entity tag of the resource
+
+    Returns:
+        bool: True if the header lists the tag or is "*"
+    """
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # Weak comparison: W/"x" matches "x"
+    tags = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return etag.removeprefix('W/') in tags
+
+
+def if_range_matches(header, etag):
+    """
+    Check whether a Range request may be served partially under its If-Range header.
+
+    If-Range needs a strong match, so a weak tag on either side never
+    matches and the client gets the whole resource instead. Dates are not
+    supported as the audio has no Last-Modified header.
+
+    Args:
+        header (str): Value of the If-Range header, or None
+        etag (str): Quoted entity tag of the resource
+
+    Returns:
+        bool: True if there is no If-Range header or it names the current representation
+    """
+    if header is None:
+        return True
+    header = header.strip()
+    return not header.startswith('W/') and not etag.startswith('W/') and header == etag
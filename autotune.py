@@ -0,0 +1,280 @@
+"""
+Inference autotuner for the summarization model.
+
+Sweeps torch intra-op and inter-op thread counts and the BART batch size
+on this machine, summarizing a fixed corpus built from
+benchmarks/fixtures/corpus.json, and writes the fastest configuration to
+a profile that the API and workers apply at startup. Each thread
+configuration runs in fresh interpreters, as torch fixes its inter-op
+thread pool on first use.
+
+Thread counts are per process, so they are measured under the load they
+will see in production: --workers processes at once (WEB_CONCURRENCY
+gunicorn workers, or worker.py processes), each summarizing --in-flight
+documents at a time (the admission controller's max_in_flight; 1 for
+worker.py). Tuning one summarization at a time would pick thread counts
+that oversubscribe the CPUs once every worker is busy.
+
+The profile records the CPU topology it was tuned on. If the topology
+changes (a bigger instance, a different CPU quota), the profile is
+ignored until the host is tuned again; --check reports whether that is
+needed.
+
+Usage:
+    python autotune.py
+    python autotune.py --max-p95-ms 20000 --batch-sizes 1 2 4 8
+    python autotune.py --workers 4 --in-flight 1
+    python autotune.py --check
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from inference_profile import DEFAULT_PATH, cpu_topology, topology_fingerprint, save_profile
+
+
+RESULT_MARKER = 'AUTOTUNE_RESULT '
+READY_MARKER = 'AUTOTUNE_READY'
+CORPUS_PATH = os.path.join('benchmarks', 'fixtures', 'corpus.json')
+
+
+def load_documents(count, texts_per_document=8):
+    """
+    Build long documents from the fixed corpus, so each spans several model-sized chunks.
+
+    Args:
+        count (int): Number of documents
+        texts_per_document (int): Corpus texts joined into each document
+
+    Returns:
+        list: Document texts
+    """
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+    documents = []
+    for i in range(count):
+        # Rotate the corpus so the documents differ
+        texts = [corpus[(i + j) % len(corpus)] for j in range(texts_per_document)]
+        documents.append(' '.join(texts))
+    return documents
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _child(config):
+    """
+    Time every batch size under one thread configuration, as one of several worker processes.
+
+    Before each batch size the child reports that it is ready and waits for
+    a line on stdin, so all workers are timed over the same interval.
+    """
+    import torch
+
+    torch.set_num_threads(config['intra_op_threads'])
+    torch.set_num_interop_threads(config['inter_op_threads'])
+
+    from utils import SentimentAnalyzer
+
+    analyzer = SentimentAnalyzer()
+    analyzer.load_models()
+    documents = load_documents(config['documents'])
+
+    # Warm up the kernels once before timing
+    analyzer.summarize_text(documents[0])
+
+    def summarize(document):
+        call_start = time.perf_counter()
+        analyzer.summarize_text(document)
+        return (time.perf_counter() - call_start) * 1000
+
+    results = []
+    with ThreadPoolExecutor(max_workers=config['in_flight']) as pool:
+        for batch_size in config['batch_sizes']:
+            analyzer.summary_batch_size = batch_size
+            print(READY_MARKER, flush=True)
+            sys.stdin.readline()
+            start = time.perf_counter()
+            latencies = list(pool.map(summarize, documents * config['rounds']))
+            results.append({'latencies_ms': latencies, 'elapsed_s': time.perf_counter() - start})
+    return results
+
+
+def measure_threads(intra, inter, batch_sizes, documents, rounds, workers=1, in_flight=1):
+    """
+    Run one thread configuration in workers fresh interpreters at once.
+
+    Returns:
+        list: One measurement per batch size, with the throughput of all workers together
+    """
+    config = {
+        'intra_op_threads': intra,
+        'inter_op_threads': inter,
+        'batch_sizes': batch_sizes,
+        'documents': documents,
+        'rounds': rounds,
+        'in_flight': in_flight
+    }
+    directory = os.path.dirname(os.path.abspath(__file__))
+    procs = []
+    try:
+        for _ in range(workers):
+            # stderr goes to a file, as a full pipe would stall the child
+            stderr = tempfile.TemporaryFile(mode='w+')
+            proc = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--child', json.dumps(config)],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr, text=True, cwd=directory)
+            procs.append((proc, stderr))
+
+        def read_until(proc, marker):
+            for line in proc.stdout:
+                if line.startswith(marker):
+                    return line[len(marker):]
+            return None
+
+        def failed(proc, stderr):
+            proc.wait()
+            stderr.seek(0)
+            return RuntimeError(f"Tuning with {intra} intra-op / {inter} inter-op threads failed "
+                                f"with exit code {proc.returncode}:\n{stderr.read()[-2000:]}")
+
+        # Start every batch size in all workers together
+        for _ in batch_sizes:
+            for proc, stderr in procs:
+                if read_until(proc, READY_MARKER) is None:
+                    raise failed(proc, stderr)
+            for proc, _ in procs:
+                proc.stdin.write('\n')
+                proc.stdin.flush()
+
+        per_worker = []
+        for proc, stderr in procs:
+            result = read_until(proc, RESULT_MARKER)
+            if result is None:
+                raise failed(proc, stderr)
+            per_worker.append(json.loads(result))
+    finally:
+        for proc, stderr in procs:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            stderr.close()
+
+    measurements = []
+    for i, batch_size in enumerate(batch_sizes):
+        latencies = sorted(latency for worker in per_worker for latency in worker[i]['latencies_ms'])
+        elapsed = max(worker[i]['elapsed_s'] for worker in per_worker)
+        measurements.append({
+            'intra_op_threads': intra,
+            'inter_op_threads': inter,
+            'summary_batch_size': batch_size,
+            'throughput_per_s': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.5),
+            'p95_ms': percentile(latencies, 0.95)
+        })
+    return measurements
+
+
+def thread_candidates(usable_cpus):
+    """Powers of two up to the usable CPU count, plus the count itself."""
+    counts = []
+    count = 1
+    while count < usable_cpus:
+        counts.append(count)
+        count *= 2
+    counts.append(usable_cpus)
+    return counts
+
+
+def choose(measurements, max_p95_ms=None):
+    """
+    Pick the configuration with the highest throughput, within the p95 budget if one is given.
+
+    Returns:
+        dict: The chosen measurement, or None if none meets the budget
+    """
+    eligible = [m for m in measurements if max_p95_ms is None or m['p95_ms'] <= max_p95_ms]
+    if not eligible:
+        return None
+    return max(eligible, key=lambda m: (m['throughput_per_s'], -m['p95_ms']))
+
+
+def check(path):
+    """Report whether the profile at path matches this host. Returns the exit code."""
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except FileNotFoundError:
+        print(f"No inference profile at {path}; run autotune.py")
+        return 1
+    if profile.get('fingerprint') != topology_fingerprint(cpu_topology()):
+        print(f"CPU topology changed since {path} was tuned:\n"
+              f"  tuned:   {profile.get('topology')}\n  current: {cpu_topology()}")
+        return 1
+    print(f"Inference profile {path} matches this host: {profile['settings']}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune inference settings for this machine")
+    parser.add_argument('--output', default=os.environ.get('INFERENCE_PROFILE', DEFAULT_PATH),
+                        help="Profile file to write, defaults to INFERENCE_PROFILE")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--intra-op-threads', type=int, nargs='+', help="Defaults to powers of two up to the CPU count")
+    parser.add_argument('--inter-op-threads', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--documents', type=int, default=4, help="Documents summarized per round")
+    parser.add_argument('--rounds', type=int, default=2, help="Rounds over the documents per configuration")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', '2')),
+                        help="Processes running the model at once, defaults to WEB_CONCURRENCY as in gunicorn.conf.py")
+    parser.add_argument('--in-flight', type=int, default=2,
+                        help="Summarizations each process runs at once; the API admits 2, worker.py runs 1")
+    parser.add_argument('--max-p95-ms', type=float, help="Only pick configurations with a p95 latency below this")
+    parser.add_argument('--check', action='store_true', help="Exit non-zero if the profile needs re-tuning")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(RESULT_MARKER + json.dumps(_child(json.loads(args.child))), flush=True)
+        return 0
+    if args.check:
+        return check(args.output)
+
+    topology = cpu_topology()
+    intra_counts = args.intra_op_threads or thread_candidates(topology['usable_cpus'])
+    print(f"Tuning on {topology['model']} with {topology['usable_cpus']} usable CPUs, "
+          f"{args.workers} workers x {args.in_flight} in flight")
+
+    measurements = []
+    for intra in intra_counts:
+        for inter in args.inter_op_threads:
+            for m in measure_threads(intra, inter, args.batch_sizes, args.documents, args.rounds,
+                                     args.workers, args.in_flight):
+                measurements.append(m)
+                print(f"  intra {intra:>3}  inter {inter:>2}  batch {m['summary_batch_size']:>2}  "
+                      f"{m['throughput_per_s']:8.3f} docs/s  p50 {m['p50_ms']:9.1f} ms  p95 {m['p95_ms']:9.1f} ms")
+
+    best = choose(measurements, args.max_p95_ms)
+    if best is None:
+        print(f"No configuration has a p95 latency below {args.max_p95_ms} ms; profile not written")
+        return 1
+
+    settings = {
+        'intra_op_threads': best['intra_op_threads'],
+        'inter_op_threads': best['inter_op_threads'],
+        'summary_batch_size': best['summary_batch_size']
+    }
+    save_profile(settings, measurements, args.output,
+                 concurrency={'workers': args.workers, 'in_flight': args.in_flight})
+    print(f"Wrote {args.output}: {settings}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
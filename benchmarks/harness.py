@@ -0,0 +1,150 @@
+import os
+import json
+import math
+import time
+import resource
+import platform
+import threading
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class FixtureRequestHandler(SimpleHTTPRequestHandler):
+    """Serves recorded pages: /search returns the search page, /feed the RSS feed, /news/<file> an article."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURES_DIR, **kwargs)
+
+    def translate_path(self, path):
+        path = path.split('?', 1)[0]
+        if path.startswith('/search'):
+            path = '/search.html'
+        elif path.startswith('/news/'):
+            path = path[len('/news'):]
+        return super().translate_path(path)
+
+    def do_GET(self):
+        # The feed's links point at whatever address the server was started on
+        if self.path.startswith('/feed'):
+            with open(os.path.join(FIXTURES_DIR, 'feed.xml'), 'rb') as f:
+                body = f.read().replace(b'http://fixtures.invalid', f"http://{self.headers['Host']}".encode())
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/rss+xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """Local HTTP server for the recorded HTML fixtures, run in a background thread."""
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureRequestHandler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+def measure(func, iterations, warmup=1, items_per_call=1):
+    """
+    Time repeated calls of a function.
+
+    Args:
+        func (callable): Function to call with no arguments
+        iterations (int): Number of timed calls
+        warmup (int): Number of untimed calls first
+        items_per_call (int): Items processed per call, for throughput
+
+    Returns:
+        dict: Throughput, latency percentiles in milliseconds and peak RSS
+    """
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'throughput_per_s': iterations * items_per_call / total if total else 0.0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'mean_ms': sum(latencies) / len(latencies),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def compare(results, baseline, tolerance=0.2, metric='p50_ms'):
+    """
+    Compare benchmark results against a baseline.
+
+    Args:
+        results (dict): Benchmark name -> measurements from this run
+        baseline (dict): Benchmark name -> measurements from the baseline run
+        tolerance (float): Allowed relative slowdown
+        metric (str): Latency metric to compare
+
+    Returns:
+        list: Rows of (name, baseline value, current value, relative change, regressed)
+    """
+    rows = []
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name][metric]
+        after = current[metric]
+        change = (after - before) / before if before else 0.0
+        rows.append((name, before, after, change, change > tolerance))
+    return rows
+
+
+def save_results(path, results):
+    payload = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)['results']
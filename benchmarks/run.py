@@ -0,0 +1,280 @@
+"""
+End-to-end benchmark suite.
+
+Runs NewsExtractor against a local server that serves recorded HTML,
+SentimentAnalyzer on a fixed corpus, ComparativeAnalyzer at 10/100/1000
+articles, and /analyze through an in-process ASGI client with translation
+and TTS stubbed out. Nothing leaves the machine.
+
+Usage:
+    python benchmarks/run.py --output bench_results.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json --tolerance 0.2
+    python benchmarks/run.py --only comparative analyzer
+"""
+import os
+import sys
+import json
+import random
+import asyncio
+import hashlib
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import FIXTURES_DIR, FixtureServer, measure, compare, save_results, load_results
+
+
+COMPANY = 'Acme'
+ARTICLE_URLS = [f"/news/article-{i}.html" for i in range(1, 5)]
+TOPICS = ['Finance', 'Technology', 'Regulation', 'Expansion', 'Product', 'Leadership', 'Sustainability', 'General News']
+
+
+def load_corpus():
+    with open(os.path.join(FIXTURES_DIR, 'corpus.json')) as f:
+        return json.load(f)
+
+
+def synthetic_articles(count, seed=42):
+    """Build a reproducible list of processed articles for the comparative benchmarks."""
+    rng = random.Random(seed)
+    return [
+        {
+            'title': f"Article {i}",
+            'summary': '',
+            'content': '',
+            'url': f"https://example.com/news/{i}",
+            'sentiment': rng.choice(['Positive', 'Negative', 'Neutral']),
+            'topics': rng.sample(TOPICS, rng.randint(1, 3))
+        }
+        for i in range(count)
+    ]
+
+
+def local_scheduler(cache=True):
+    """Crawl scheduler for the fixture server: no rate limit to speak of, and a throwaway HTTP cache."""
+    from crawl_scheduler import CrawlScheduler
+
+    cache_dir = os.path.join(tempfile.mkdtemp(prefix='bench_http_cache_'), 'http_cache') if cache else None
+    return CrawlScheduler(rate=10000, burst=10000, max_rate=10000, cache_dir=cache_dir)
+
+
+def bench_extractor(server, scale):
+    from utils import NewsExtractor
+    from feed_source import FeedSource
+
+    extractor = NewsExtractor(search_url_templates=[f"{server.base_url}/search?q={{company}}"],
+                              scheduler=local_scheduler(cache=False), feed_source=FeedSource([]))
+    # Without an HTTP cache, so bytes per article compare the sources rather than revalidation
+    feed_extractor = NewsExtractor(search_url_templates=[f"{server.base_url}/search?q={{company}}"],
+                                   scheduler=local_scheduler(cache=False),
+                                   feed_source=FeedSource([f"{server.base_url}/feed?q={{company}}"]))
+    urls = [server.base_url + path for path in ARTICLE_URLS]
+    return {
+        'extractor.search_news': measure(lambda: extractor.search_news(COMPANY, len(urls)), 20 * scale),
+        'extractor.extract_article_content': measure(
+            lambda: [extractor.extract_article_content(url) for url in urls], 20 * scale, items_per_call=len(urls)),
+        'extractor.extract_articles': measure(
+            lambda: extractor.extract_articles(urls), 20 * scale, items_per_call=len(urls)),
+        'extractor.stream_articles': measure_bytes(
+            extractor, lambda: list(extractor.stream_articles(COMPANY, len(urls))), 20 * scale, len(urls)),
+        'extractor.stream_articles_feed': measure_bytes(
+            feed_extractor, lambda: list(feed_extractor.stream_articles(COMPANY, len(urls))), 20 * scale, len(urls))
+    }
+
+
+def measure_bytes(extractor, func, iterations, articles):
+    """Measure a call that produces articles, adding the bytes downloaded per article."""
+    before = extractor.scheduler.bytes_fetched
+    result = measure(func, iterations, items_per_call=articles)
+    result['bytes_per_article'] = (extractor.scheduler.bytes_fetched - before) / ((iterations + 1) * articles)
+    return result
+
+
+def bench_analyzer(server, scale):
+    from utils import SentimentAnalyzer
+
+    corpus = load_corpus()
+    analyzer = SentimentAnalyzer()
+    analyzer.load_models()
+    return {
+        'analyzer.analyze_sentiment': measure(
+            lambda: [analyzer.analyze_sentiment(text, translate=False) for text in corpus], 20 * scale,
+            items_per_call=len(corpus)),
+        'analyzer.summarize_text': measure(
+            lambda: [analyzer.summarize_text(text) for text in corpus], 2 * scale, items_per_call=len(corpus)),
+        'analyzer.extract_topics': measure(
+            lambda: [analyzer.extract_topics(text) for text in corpus], 20 * scale, items_per_call=len(corpus))
+    }
+
+
+def bench_comparative(server, scale):
+    from utils import ComparativeAnalyzer
+
+    comparative = ComparativeAnalyzer()
+    results = {}
+    for count in (10, 100, 1000):
+        articles = synthetic_articles(count)
+        results[f"comparative.{count}"] = measure(
+            lambda: comparative.perform_comparative_analysis(articles), max(5, 2000 // count) * scale,
+            items_per_call=count)
+    return results
+
+
+def publisher_bodies(count, publishers=('reuters', 'cnbc', 'bloomberg'), seed=42):
+    """Build article bodies that share each publisher's boilerplate around text drawn from the corpus."""
+    rng = random.Random(seed)
+    words = ' '.join(load_corpus()).split()
+    items = []
+    for i in range(count):
+        publisher = publishers[i % len(publishers)]
+        header = (f"{publisher.title()} News | Subscribe to our newsletter for the latest on markets, "
+                  f"technology and business. Follow {publisher.title()} on social media. ")
+        footer = (f" © {publisher.title()} Media Group. All rights reserved. Terms of use, privacy policy "
+                  "and cookie settings. Advertise with us. Contact the newsroom.")
+        body = header + ' '.join(rng.choice(words) for _ in range(rng.randint(200, 600))) + footer
+        items.append((f"https://www.{publisher}.com/news/{i}", body))
+    return items
+
+
+def bench_body_store(server, scale):
+    from body_store import BodyStore
+
+    store = BodyStore(os.path.join(tempfile.mkdtemp(prefix='bench_bodies_'), 'bodies.db'))
+    items = publisher_bodies(600)
+    ids = []
+    for start in range(0, len(items), 20):
+        ids.extend(store.put_many(items[start:start + 20]))
+    stats = store.stats()
+
+    results = {
+        'body_store.put_many': measure(lambda: store.put_many(items[:20]), 20 * scale, items_per_call=20),
+        'body_store.get': measure(lambda: [store.get(article_id) for article_id in ids[:100]], 20 * scale,
+                                  items_per_call=100),
+        'body_store.get_many': measure(lambda: store.get_many(ids), 10 * scale, items_per_call=len(ids)),
+        'body_store.iter_bodies': measure(lambda: sum(1 for _ in store.iter_bodies()), 10 * scale,
+                                          items_per_call=len(ids))
+    }
+    for result in results.values():
+        result['compression_ratio'] = stats['compression_ratio']
+    return results
+
+
+class StubTranslation:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubTranslator:
+    """Stands in for googletrans so the benchmark never calls Google."""
+
+    def translate(self, text, dest='en'):
+        return StubTranslation(text)
+
+
+class StubTTS:
+    """Stands in for gTTS, writing a small deterministic file instead of calling Google."""
+
+    def __init__(self, text, lang='hi'):
+        self.text = text
+
+    def write_to_fp(self, fp):
+        fp.write(b'ID3' + hashlib.sha256(self.text.encode('utf-8')).digest())
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            self.write_to_fp(f)
+
+
+def bench_api(server, scale):
+    import httpx
+    import api
+    from audio_store import AudioStore
+    from sentiment_store import SentimentStore
+    from article_index import ArticleIndex
+    from body_store import BodyStore
+    from alerts import SentimentMonitor
+    from feed_source import FeedSource
+
+    workdir = tempfile.mkdtemp(prefix='bench_api_')
+    api.news_extractor.search_url_templates = [f"{server.base_url}/search?q={{company}}"]
+    api.news_extractor.scheduler = local_scheduler()
+    api.news_extractor.feed_source = FeedSource([f"{server.base_url}/feed?q={{company}}"])
+    api.sentiment_analyzer.translator = StubTranslator()
+    api.tts_converter.translator = StubTranslator()
+    api.tts_converter.tts_engine = StubTTS
+    api.tts_converter.tts_available = True
+    api.audio_store = AudioStore(os.path.join(workdir, 'audio'))
+    api.sentiment_store = SentimentStore(os.path.join(workdir, 'sentiment.db'))
+    api.article_index = ArticleIndex(os.path.join(workdir, 'article_index'))
+    api.body_store = BodyStore(os.path.join(workdir, 'bodies.db'))
+    api.sentiment_monitor = SentimentMonitor(os.path.join(workdir, 'alerts.db'))
+    api.sentiment_analyzer.load_models()
+
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url='http://bench')
+    payload = {'company_name': COMPANY, 'num_articles': len(ARTICLE_URLS)}
+
+    def analyze():
+        response = loop.run_until_complete(client.post('/analyze', json=payload))
+        response.raise_for_status()
+
+    try:
+        return {'api.analyze': measure(analyze, 3 * scale)}
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.close()
+
+
+BENCHMARKS = {
+    'extractor': bench_extractor,
+    'analyzer': bench_analyzer,
+    'comparative': bench_comparative,
+    'body_store': bench_body_store,
+    'api': bench_api
+}
+
+
+def print_results(results):
+    print(f"{'benchmark':<36} {'items/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'rss MB':>8}")
+    for name, r in results.items():
+        print(f"{name:<36} {r['throughput_per_s']:>10.1f} {r['p50_ms']:>10.2f} {r['p95_ms']:>10.2f} "
+              f"{r['p99_ms']:>10.2f} {r['peak_rss_mb']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the end-to-end benchmark suite")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--scale', type=int, default=1, help="Multiply the number of iterations")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare p50 latency against this results file")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    results = {}
+    with FixtureServer() as server:
+        for name in args.only:
+            results.update(BENCHMARKS[name](server, args.scale))
+
+    print_results(results)
+    if args.output:
+        save_results(args.output, results)
+
+    if args.baseline:
+        regressed = False
+        print(f"\n{'benchmark':<36} {'baseline':>10} {'current':>10} {'change':>8}")
+        for name, before, after, change, is_regression in compare(results, load_results(args.baseline), args.tolerance):
+            regressed = regressed or is_regression
+            flag = '  REGRESSED' if is_regression else ''
+            print(f"{name:<36} {before:>10.2f} {after:>10.2f} {change:>+8.1%}{flag}")
+        if regressed:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+import os
+import time
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bodies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT UNIQUE,
+    publisher TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    dict_id INTEGER,
+    raw_size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bodies_publisher ON bodies (publisher, dict_id);
+CREATE TABLE IF NOT EXISTS dictionaries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    publisher TEXT NOT NULL,
+    data BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def publisher_of(url):
+    """Return the host an article was published on, without a leading "www."."""
+    host = (urlsplit(url or '').hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class BodyStore:
+    """
+    Class for storing fetched article bodies compressed with per-publisher zstd dictionaries.
+
+    Pages from one publisher share most of their boilerplate (bylines,
+    newsletter prompts, legal footers), which plain per-article compression
+    can't exploit because each body is compressed on its own. Once a
+    publisher has enough stored bodies, a dictionary is trained on them and
+    used for its later bodies, and the training samples are recompressed
+    with it. Without the zstandard package, bodies are stored uncompressed.
+
+    Several processes may share one database. Dictionaries another process
+    trained are loaded from it when a body needs them, and a publisher gets
+    a new dictionary only if the database has none for it yet.
+    """
+
+    def __init__(self, path='data/bodies.db', level=3, train_samples=64, dict_size=32768):
+        """
+        Args:
+            path (str): Path of the SQLite database file
+            level (int): zstd compression level
+            train_samples (int): Bodies a publisher needs before a dictionary is trained for it
+            dict_size (int): Size in bytes of each trained dictionary
+        """
+        self.path = path
+        self.level = level
+        self.train_samples = train_samples
+        self.dict_size = dict_size
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+        # Newest dictionary of each publisher, and every dictionary by id for reading
+        self._dictionaries = {}
+        self._publisher_dicts = {}
+        for dict_id, publisher, data in self._conn.execute(
+                'SELECT id, publisher, data FROM dictionaries ORDER BY id'):
+            self._load_dictionary(dict_id, publisher, data)
+        # Compressors keep internal state, so each thread gets its own; they go away with the thread
+        self._local = threading.local()
+
+    def _load_dictionary(self, dict_id, publisher, data):
+        if zstandard is None:
+            return
+        self._dictionaries[dict_id] = zstandard.ZstdCompressionDict(data)
+        self._publisher_dicts[publisher] = dict_id
+
+    def _dictionary(self, dict_id):
+        """Get a dictionary by id, reading it from the database if another process trained it."""
+        if dict_id is None:
+            return None
+        if dict_id not in self._dictionaries:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT publisher, data FROM dictionaries WHERE id = ?', (dict_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"Compression dictionary {dict_id} is missing")
+            self._dictionaries[dict_id] = zstandard.ZstdCompressionDict(row[1])
+        return self._dictionaries[dict_id]
+
+    def _compressor(self, dict_id):
+        compressors = self._local.__dict__.setdefault('compressors', {})
+        if dict_id not in compressors:
+            compressors[dict_id] = zstandard.ZstdCompressor(level=self.level, dict_data=self._dictionary(dict_id))
+        return compressors[dict_id]
+
+    def _decompressor(self, dict_id):
+        decompressors = self._local.__dict__.setdefault('decompressors', {})
+        if dict_id not in decompressors:
+            decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=self._dictionary(dict_id))
+        return decompressors[dict_id]
+
+    def _encode(self, publisher, text):
+        raw = text.encode('utf-8')
+        if zstandard is None:
+            return 'raw', None, len(raw), raw
+        dict_id = self._publisher_dicts.get(publisher)
+        return 'zstd', dict_id, len(raw), self._compressor(dict_id).compress(raw)
+
+    def _decode(self, codec, dict_id, data):
+        if codec == 'raw':
+            return bytes(data).decode('utf-8')
+        if zstandard is None:
+            raise RuntimeError("zstandard is needed to read compressed article bodies")
+        return self._decompressor(dict_id).decompress(data).decode('utf-8')
+
+    def put(self, url, content):
+        """
+        Store an article body, replacing any body already stored for the URL.
+
+        Args:
+            url (str): URL the body was fetched from
+            content (str): Article text
+
+        Returns:
+            int: Article id
+        """
+        return self.put_many([(url, content)])[0]
+
+    def put_many(self, items):
+        """
+        Store several article bodies in one transaction.
+
+        Args:
+            items (list): (url, content) pairs
+
+        Returns:
+            list: Article ids, in the order of items
+        """
+        ids = []
+        publishers = set()
+        with self._lock, self._conn:
+            for url, content in items:
+                publisher = publisher_of(url)
+                codec, dict_id, raw_size, data = self._encode(publisher, content or '')
+                self._conn.execute(
+                    'INSERT INTO bodies (url, publisher, codec, dict_id, raw_size, data) VALUES (?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (url) DO UPDATE SET publisher = excluded.publisher, codec = excluded.codec, '
+                    'dict_id = excluded.dict_id, raw_size = excluded.raw_size, data = excluded.data',
+                    (url, publisher, codec, dict_id, raw_size, data))
+                ids.append(self._conn.execute('SELECT id FROM bodies WHERE url = ?', (url,)).fetchone()[0])
+                publishers.add(publisher)
+
+        for publisher in publishers:
+            if zstandard is not None and publisher not in self._publisher_dicts:
+                self._maybe_train(publisher)
+        return ids
+
+    def _newest_dictionary(self, publisher):
+        """Load the publisher's newest dictionary from the database, if any process has trained one."""
+        row = self._conn.execute(
+            'SELECT id, data FROM dictionaries WHERE publisher = ? ORDER BY id DESC LIMIT 1', (publisher,)).fetchone()
+        if row is not None:
+            self._load_dictionary(row[0], publisher, row[1])
+        return row is not None
+
+    def _maybe_train(self, publisher):
+        """Train a dictionary for a publisher once it has enough bodies, then recompress them with it."""
+        with self._lock:
+            if publisher in self._publisher_dicts or self._newest_dictionary(publisher):
+                return
+            count = self._conn.execute('SELECT COUNT(*) FROM bodies WHERE publisher = ?', (publisher,)).fetchone()[0]
+            if count < self.train_samples:
+                return
+            rows = self._conn.execute(
+                'SELECT id, codec, dict_id, data FROM bodies WHERE publisher = ? ORDER BY id DESC LIMIT ?',
+                (publisher, self.train_samples * 4)).fetchall()
+            samples = [self._decode(codec, dict_id, data).encode('utf-8') for _, codec, dict_id, data in rows]
+            try:
+                dictionary = zstandard.train_dictionary(self.dict_size, samples, level=self.level)
+            except zstandard.ZstdError as e:
+                # Too little distinct text to train on yet; try again with the next bodies
+                print(f"Could not train a compression dictionary for {publisher}: {e}")
+                return
+
+            # BEGIN IMMEDIATE takes the write lock up front, so of two processes training at
+            # once, the second sees the first one's dictionary and uses it instead of its own
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                if self._newest_dictionary(publisher):
+                    self._conn.commit()
+                    return
+                cursor = self._conn.execute(
+                    'INSERT INTO dictionaries (publisher, data, created_at) VALUES (?, ?, ?)',
+                    (publisher, dictionary.as_bytes(), time.time()))
+                self._load_dictionary(cursor.lastrowid, publisher, dictionary.as_bytes())
+                compressor = self._compressor(cursor.lastrowid)
+                # Bodies replaced since they were read keep their new data
+                self._conn.executemany(
+                    "UPDATE bodies SET codec = 'zstd', dict_id = ?, data = ? WHERE id = ? AND data = ?",
+                    [(cursor.lastrowid, compressor.compress(sample), row[0], row[3])
+                     for row, sample in zip(rows, samples)])
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def get(self, article_id):
+        """
+        Read one article body.
+
+        Returns:
+            str: Article text, or None if no body has that id
+        """
+        return self.get_many([article_id]).get(article_id)
+
+    def get_url(self, url):
+        """Read the body stored for a URL, or None."""
+        with self._lock:
+            row = self._conn.execute('SELECT codec, dict_id, data FROM bodies WHERE url = ?', (url,)).fetchone()
+        return self._decode(*row) if row is not None else None
+
+    def get_many(self, article_ids):
+        """
+        Read several article bodies with one query, reusing a decompressor per dictionary.
+
+        Args:
+            article_ids (list): Article ids
+
+        Returns:
+            dict: Article id to text, for the ids that exist
+        """
+        article_ids = list(article_ids)
+        rows = []
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(article_ids), 500):
+                chunk = article_ids[start:start + 500]
+                rows.extend(self._conn.execute(
+                    f"SELECT id, codec, dict_id, data FROM bodies WHERE id IN ({', '.join('?' * len(chunk))})",
+                    chunk).fetchall())
+        return {article_id: self._decode(codec, dict_id, data) for article_id, codec, dict_id, data in rows}
+
+    def iter_bodies(self, publisher=None, batch_size=1000):
+        """
+        Read every stored body for reprocessing, in batches ordered by id.
+
+        Args:
+            publisher (str): Only read bodies of this publisher
+            batch_size (int): Rows read per query
+
+        Yields:
+            tuple: (article id, url, text)
+        """
+        query = 'SELECT id, url, codec, dict_id, data FROM bodies WHERE id > ?'
+        if publisher is not None:
+            query += ' AND publisher = ?'
+        query += ' ORDER BY id LIMIT ?'
+        last_id = 0
+        while True:
+            params = [last_id] + ([publisher] if publisher is not None else []) + [batch_size]
+            with self._lock:
+                rows = self._conn.execute(query, params).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            for article_id, url, codec, dict_id, data in rows:
+                yield article_id, url, self._decode(codec, dict_id, data)
+
+    def stats(self):
+        """
+        Report the space saved by compression.
+
+        Returns:
+            dict: Body count, raw and stored bytes and their ratio, overall and per publisher
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT publisher, COUNT(*), SUM(raw_size), SUM(LENGTH(data)), MAX(dict_id IS NOT NULL) '
+                'FROM bodies GROUP BY publisher ORDER BY SUM(raw_size) DESC').fetchall()
+            dictionary_bytes = self._conn.execute(
+                'SELECT COALESCE(SUM(LENGTH(data)), 0) FROM dictionaries').fetchone()[0]
+
+        publishers = {
+            publisher: {
+                'bodies': count,
+                'raw_bytes': raw,
+                'stored_bytes': stored,
+                'compression_ratio': raw / stored if stored else 0.0,
+                'dictionary': bool(has_dictionary)
+            }
+            for publisher, count, raw, stored, has_dictionary in rows
+        }
+        raw_bytes = sum(p['raw_bytes'] for p in publishers.values())
+        stored_bytes = sum(p['stored_bytes'] for p in publishers.values()) + dictionary_bytes
+        return {
+            'bodies': sum(p['bodies'] for p in publishers.values()),
+            'raw_bytes': raw_bytes,
+            'stored_bytes': stored_bytes,
+            'dictionary_bytes': dictionary_bytes,
+            'compression_ratio': raw_bytes / stored_bytes if stored_bytes else 0.0,
+            'publishers': publishers
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,541 @@
+import os
+import re
+import json
+import time
+import uuid
+import queue
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+
+USER_AGENT = 'NewsSentimentBot/1.0 (news summarization and sentiment analysis)'
+
+MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+class RobotsDisallowed(Exception):
+    """Raised when robots.txt does not allow fetching a URL."""
+
+    def __init__(self, url):
+        super().__init__(f"Disallowed by robots.txt: {url}")
+        self.url = url
+
+
+class CrawlResponse:
+    """Response of a scheduled fetch, either from the network or from the HTTP cache."""
+
+    def __init__(self, url, status_code, text, headers=None, from_cache=False, content=None):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        # Undecoded body; only kept for network responses, as the cache stores text
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+
+class DomainState:
+    """Token bucket, robots policy and back-off state of one domain."""
+
+    def __init__(self, rate, burst, max_rate):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.busy = False
+        self.robots = None
+        self.robots_expires = 0.0
+        # Consecutive robots.txt fetches that failed at the network level
+        self.robots_failures = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Seconds until a token is available, without taking it."""
+        self._refill(now)
+        wait_for_token = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait_for_token, self.blocked_until - now)
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class HTTPCache:
+    """
+    Class for storing fetched pages on disk with their validators.
+
+    Entries are evicted least recently used first once the cache outgrows
+    max_bytes, and regardless of size once unused for max_age seconds.
+    Eviction runs at most every sweep_interval seconds, after a write.
+    """
+
+    def __init__(self, directory='data/http_cache', max_bytes=256 * 1024 * 1024, max_age=7 * 86400,
+                 sweep_interval=300):
+        """
+        Args:
+            directory (str): Directory holding the cached pages
+            max_bytes (int): Disk quota for cached pages
+            max_age (int): Seconds an entry is kept after it was last written or read
+            sweep_interval (int): Minimum seconds between eviction sweeps
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self._swept_at = 0.0
+        self._sweep_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _write(self, path, entry):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self._maybe_sweep()
+
+    def _maybe_sweep(self):
+        # Fetch threads write concurrently; one of them sweeps, the others carry on
+        if time.monotonic() - self._swept_at < self.sweep_interval or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._swept_at = time.monotonic()
+            self.enforce_quota()
+        except OSError as e:
+            print(f"Error sweeping HTTP cache: {e}")
+        finally:
+            self._sweep_lock.release()
+
+    def enforce_quota(self):
+        """
+        Evict expired entries, then least recently used ones until the cache fits in its quota.
+
+        Temporary files left behind by interrupted writes are removed once they are stale.
+
+        Returns:
+            int: Number of files removed
+        """
+        entries = []
+        total = 0
+        removed = 0
+        now = time.time()
+
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith('.tmp'):
+                if now - stat.st_mtime > self.sweep_interval:
+                    removed += self._remove(path)
+            elif name.endswith('.json'):
+                if now - stat.st_mtime > self.max_age:
+                    removed += self._remove(path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total -= size
+        return removed
+
+    def _remove(self, path):
+        """Remove a file, returning 1 if it was removed and 0 otherwise."""
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def get(self, url):
+        """
+        Get a cached page.
+
+        Args:
+            url (str): URL of the page
+
+        Returns:
+            dict: Cached entry with text, etag, last_modified, fetched_at and max_age, or None
+        """
+        path = self._path(url)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Mark the entry as recently used, so eviction takes it last
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, url, text, headers):
+        """Store a page with the validators and freshness lifetime from its response headers."""
+        match = MAX_AGE_PATTERN.search(headers.get('Cache-Control', ''))
+        no_store = 'no-store' in headers.get('Cache-Control', '')
+        if no_store or not (headers.get('ETag') or headers.get('Last-Modified') or match):
+            return
+
+        entry = {
+            'url': url,
+            'text': text,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'max_age': int(match.group(1)) if match else 0
+        }
+        self._write(self._path(url), entry)
+
+    def refresh(self, url, entry):
+        """Restart the freshness lifetime of an entry after a 304 Not Modified."""
+        entry['fetched_at'] = time.time()
+        self._write(self._path(url), entry)
+
+
+class CrawlScheduler:
+    """Class for fetching pages politely: per-domain rate limits, robots.txt and conditional GET."""
+
+    def __init__(self, rate=1.0, burst=2, max_rate=4.0, max_workers=8, robots_ttl=86400,
+                 cache_dir='data/http_cache', user_agent=USER_AGENT, robots_retry=60):
+        """
+        Args:
+            rate (float): Starting requests per second allowed to each domain
+            burst (int): Requests a domain can receive back to back after being idle
+            max_rate (float): Ceiling the per-domain rate climbs back to while a domain keeps answering
+            max_workers (int): Number of fetches in flight at once, across all domains
+            robots_ttl (int): Seconds a robots.txt policy is cached
+            cache_dir (str): Directory of the HTTP cache, or None to disable it
+            user_agent (str): User-Agent sent with every request and matched against robots.txt
+            robots_retry (int): Seconds before a robots.txt that couldn't be reached is tried again;
+                doubled after every consecutive failure, up to 10 minutes
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_rate = max_rate
+        self.max_workers = max_workers
+        self.robots_ttl = robots_ttl
+        self.robots_retry = robots_retry
+        self.user_agent = user_agent
+        self.cache = HTTPCache(cache_dir) if cache_dir else None
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = user_agent
+        self.bytes_fetched = 0
+        self._domains = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    @staticmethod
+    def domain_of(url):
+        return urlsplit(url).netloc.lower()
+
+    def _state(self, domain):
+        state = self._domains.get(domain)
+        if state is None:
+            state = self._domains[domain] = DomainState(self.rate, self.burst, self.max_rate)
+        return state
+
+    def allowed(self, url, deadline=None):
+        """
+        Check robots.txt for a URL, fetching and caching the domain's policy when needed.
+
+        Args:
+            url (str): URL to check
+            deadline (Deadline): Optional time budget used to clamp the robots.txt fetch
+
+        Returns:
+            bool: True if the URL may be fetched
+        """
+        domain = self.domain_of(url)
+        with self._lock:
+            state = self._state(domain)
+            robots = state.robots if time.monotonic() < state.robots_expires else None
+        if robots is None:
+            robots = self._load_robots(url, state, deadline)
+        return robots.can_fetch(self.user_agent, url)
+
+    def _load_robots(self, url, state, deadline):
+        parts = urlsplit(url)
+        robots = RobotFileParser(f"{parts.scheme}://{parts.netloc}/robots.txt")
+        ttl = self.robots_ttl
+        unreachable = False
+        try:
+            timeout = deadline.timeout(10) if deadline is not None else 10
+            response = self.session.get(robots.url, timeout=timeout)
+            if response.status_code in (401, 403):
+                robots.disallow_all = True
+            elif response.status_code >= 500:
+                # Server errors mean "don't crawl for now", not "no rules"
+                robots.disallow_all = True
+                ttl = min(ttl, 600)
+            elif response.status_code >= 400:
+                robots.allow_all = True
+            else:
+                robots.parse(response.text.splitlines())
+        except requests.RequestException as e:
+            # A network error says nothing about the site's rules; one timeout shouldn't
+            # keep every article of the domain out, so crawl it, slowly, and ask again soon
+            print(f"Error fetching {robots.url}, allowing with backoff: {e}")
+            robots.allow_all = True
+            unreachable = True
+
+        crawl_delay = robots.crawl_delay(self.user_agent)
+        with self._lock:
+            if unreachable:
+                state.robots_failures += 1
+                ttl = min(ttl, 600, self.robots_retry * 2 ** (state.robots_failures - 1))
+                state.rate = max(state.rate / 2, 0.01)
+            else:
+                state.robots_failures = 0
+            state.robots = robots
+            state.robots_expires = time.monotonic() + ttl
+            if crawl_delay:
+                state.max_rate = min(state.max_rate, 1.0 / float(crawl_delay))
+                state.rate = min(state.rate, state.max_rate)
+        return robots
+
+    def fetch(self, url, deadline=None):
+        """
+        Fetch a page, waiting for the domain's rate limit and reusing the HTTP cache.
+
+        Args:
+            url (str): URL to fetch
+            deadline (Deadline): Optional time budget; the wait for a token and the request are clamped to it
+
+        Returns:
+            CrawlResponse: Status code and text of the page
+
+        Raises:
+            RobotsDisallowed: If robots.txt forbids the URL
+            TimeoutError: If the domain's rate limit would hold the request past the deadline
+            requests.RequestException: If the request fails
+        """
+        fresh = self._fresh_from_cache(url)
+        if fresh is not None:
+            return fresh
+
+        state = self._acquire(self.domain_of(url), deadline)
+        return self._fetch_reserved(url, state, deadline)
+
+    def _fresh_from_cache(self, url):
+        cached = self.cache.get(url) if self.cache else None
+        if cached and time.time() - cached['fetched_at'] < cached['max_age']:
+            return CrawlResponse(url, 200, cached['text'], from_cache=True)
+        return None
+
+    def _acquire(self, domain, deadline):
+        """Wait until the domain is idle and has a token, then take it and mark the domain busy."""
+        with self._lock:
+            state = self._state(domain)
+            while True:
+                delay = None if state.busy else state.delay(time.monotonic())
+                if delay == 0:
+                    break
+                remaining = deadline.remaining() if deadline is not None else None
+                if remaining is not None and (remaining <= 0 or (delay is not None and delay > remaining)):
+                    raise TimeoutError(f"Rate limit for {domain} outlasts the deadline")
+                self._idle.wait(delay if delay is not None else remaining)
+            state.take(time.monotonic())
+            state.busy = True
+        return state
+
+    def _fetch_reserved(self, url, state, deadline):
+        """Fetch a URL whose domain token has already been taken, then release the domain."""
+        try:
+            if not self.allowed(url, deadline):
+                raise RobotsDisallowed(url)
+            return self._request(url, state, self.cache.get(url) if self.cache else None, deadline)
+        finally:
+            with self._lock:
+                state.busy = False
+                self._idle.notify_all()
+
+    def _fetch_traced(self, url, state, deadline, trace):
+        """Run _fetch_reserved on a pool thread, sampled as part of the request's trace if there is one."""
+        with trace.thread('crawl-fetch') if trace is not None else nullcontext():
+            return self._fetch_reserved(url, state, deadline)
+
+    def _request(self, url, state, cached, deadline):
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        timeout = deadline.timeout(10) if deadline is not None else 10
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        self._adjust_rate(state, response)
+        with self._lock:
+            self.bytes_fetched += len(response.content)
+
+        if response.status_code == 304 and cached:
+            self.cache.refresh(url, cached)
+            return CrawlResponse(url, 200, cached['text'], response.headers, from_cache=True)
+        if response.status_code == 200 and self.cache:
+            try:
+                self.cache.put(url, response.text, response.headers)
+            except OSError as e:
+                print(f"Error caching {url}: {e}")
+        return CrawlResponse(url, response.status_code, response.text, response.headers, content=response.content)
+
+    def _adjust_rate(self, state, response):
+        """Halve the domain's rate when it pushes back, otherwise creep back up to its ceiling."""
+        with self._lock:
+            if response.status_code in (429, 503):
+                state.rate = max(state.rate / 2, 0.01)
+                retry_after = _retry_after_seconds(response.headers.get('Retry-After'))
+                if retry_after:
+                    state.blocked_until = max(state.blocked_until, time.monotonic() + retry_after)
+            elif response.status_code < 400:
+                state.rate = min(state.max_rate, state.rate + 0.1 * state.max_rate)
+
+    def fetch_many(self, urls, deadline=None):
+        """
+        Fetch several pages, taking turns between domains.
+
+        Args:
+            urls (list): URLs to fetch
+            deadline (Deadline): Optional time budget; URLs not started before it runs out are left out
+
+        Returns:
+            dict: URL -> CrawlResponse, or the exception its fetch raised
+        """
+        source = queue.Queue()
+        for url in urls:
+            source.put(url)
+        source.put(None)
+        return dict(self.fetch_stream(source, deadline))
+
+    def fetch_stream(self, source, deadline=None, trace=None):
+        """
+        Fetch URLs as they arrive on a queue, yielding each result as soon as it completes.
+
+        Each round gives every domain with a token available one request, so
+        one slow or strict source can't hold up the others. A domain never has
+        more than one request in flight. Nothing new is started while the
+        consumer is busy with a result, so a slow consumer holds back fetching.
+
+        Args:
+            source (queue.Queue): URLs to fetch, followed by None once there are no more
+            deadline (Deadline): Optional time budget; URLs not started before it runs out are left out
+            trace (RequestTrace): Optional trace whose profile also samples the fetching threads
+
+        Yields:
+            tuple: URL and its CrawlResponse, or the exception its fetch raised, in completion order
+        """
+        queues = OrderedDict()
+        seen = set()
+        running = {}
+        source_open = True
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while source_open or queues or running:
+                if deadline is not None and deadline.expired():
+                    queues.clear()
+                    source_open = False
+
+                # Take the URLs that have arrived, waiting for one only when there is nothing else to do
+                block = not queues and not running
+                while source_open:
+                    try:
+                        url = source.get(timeout=_remaining(deadline)) if block else source.get_nowait()
+                    except queue.Empty:
+                        break
+                    block = False
+                    if url is None:
+                        source_open = False
+                    elif url not in seen:
+                        seen.add(url)
+                        fresh = self._fresh_from_cache(url)
+                        if fresh is not None:
+                            yield url, fresh
+                        else:
+                            queues.setdefault(self.domain_of(url), deque()).append(url)
+
+                # One pass over the domains in round-robin order; a domain that
+                # gets a request moves to the back of the line
+                next_ready = None
+                for domain in list(queues):
+                    if len(running) >= self.max_workers:
+                        break
+                    with self._lock:
+                        state = self._state(domain)
+                        delay = None if state.busy else state.delay(time.monotonic())
+                        if delay == 0:
+                            state.take(time.monotonic())
+                            state.busy = True
+                    if delay is None:
+                        # Busy with a request made outside this stream; check back shortly
+                        delay = 0.05
+                    if delay > 0:
+                        next_ready = delay if next_ready is None else min(next_ready, delay)
+                        continue
+                    url = queues[domain].popleft()
+                    if queues[domain]:
+                        queues.move_to_end(domain)
+                    else:
+                        del queues[domain]
+                    running[executor.submit(self._fetch_traced, url, state, deadline, trace)] = url
+
+                timeout = next_ready if queues else None
+                if source_open:
+                    # Come back for URLs that arrive while fetches are in flight
+                    timeout = 0.05 if timeout is None else min(timeout, 0.05)
+                remaining = _remaining(deadline)
+                if remaining is not None and remaining > 0:
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                if not running:
+                    if queues:
+                        time.sleep(timeout or 0.05)
+                    continue
+
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = e
+                    yield url, result
+        finally:
+            # Every submitted fetch is already running, since at most max_workers are submitted
+            executor.shutdown(wait=False)
+
+
+def _remaining(deadline):
+    return deadline.remaining() if deadline is not None else None
+
+
+def _retry_after_seconds(value):
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,49 @@
+import time
+
+
+class Deadline:
+    """Class for tracking the remaining time budget of a request."""
+
+    def __init__(self, deadline_ms=None):
+        """
+        Args:
+            deadline_ms (int): Time budget in milliseconds, or None for no deadline
+        """
+        self.deadline_ms = deadline_ms
+        self.start = time.monotonic()
+        self.expires_at = None if deadline_ms is None else self.start + deadline_ms / 1000.0
+
+    def remaining(self):
+        """
+        Get the remaining budget.
+
+        Returns:
+            float: Seconds left (never negative), or None if there is no deadline
+        """
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        """Return True once the budget is used up."""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def timeout(self, default):
+        """
+        Clamp a network timeout to the remaining budget.
+
+        Args:
+            default (float): Timeout in seconds to use when the budget allows it
+
+        Returns:
+            float: Timeout in seconds, kept above zero so HTTP clients accept it
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(0.001, min(default, remaining))
+
+    def elapsed_ms(self):
+        """Return the milliseconds spent since the deadline was created."""
+        return int((time.monotonic() - self.start) * 1000)
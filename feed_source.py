@@ -0,0 +1,199 @@
+import io
+import re
+import html
+from urllib.parse import quote_plus
+from xml.etree.ElementTree import XMLPullParser
+
+
+# Namespaces used by Atom and by common RSS extensions
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+CONTENT_NS = '{http://purl.org/rss/1.0/modules/content/}'
+DC_NS = '{http://purl.org/dc/elements/1.1/}'
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+SPACE_PATTERN = re.compile(r'\s+')
+
+
+def _strip_html(text):
+    """Reduce an HTML snippet from a feed to plain text."""
+    return SPACE_PATTERN.sub(' ', html.unescape(TAG_PATTERN.sub(' ', text or ''))).strip()
+
+
+def _text(element, *tags):
+    """Return the text of the first of the child tags that is present and non-empty."""
+    for tag in tags:
+        child = element.find(tag)
+        if child is not None and child.text and child.text.strip():
+            return child.text.strip()
+    return None
+
+
+def _entry(element):
+    """Turn an RSS <item> or Atom <entry> element into an entry dictionary."""
+    if element.tag == 'item':
+        link = _text(element, 'link', 'guid')
+        summary = _text(element, f'{CONTENT_NS}encoded', 'description')
+        published = _text(element, 'pubDate', f'{DC_NS}date')
+        author = _text(element, 'author', f'{DC_NS}creator')
+        source = _text(element, 'source')
+    else:
+        link = None
+        for link_element in element.findall(f'{ATOM_NS}link'):
+            if link_element.get('rel', 'alternate') == 'alternate' and link_element.get('href'):
+                link = link_element.get('href')
+                break
+        summary = _text(element, f'{ATOM_NS}content', f'{ATOM_NS}summary')
+        published = _text(element, f'{ATOM_NS}published', f'{ATOM_NS}updated')
+        author = _text(element, f'{ATOM_NS}author/{ATOM_NS}name')
+        source = _text(element, f'{ATOM_NS}source/{ATOM_NS}title')
+
+    return {
+        'title': _strip_html(_text(element, 'title', f'{ATOM_NS}title')),
+        'url': link,
+        'summary': _strip_html(summary),
+        'published_date': published,
+        'author': author,
+        'source': source
+    }
+
+
+def parse_feed(source, chunk_size=16384):
+    """
+    Parse an RSS or Atom feed incrementally, yielding entries as they are read.
+
+    Each entry element is discarded once it has been turned into a
+    dictionary, so memory use doesn't grow with the size of the feed, and
+    the caller can stop reading as soon as it has enough entries.
+
+    Args:
+        source: The feed as bytes or str, or a file-like object; use parse_feed_file for paths
+        chunk_size (int): Bytes fed to the parser at a time
+
+    Yields:
+        dict: Entry with title, url, summary, published_date, author and source
+    """
+    if isinstance(source, str):
+        # Already decoded, so the parser must not re-decode it by the declared encoding
+        stream = io.StringIO(source.lstrip('\ufeff'))
+    elif isinstance(source, bytes):
+        stream = io.BytesIO(source)
+    else:
+        stream = source
+
+    parser = XMLPullParser(events=('end',))
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if chunk:
+                parser.feed(chunk)
+            else:
+                parser.close()
+            for _, element in parser.read_events():
+                if element.tag in ('item', f'{ATOM_NS}entry'):
+                    yield _entry(element)
+                    element.clear()
+            if not chunk:
+                break
+    finally:
+        if stream is not source:
+            stream.close()
+
+
+def parse_feed_file(path, chunk_size=16384):
+    """
+    Parse an RSS or Atom feed file incrementally, like parse_feed.
+
+    Args:
+        path (str): Path of the feed file
+        chunk_size (int): Bytes fed to the parser at a time
+
+    Yields:
+        dict: Entry with title, url, summary, published_date, author and source
+    """
+    with open(path, 'rb') as f:
+        yield from parse_feed(f, chunk_size)
+
+
+class FeedSource:
+    """Class for finding company news in RSS/Atom feeds instead of scraping search pages."""
+
+    FEED_URL_TEMPLATES = [
+        "https://news.google.com/rss/search?q={company}&hl=en-US&gl=US&ceid=US:en",
+        "https://www.bing.com/news/search?q={company}&format=rss"
+    ]
+
+    def __init__(self, feed_url_templates=None, min_summary_chars=400):
+        """
+        Args:
+            feed_url_templates (list): Feed URLs with a {company} placeholder, defaults to FEED_URL_TEMPLATES
+            min_summary_chars (int): Length at which a feed summary is used as the article text
+                instead of fetching the full page
+        """
+        self.feed_url_templates = self.FEED_URL_TEMPLATES if feed_url_templates is None else feed_url_templates
+        self.min_summary_chars = min_summary_chars
+
+    @staticmethod
+    def relevance_pattern(company_name, aliases=None):
+        """Compile a pattern that matches the company name or any alias as a whole word."""
+        names = [name.strip() for name in [company_name] + list(aliases or []) if name.strip()]
+        return re.compile(r'\b(?:' + '|'.join(re.escape(name) for name in names) + r')\b', re.IGNORECASE)
+
+    def entries(self, scheduler, company_name, aliases=None, deadline=None):
+        """
+        Yield feed entries that mention the company, across all configured feeds.
+
+        Args:
+            scheduler (CrawlScheduler): Fetcher used for the feeds
+            company_name (str): The name of the company
+            aliases (list): Other names the company is mentioned by
+            deadline (Deadline): Optional time budget; remaining feeds are skipped once it runs out
+
+        Yields:
+            dict: Relevant entry, each URL at most once
+        """
+        pattern = self.relevance_pattern(company_name, aliases)
+        seen = set()
+        for template in self.feed_url_templates:
+            if deadline is not None and deadline.expired():
+                break
+            feed_url = template.format(company=quote_plus(company_name))
+            try:
+                response = scheduler.fetch(feed_url, deadline=deadline)
+                if response.status_code != 200:
+                    print(f"Failed to fetch feed {feed_url}. Status code: {response.status_code}")
+                    continue
+                # The raw bytes let the parser use the feed's declared encoding rather than requests' guess
+                body = response.content if response.content is not None else response.text
+                entries = list(self._relevant(parse_feed(body), pattern))
+            except Exception as e:
+                print(f"Error reading feed {feed_url}: {e}")
+                continue
+
+            for entry in entries:
+                if entry['url'] not in seen:
+                    seen.add(entry['url'])
+                    yield entry
+
+    def _relevant(self, entries, pattern):
+        for entry in entries:
+            if entry['url'] and (pattern.search(entry['title']) or pattern.search(entry['summary'])):
+                yield entry
+
+    def is_self_sufficient(self, entry):
+        """Return True if the entry's own summary is long enough to analyze without fetching the page."""
+        return len(entry['summary']) >= self.min_summary_chars
+
+    def to_article(self, entry):
+        """
+        Build an article dictionary from a feed entry alone.
+
+        Returns:
+            dict: Dictionary containing title, content, and other metadata, like NewsExtractor.extract_article_content
+        """
+        return {
+            'title': entry['title'] or "No title found",
+            'content': entry['summary'],
+            'url': entry['url'],
+            'published_date': entry['published_date'] or "Date not found",
+            'author': entry['author'] or "Author not found"
+        }
@@ -0,0 +1,27 @@
+"""
+Gunicorn settings for running the API with worker recycling.
+
+Gunicorn supervises several uvicorn workers. When a worker's memory
+watchdog (MAX_RSS_MB) shuts it down, or it has served MAX_REQUESTS
+requests, gunicorn forks a replacement. Each worker applies the
+inference profile and loads BART itself at startup: torch's OpenMP and
+intra-op thread pools don't survive a fork, so the model is never
+loaded in the master.
+
+Usage:
+    MAX_RSS_MB=3000 gunicorn -c gunicorn.conf.py api:app
+"""
+import os
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+# Restart each worker after about MAX_REQUESTS requests; the jitter keeps workers from restarting together
+max_requests = int(os.environ.get('MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+# A recycling worker stops accepting connections at once and gives in-flight requests this long to finish
+graceful_timeout = 150
+timeout = 300
@@ -0,0 +1,126 @@
+import os
+import json
+import uuid
+import hashlib
+import platform
+
+from lazy_import import lazy_import
+
+torch = lazy_import('torch')
+
+
+DEFAULT_PATH = 'data/inference_profile.json'
+
+# Process that last set torch's thread counts; the inter-op pool can only be sized once per process
+_threads_applied_pid = None
+
+
+def cpu_topology():
+    """
+    Describe the CPUs this process can run on.
+
+    Returns:
+        dict: Machine type, CPU model, logical CPU count and the CPUs in the process's affinity mask
+    """
+    model = platform.processor()
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    model = line.split(':', 1)[1].strip()
+                    break
+    except OSError:
+        pass
+
+    # Containers often get fewer CPUs than the host has
+    usable = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    return {
+        'machine': platform.machine(),
+        'model': model,
+        'logical_cpus': os.cpu_count(),
+        'usable_cpus': usable
+    }
+
+
+def topology_fingerprint(topology):
+    """Hash a topology so profiles can be matched to the host they were tuned on."""
+    return hashlib.sha256(json.dumps(topology, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def save_profile(settings, measurements, path=DEFAULT_PATH, concurrency=None):
+    """
+    Write a tuned profile for the current host, atomically.
+
+    Args:
+        settings (dict): intra_op_threads, inter_op_threads and summary_batch_size
+        measurements (list): Results of every configuration tried
+        path (str): Path of the profile file
+        concurrency (dict): Worker processes and summarizations per process the settings were tuned under
+    """
+    topology = cpu_topology()
+    profile = {
+        'topology': topology,
+        'fingerprint': topology_fingerprint(topology),
+        'concurrency': concurrency,
+        'settings': settings,
+        'measurements': measurements
+    }
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_profile(path=DEFAULT_PATH):
+    """
+    Read the tuned profile if it was tuned on this CPU topology.
+
+    Returns:
+        dict: The profile, or None if there is none or the CPUs changed since it was tuned
+    """
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Error reading inference profile {path}: {e}")
+        return None
+
+    if profile.get('fingerprint') != topology_fingerprint(cpu_topology()):
+        print(f"Inference profile {path} was tuned for different CPUs ({profile.get('topology')}); "
+              f"using library defaults. Re-run autotune.py on this host.")
+        return None
+    return profile
+
+
+def apply_profile(profile, analyzer):
+    """
+    Apply a profile's thread counts to torch and its batch size to a SentimentAnalyzer.
+
+    Must run before the model does any work, as torch fixes its inter-op
+    thread pool on first use. The thread counts are set once per process;
+    later calls only set the batch size.
+
+    Args:
+        profile (dict): Profile from load_profile, or None to leave the defaults
+        analyzer (SentimentAnalyzer): Analyzer to configure
+
+    Returns:
+        bool: True if a profile was applied
+    """
+    if profile is None:
+        return False
+    global _threads_applied_pid
+    settings = profile['settings']
+    if _threads_applied_pid != os.getpid():
+        _threads_applied_pid = os.getpid()
+        torch.set_num_threads(settings['intra_op_threads'])
+        try:
+            torch.set_num_interop_threads(settings['inter_op_threads'])
+        except RuntimeError as e:
+            print(f"Could not set inter-op threads: {e}")
+    analyzer.summary_batch_size = settings['summary_batch_size']
+    return True
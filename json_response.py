@@ -0,0 +1,78 @@
+import gzip
+import orjson
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Bodies smaller than this are sent uncompressed; the framing overhead isn't worth it
+MINIMUM_COMPRESS_SIZE = 1024
+
+
+def accepted_encodings(accept_encoding):
+    """
+    Parse an Accept-Encoding header into the encodings the client accepts.
+
+    Encodings with q=0 are refused, and "*" stands for every encoding not
+    listed by name.
+
+    Args:
+        accept_encoding (str): Value of the header
+
+    Returns:
+        dict: Encoding name to q-value, including "*" if present
+    """
+    qualities = {}
+    for part in accept_encoding.split(','):
+        name, *params = [piece.strip() for piece in part.split(';')]
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    return qualities
+
+
+def _accepts(qualities, encoding):
+    return qualities.get(encoding, qualities.get('*', 0.0)) > 0
+
+
+def compressed_json_response(content, accept_encoding='', status_code=200, headers=None):
+    """
+    Serialize content with orjson and compress it for the client.
+
+    Brotli is preferred when the client accepts it and the brotli package is
+    installed, then gzip, then the plain body.
+
+    Args:
+        content: JSON-serializable content
+        accept_encoding (str): Value of the request's Accept-Encoding header
+        status_code (int): HTTP status code
+        headers (dict): Extra response headers
+
+    Returns:
+        Response: JSON response, possibly compressed
+    """
+    body = orjson.dumps(content)
+    headers = dict(headers or {})
+    headers['Vary'] = 'Accept-Encoding'
+
+    if len(body) >= MINIMUM_COMPRESS_SIZE:
+        encodings = accepted_encodings(accept_encoding)
+        if brotli is not None and _accepts(encodings, 'br'):
+            body = brotli.compress(body, quality=5)
+            headers['Content-Encoding'] = 'br'
+        elif _accepts(encodings, 'gzip'):
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+
+    return Response(content=body, status_code=status_code, media_type='application/json', headers=headers)
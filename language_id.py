@@ -0,0 +1,207 @@
+import os
+import re
+import json
+import math
+import hashlib
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+
+
+# Languages scored by the n-gram model; names match the langdetect profile files
+PROFILE_LANGUAGES = ['en', 'fr', 'de', 'es', 'it', 'pt', 'nl', 'sv', 'da', 'no', 'fi', 'pl', 'tr', 'id', 'ro', 'cs']
+
+# Scripts that identify a single language on their own
+SCRIPT_LANGUAGES = {
+    'DEVANAGARI': 'hi',
+    'BENGALI': 'bn',
+    'TAMIL': 'ta',
+    'TELUGU': 'te',
+    'GUJARATI': 'gu',
+    'GURMUKHI': 'pa',
+    'KANNADA': 'kn',
+    'MALAYALAM': 'ml',
+    'ARABIC': 'ar',
+    'CYRILLIC': 'ru',
+    'GREEK': 'el',
+    'HEBREW': 'he',
+    'HANGUL': 'ko',
+    'HIRAGANA': 'ja',
+    'KATAKANA': 'ja',
+    'CJK': 'zh-cn',
+    'THAI': 'th'
+}
+
+ENGLISH_STOPWORDS = frozenset([
+    'the', 'and', 'of', 'to', 'in', 'a', 'is', 'that', 'for', 'on', 'with', 'as', 'was', 'it', 'by',
+    'at', 'its', 'from', 'has', 'have', 'be', 'are', 'said', 'this', 'an', 'will', 'not', 'or', 'but'
+])
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+
+class LanguageIdentifier:
+    """Class for fast, cached language identification of whole documents."""
+
+    def __init__(self, profile_dir=None, top_ngrams=1000, max_chars=2000, cache_size=4096):
+        """
+        Args:
+            profile_dir (str): Directory of langdetect-format n-gram profiles, defaults to the ones shipped with langdetect
+            top_ngrams (int): Number of trigrams kept per language profile
+            max_chars (int): Characters of each document that are examined
+            cache_size (int): Number of results cached by content hash
+        """
+        self.profile_dir = profile_dir
+        self.top_ngrams = top_ngrams
+        self.max_chars = max_chars
+        self.cache_size = cache_size
+        self._profiles = None
+        self._floor = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def identify(self, text):
+        """
+        Identify the language of a document.
+
+        Args:
+            text (str): Document text
+
+        Returns:
+            tuple: Language code (None if unknown) and confidence between 0 and 1
+        """
+        key = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).digest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        result = self._identify_uncached(text[:self.max_chars])
+
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def identify_batch(self, texts):
+        """
+        Identify the language of several documents.
+
+        Args:
+            texts (list): Document texts
+
+        Returns:
+            list: (language, confidence) tuples in the same order as texts
+        """
+        return [self.identify(text) for text in texts]
+
+    def _identify_uncached(self, text):
+        words = WORD_PATTERN.findall(text.lower())
+        if not words:
+            return None, 0.0
+
+        # Fast path 1: a non-Latin script that maps to one language
+        language, share = self._dominant_script(words)
+        if language is not None and share >= 0.6:
+            return language, share
+
+        # Fast path 2: plain ASCII text full of English function words
+        ascii_words = sum(1 for word in words if word.isascii())
+        stopword_share = sum(1 for word in words if word in ENGLISH_STOPWORDS) / len(words)
+        if ascii_words / len(words) >= 0.95 and stopword_share >= 0.15:
+            return 'en', min(1.0, 0.7 + stopword_share)
+
+        return self._score_ngrams(words)
+
+    def _dominant_script(self, words):
+        scripts = Counter()
+        letters = 0
+        for word in words:
+            for char in word:
+                letters += 1
+                if char.isascii():
+                    continue
+                name = unicodedata.name(char, '')
+                for script in SCRIPT_LANGUAGES:
+                    if name.startswith(script):
+                        scripts[script] += 1
+                        break
+
+        if not scripts:
+            return None, 0.0
+        script, count = scripts.most_common(1)[0]
+        return SCRIPT_LANGUAGES[script], count / letters
+
+    def _score_ngrams(self, words):
+        profiles = self._load_profiles()
+        if not profiles:
+            return None, 0.0
+
+        grams = Counter()
+        for word in words:
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                grams[padded[i:i + 3]] += 1
+        total = sum(grams.values())
+        if not total:
+            return None, 0.0
+
+        scores = {}
+        coverage = {}
+        for language, profile in profiles.items():
+            floor = self._floor[language]
+            score = 0.0
+            seen = 0
+            for gram, count in grams.items():
+                log_prob = profile.get(gram)
+                if log_prob is None:
+                    score += count * floor
+                else:
+                    score += count * log_prob
+                    seen += count
+            scores[language] = score
+            coverage[language] = seen / total
+
+        # Naive Bayes posterior over the profiled languages, discounted by how
+        # many of the document's trigrams the winning profile has seen at all
+        best = max(scores, key=scores.get)
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, coverage[best] / normalizer
+
+    def _load_profiles(self):
+        if self._profiles is not None:
+            return self._profiles
+
+        profile_dir = self.profile_dir
+        if profile_dir is None:
+            try:
+                import langdetect
+                profile_dir = os.path.join(os.path.dirname(langdetect.__file__), 'profiles')
+            except ImportError:
+                print("Warning: langdetect not available, n-gram language profiles disabled.")
+                self._profiles = {}
+                return self._profiles
+
+        profiles = {}
+        for language in PROFILE_LANGUAGES:
+            path = os.path.join(profile_dir, language)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading language profile {path}: {e}")
+                continue
+
+            trigram_total = data['n_words'][2]
+            trigrams = [(gram, count) for gram, count in data['freq'].items() if len(gram) == 3]
+            trigrams.sort(key=lambda item: -item[1])
+            kept = trigrams[:self.top_ngrams]
+            if not kept:
+                continue
+            profiles[language] = {gram: math.log(count / trigram_total) for gram, count in kept}
+            # Unseen trigrams score a bit below the rarest kept one
+            self._floor[language] = math.log(kept[-1][1] / trigram_total) - math.log(10)
+
+        self._profiles = profiles
+        return self._profiles
@@ -0,0 +1,46 @@
+import time
+import types
+import importlib
+
+
+# Seconds spent importing each lazily loaded module, filled in on first use
+LOAD_TIMES = {}
+
+
+class LazyModule(types.ModuleType):
+    """Module stand-in that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            start = time.perf_counter()
+            self._module = importlib.import_module(self.__name__)
+            LOAD_TIMES[self.__name__] = time.perf_counter() - start
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    @property
+    def is_loaded(self):
+        """True once the real module has been imported."""
+        return self._module is not None
+
+
+def lazy_import(name):
+    """
+    Defer importing a module until one of its attributes is used.
+
+    Args:
+        name (str): Dotted module name, e.g. "sklearn.feature_extraction.text"
+
+    Returns:
+        LazyModule: Proxy for the module
+    """
+    return LazyModule(name)
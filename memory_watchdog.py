@@ -0,0 +1,168 @@
+import os
+import time
+import signal
+import resource
+import platform
+import threading
+import tracemalloc
+from collections import deque
+
+
+def current_rss_mb():
+    """Resident set size of this process now, in MB; the peak where the current value isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+class MemoryWatchdog:
+    """
+    Class for watching the memory of a long-running API process and recycling it before it grows too large.
+
+    A background thread samples RSS. Once RSS passes max_rss_mb, the
+    process sends itself SIGTERM. Uvicorn then shuts down gracefully: it
+    stops accepting connections, so new requests go to the other workers,
+    and lets in-flight requests finish within gunicorn's graceful_timeout.
+    A supervisor (gunicorn, see gunicorn.conf.py) then starts a fresh worker,
+    which loads the models before it accepts requests. Recycling after a
+    number of requests is left to gunicorn's max_requests.
+    """
+
+    def __init__(self, max_rss_mb=None, interval=10, history=360, tracemalloc_frames=0):
+        """
+        Args:
+            max_rss_mb (float): RSS in MB at which the process is recycled, or None for no ceiling
+            interval (float): Seconds between RSS samples
+            history (int): RSS samples kept for the diagnostics endpoint
+            tracemalloc_frames (int): Frames tracemalloc keeps per allocation, or 0 to leave it off;
+                tracing costs CPU and memory, so enable it only while looking for a leak
+        """
+        self.max_rss_mb = max_rss_mb
+        self.interval = interval
+        self.tracemalloc_frames = tracemalloc_frames
+        self.requests = 0
+        self.started_at = time.time()
+        self.recycle_reason = None
+        self.samples = deque(maxlen=history)
+        self._baseline = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling, and tracing allocations if configured."""
+        if self._thread is not None:
+            return
+        if self.tracemalloc_frames and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+            self._baseline = tracemalloc.take_snapshot()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='memory-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def request_finished(self):
+        """Count a served request."""
+        with self._lock:
+            self.requests += 1
+
+    def sample(self):
+        """Record the current RSS and return it in MB."""
+        rss = current_rss_mb()
+        self.samples.append((time.time(), rss))
+        return rss
+
+    def check(self, rss_mb):
+        """
+        Decide whether the process should be recycled.
+
+        Returns:
+            str: Reason to recycle, or None
+        """
+        if self.max_rss_mb is not None and rss_mb >= self.max_rss_mb:
+            return f"RSS {rss_mb:.0f} MB reached the {self.max_rss_mb:.0f} MB ceiling"
+        return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                reason = self.check(self.sample())
+            except Exception as e:
+                print(f"Error in memory watchdog: {e}")
+                continue
+            if reason is not None:
+                self.recycle(reason)
+                return
+
+    def recycle(self, reason):
+        """Ask the server to shut down gracefully; it finishes in-flight requests but accepts no new ones."""
+        self.recycle_reason = reason
+        print(f"Recycling worker {os.getpid()}: {reason}")
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def top_allocations(self, limit=15):
+        """
+        Get the source lines that allocated the most memory still alive, with growth since tracing started.
+
+        Returns:
+            list: Dicts with location, size_kb, size_diff_kb and count, largest first; empty when not tracing
+        """
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        if self._baseline is not None:
+            stats = snapshot.compare_to(self._baseline, 'lineno')
+        else:
+            stats = snapshot.statistics('lineno')
+        return [
+            {
+                'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'size_kb': round(stat.size / 1024, 1),
+                'size_diff_kb': round(getattr(stat, 'size_diff', stat.size) / 1024, 1),
+                'count': stat.count
+            }
+            for stat in stats[:limit]
+        ]
+
+    def stats(self, top=15):
+        """
+        Report the process's memory use and how close it is to being recycled.
+
+        Args:
+            top (int): Number of top allocation sites to include
+
+        Returns:
+            dict: Current and peak RSS, recent samples, the RSS ceiling, request count and top allocations
+        """
+        return {
+            'pid': os.getpid(),
+            'uptime_s': round(time.time() - self.started_at, 1),
+            'rss_mb': round(current_rss_mb(), 1),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'max_rss_mb': self.max_rss_mb,
+            'requests': self.requests,
+            'recycling': self.recycle_reason is not None,
+            'recycle_reason': self.recycle_reason,
+            'samples': [{'at': at, 'rss_mb': round(rss, 1)} for at, rss in list(self.samples)],
+            'tracemalloc': tracemalloc.is_tracing(),
+            'top_allocations': self.top_allocations(top)
+        }
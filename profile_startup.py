@@ -0,0 +1,260 @@
+"""
+Cold-start profiler for the API and the Streamlit app.
+
+Each target is started in a fresh interpreter with -X importtime and with
+Hugging Face downloads disabled, so it can run offline in CI. The import
+times are aggregated per top-level package and combined with model load
+time and first-request (or first-render) latency.
+
+Usage:
+    python profile_startup.py --output startup_profile.json
+    python profile_startup.py --baseline startup_baseline.json --tolerance 0.25
+    python profile_startup.py --save-baseline startup_baseline.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+from collections import defaultdict
+
+
+APP_SCRIPT = 'app (2).py'
+CORPUS_PATH = os.path.join('benchmarks', 'fixtures', 'corpus.json')
+RESULT_MARKER = 'PROFILE_RESULT '
+
+# Keep model loading on the local cache and fail fast on any network access
+OFFLINE_ENV = {
+    'HF_HUB_OFFLINE': '1',
+    'TRANSFORMERS_OFFLINE': '1',
+    'HF_DATASETS_OFFLINE': '1',
+    'STREAMLIT_BROWSER_GATHER_USAGE_STATS': 'false'
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(stderr):
+    """
+    Aggregate -X importtime output by top-level package.
+
+    Args:
+        stderr (str): Standard error of a process run with -X importtime
+
+    Returns:
+        dict: Total seconds of self time per top-level package, slowest first
+    """
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us = int(match.group(1))
+        package = match.group(4).split('.')[0]
+        totals[package] += self_us
+
+    return {package: us / 1e6 for package, us in sorted(totals.items(), key=lambda item: -item[1])}
+
+
+def _fixture_articles(company_name, num_articles=10, **kwargs):
+    """Stand-in for NewsExtractor.stream_articles that yields corpus texts instead of searching the web."""
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+    for i, text in enumerate(corpus[:num_articles]):
+        yield i, {
+            'title': f"{company_name} article {i + 1}",
+            'content': text,
+            'url': f"https://example.com/{company_name.lower()}/{i + 1}",
+            'published_date': None,
+            'author': None
+        }
+
+
+def _child_api():
+    """Measure API import, model load, startup and first-request latency."""
+    result = {}
+
+    start = time.perf_counter()
+    import api
+    result['import_s'] = time.perf_counter() - start
+
+    # Keep the first analysis offline: articles come from the fixture corpus, and
+    # stream_audio only registers the Hindi summary instead of calling gTTS
+    api.news_extractor.stream_articles = _fixture_articles
+
+    start = time.perf_counter()
+    api.sentiment_analyzer.load_models()
+    result['model_load_s'] = time.perf_counter() - start
+
+    from fastapi.testclient import TestClient
+
+    start = time.perf_counter()
+    with TestClient(api.app) as client:
+        result['startup_s'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        client.get('/companies')
+        result['first_request_s'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        client.post('/analyze', json={'company_name': 'Apple', 'num_articles': 1, 'stream_audio': True})
+        result['first_analyze_s'] = time.perf_counter() - start
+
+    from lazy_import import LOAD_TIMES
+    result['lazy_imports'] = dict(LOAD_TIMES)
+    return result
+
+
+def _child_app():
+    """Measure the Streamlit app's first render and a rerun."""
+    result = {}
+
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    result['import_s'] = time.perf_counter() - start
+
+    app_test = AppTest.from_file(APP_SCRIPT, default_timeout=120)
+
+    start = time.perf_counter()
+    app_test.run()
+    result['first_render_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app_test.run()
+    result['rerun_s'] = time.perf_counter() - start
+
+    from lazy_import import LOAD_TIMES
+    result['lazy_imports'] = dict(LOAD_TIMES)
+    return result
+
+
+CHILDREN = {
+    'api': _child_api,
+    'app': _child_app
+}
+
+
+def profile_target(target, top=15):
+    """
+    Profile one target in a fresh, offline interpreter.
+
+    Args:
+        target (str): Name of a target in CHILDREN
+        top (int): Number of slowest packages to keep
+
+    Returns:
+        dict: Timings for the target
+    """
+    env = dict(os.environ, **OFFLINE_ENV)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.abspath(__file__), '--child', target],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    wall_s = time.perf_counter() - start
+
+    result = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            result = json.loads(line[len(RESULT_MARKER):])
+    if result is None:
+        tail = '\n'.join(line for line in proc.stderr.splitlines() if not line.startswith('import time:'))[-2000:]
+        raise RuntimeError(f"Profiling {target} failed with exit code {proc.returncode}:\n{tail}")
+
+    imports = parse_importtime(proc.stderr)
+    result['wall_s'] = wall_s
+    result['total_import_s'] = sum(imports.values())
+    result['imports'] = dict(list(imports.items())[:top])
+    return result
+
+
+def flatten_metrics(results):
+    """Return the scalar timings of each target as "target.metric" keys."""
+    metrics = {}
+    for target, timings in results.items():
+        for name, value in timings.items():
+            if isinstance(value, (int, float)):
+                metrics[f"{target}.{name}"] = value
+    return metrics
+
+
+def check_regressions(results, baseline, tolerance=0.25, min_delta=0.05):
+    """
+    Compare timings with a baseline.
+
+    Args:
+        results (dict): Timings per target from this run
+        baseline (dict): Timings per target from the baseline run
+        tolerance (float): Allowed relative slowdown
+        min_delta (float): Slowdowns below this many seconds are ignored as noise
+
+    Returns:
+        list: Description of each regression
+    """
+    current = flatten_metrics(results)
+    reference = flatten_metrics(baseline)
+    regressions = []
+    for name, value in current.items():
+        if name not in reference:
+            continue
+        limit = reference[name] * (1 + tolerance)
+        if value > limit and value - reference[name] > min_delta:
+            regressions.append(f"{name}: {value:.3f}s (baseline {reference[name]:.3f}s, limit {limit:.3f}s)")
+    return regressions
+
+
+def print_report(results):
+    for target, timings in results.items():
+        print(f"== {target} ==")
+        for name, value in timings.items():
+            if isinstance(value, (int, float)):
+                print(f"  {name:<20} {value:8.3f}s")
+        print("  slowest imports:")
+        for package, seconds in timings['imports'].items():
+            print(f"    {package:<28} {seconds:8.3f}s")
+        for module, seconds in timings.get('lazy_imports', {}).items():
+            print(f"    (lazy) {module:<21} {seconds:8.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile cold start of the API and the Streamlit app")
+    parser.add_argument('--targets', nargs='+', default=list(CHILDREN), choices=list(CHILDREN))
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Fail if any timing regressed past this baseline JSON file")
+    parser.add_argument('--save-baseline', help="Write the results as a new baseline JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument('--min-delta', type=float, default=0.05, help="Ignore slowdowns below this many seconds")
+    parser.add_argument('--top', type=int, default=15, help="Number of slowest packages to report")
+    parser.add_argument('--child', choices=list(CHILDREN), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(RESULT_MARKER + json.dumps(CHILDREN[args.child]()), flush=True)
+        return 0
+
+    results = {target: profile_target(target, args.top) for target in args.targets}
+    print_report(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = check_regressions(results, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            print("Cold start regressed:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("No cold start regressions")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
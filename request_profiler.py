@@ -0,0 +1,348 @@
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS traces (
+    id TEXT PRIMARY KEY,
+    elapsed_ms REAL NOT NULL,
+    created_at REAL NOT NULL,
+    profiled INTEGER NOT NULL,
+    trace TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS traces_elapsed ON traces (elapsed_ms);
+CREATE INDEX IF NOT EXISTS traces_profiled ON traces (profiled, created_at);
+"""
+
+
+class SamplingProfiler:
+    """Class for sampling the call stacks of a set of threads from a background thread."""
+
+    def __init__(self, threads, interval=0.005, max_depth=128):
+        """
+        Args:
+            threads (callable): Returns {thread id: name} of the threads to sample, ids from threading.get_ident();
+                called on every sample, so threads can join and leave while sampling runs
+            interval (float): Seconds between samples
+            max_depth (int): Frames kept per sample, counted from the innermost one
+        """
+        self.threads = threads
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, name in self.threads().items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                # Root each stack at its thread, so the flame graph splits by pipeline stage
+                stack.append(f"[{name}]")
+                stack.reverse()
+                self.samples[tuple(stack)] += 1
+
+
+class RequestTrace:
+    """Class for recording the stage timings of one request, and optionally a sampling profile."""
+
+    def __init__(self, name, profile=False, interval=0.005):
+        """
+        Args:
+            name (str): Label of the request, e.g. "analyze Tesla"
+            profile (bool): Sample the call stacks of the threads running the pipeline
+            interval (float): Seconds between stack samples
+        """
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.profile = profile
+        self.interval = interval
+        self.created_at = time.time()
+        self.start = time.perf_counter()
+        self.elapsed_ms = None
+        self.spans = []
+        self.samples = Counter()
+        self._depth = 0
+        # Threads sampled while profiling: the request thread and the pipeline threads working for it
+        self._threads = {}
+        self._threads_lock = threading.Lock()
+
+    def now_ms(self):
+        """Milliseconds since the request arrived."""
+        return (time.perf_counter() - self.start) * 1000
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """
+        Time a stage of the pipeline. Spans may be nested.
+
+        Args:
+            name (str): Name of the stage, e.g. "summarize"
+            **attrs: Extra details stored with the span, e.g. the article URL
+        """
+        start_ms = self.now_ms()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.add_span(name, start_ms, self.now_ms(), depth=self._depth, **attrs)
+
+    def add_span(self, name, start_ms, end_ms, depth=0, **attrs):
+        """Record a span whose start and end are already known, in ms since the request arrived."""
+        self.spans.append({
+            'name': name,
+            'start_ms': round(start_ms, 3),
+            'duration_ms': round(end_ms - start_ms, 3),
+            'depth': depth,
+            **attrs
+        })
+
+    @contextmanager
+    def thread(self, name):
+        """
+        Include the calling thread in the samples for the duration of the block, if profiling is on.
+
+        Pipeline stages that run on their own threads (search, fetch, the
+        crawl scheduler's pool) enter this, so their stacks are sampled
+        along with the request thread's.
+
+        Args:
+            name (str): Label of the thread, shown as the root frame of its stacks
+        """
+        if not self.profile:
+            yield
+            return
+        thread_id = threading.get_ident()
+        with self._threads_lock:
+            self._threads[thread_id] = name
+        try:
+            yield
+        finally:
+            with self._threads_lock:
+                self._threads.pop(thread_id, None)
+
+    def _sampled_threads(self):
+        with self._threads_lock:
+            return dict(self._threads)
+
+    @contextmanager
+    def sampling(self):
+        """Sample the calling thread, and every thread that enters thread(), for the duration of the block."""
+        if not self.profile:
+            yield
+            return
+        profiler = SamplingProfiler(self._sampled_threads, self.interval)
+        with self.thread('request'):
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                self.samples.update(profiler.samples)
+
+    def finish(self):
+        self.elapsed_ms = self.now_ms()
+
+    def to_dict(self):
+        """Return the whole trace, samples included, as JSON-serializable data."""
+        return dict(self.summary(), interval=self.interval,
+                    stacks=[[list(stack), count] for stack, count in self.samples.items()])
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a finished trace from to_dict output."""
+        trace = cls(data['name'], profile=data['profiled'], interval=data['interval'])
+        trace.id = data['id']
+        trace.created_at = data['created_at']
+        trace.elapsed_ms = data['elapsed_ms']
+        trace.spans = data['spans']
+        trace.samples = Counter({tuple(stack): count for stack, count in data['stacks']})
+        return trace
+
+    def summary(self):
+        """Return the trace without its samples."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'created_at': self.created_at,
+            'elapsed_ms': round(self.elapsed_ms or self.now_ms(), 3),
+            'profiled': self.profile,
+            'samples': sum(self.samples.values()),
+            'spans': sorted(self.spans, key=lambda span: span['start_ms'])
+        }
+
+    def collapsed(self):
+        """
+        Render the samples in collapsed-stack format, as read by flamegraph.pl and speedscope.
+
+        Returns:
+            str: One "frame;frame;frame count" line per distinct stack
+        """
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.samples.most_common())
+
+    def speedscope(self):
+        """
+        Render the trace as a speedscope file.
+
+        The spans become an evented profile and the stack samples, if any, a
+        sampled profile with each sample weighted by the sampling interval.
+
+        Returns:
+            dict: Document in the https://www.speedscope.app/file-format-schema.json format
+        """
+        frames = []
+        frame_index = {}
+
+        def index(name):
+            if name not in frame_index:
+                frame_index[name] = len(frames)
+                frames.append({'name': name})
+            return frame_index[name]
+
+        # Evented profiles must nest, so open spans in start order (outer first)
+        # and close everything that ended before the next one opens
+        events = []
+        open_spans = []
+        for span in sorted(self.spans, key=lambda span: (span['start_ms'], -span['duration_ms'])):
+            while open_spans and open_spans[-1][0] <= span['start_ms']:
+                end, frame = open_spans.pop()
+                events.append({'type': 'C', 'at': end, 'frame': frame})
+            end = round(span['start_ms'] + span['duration_ms'], 3)
+            if open_spans:
+                end = min(end, open_spans[-1][0])
+            frame = index(f"[{span['name']}]")
+            events.append({'type': 'O', 'at': span['start_ms'], 'frame': frame})
+            open_spans.append((end, frame))
+        while open_spans:
+            end, frame = open_spans.pop()
+            events.append({'type': 'C', 'at': end, 'frame': frame})
+
+        end_ms = round(self.elapsed_ms or self.now_ms(), 3)
+        profiles = [{
+            'type': 'evented',
+            'name': f"{self.name} stages",
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': max([end_ms] + [event['at'] for event in events]),
+            'events': events
+        }]
+
+        if self.samples:
+            stacks = list(self.samples.items())
+            weight_ms = self.interval * 1000
+            profiles.append({
+                'type': 'sampled',
+                'name': f"{self.name} samples",
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(sum(count for _, count in stacks) * weight_ms, 3),
+                'samples': [[index(name) for name in stack] for stack, _ in stacks],
+                'weights': [count * weight_ms for _, count in stacks]
+            })
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': profiles,
+            'name': self.name,
+            'exporter': 'request_profiler'
+        }
+
+
+class TraceStore:
+    """
+    Class for keeping the slowest request traces and the most recent profiled ones.
+
+    Finished traces are stored in SQLite, so a trace id returned by one API
+    worker can be looked up through any other worker sharing the database.
+    """
+
+    def __init__(self, path='data/traces.db', slowest=20, recent_profiles=50, max_concurrent_profiles=2):
+        """
+        Args:
+            path (str): Path of the SQLite database holding the traces
+            slowest (int): Number of slowest traces kept
+            recent_profiles (int): Number of most recent profiled traces kept, however fast they were
+            max_concurrent_profiles (int): Requests this process may sample at once; further ones only get spans
+        """
+        self.slowest_count = slowest
+        self.recent_count = recent_profiles
+        self.max_concurrent_profiles = max_concurrent_profiles
+        self._profiling = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def start_trace(self, name, profile=False):
+        """
+        Create a trace, turning profiling off if too many requests are already being sampled.
+
+        Returns:
+            RequestTrace: The new trace
+        """
+        with self._lock:
+            if profile and self._profiling >= self.max_concurrent_profiles:
+                profile = False
+            if profile:
+                self._profiling += 1
+        return RequestTrace(name, profile=profile)
+
+    def add(self, trace):
+        """Store a finished trace, dropping those that are neither among the slowest nor recently profiled."""
+        with self._lock:
+            if trace.profile:
+                self._profiling -= 1
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO traces (id, elapsed_ms, created_at, profiled, trace) VALUES (?, ?, ?, ?, ?)',
+                    (trace.id, trace.elapsed_ms, trace.created_at, trace.profile, json.dumps(trace.to_dict())))
+                self._conn.execute(
+                    'DELETE FROM traces WHERE id NOT IN (SELECT id FROM traces ORDER BY elapsed_ms DESC LIMIT ?) '
+                    'AND id NOT IN (SELECT id FROM traces WHERE profiled ORDER BY created_at DESC LIMIT ?)',
+                    (self.slowest_count, self.recent_count))
+
+    def get(self, trace_id):
+        """Return a stored trace by id, or None."""
+        with self._lock:
+            row = self._conn.execute('SELECT trace FROM traces WHERE id = ?', (trace_id,)).fetchone()
+        return RequestTrace.from_dict(json.loads(row[0])) if row is not None else None
+
+    def slowest(self):
+        """Return summaries of the slowest traces, slowest first."""
+        with self._lock:
+            rows = self._conn.execute('SELECT trace FROM traces ORDER BY elapsed_ms DESC LIMIT ?',
+                                      (self.slowest_count,)).fetchall()
+        return [RequestTrace.from_dict(json.loads(row[0])).summary() for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
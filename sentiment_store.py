@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+
+# Bucket sizes in seconds for each rollup granularity
+GRANULARITIES = {
+    'hour': 3600,
+    'day': 86400
+}
+
+# Bytes of the database file exports map into memory instead of reading through the page cache
+MMAP_SIZE = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company TEXT NOT NULL,
+    analyzed_at REAL NOT NULL,
+    url TEXT,
+    title TEXT,
+    published_date TEXT,
+    sentiment TEXT NOT NULL,
+    compound REAL NOT NULL,
+    topics TEXT NOT NULL,
+    summary TEXT
+);
+CREATE INDEX IF NOT EXISTS articles_company_time ON articles (company, analyzed_at);
+CREATE TABLE IF NOT EXISTS rollups (
+    company TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    positive INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0,
+    neutral INTEGER NOT NULL DEFAULT 0,
+    compound_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (company, granularity, bucket)
+) WITHOUT ROWID;
+"""
+
+# Article columns available to exports, in table order
+EXPORT_COLUMNS = ('id', 'company', 'analyzed_at', 'url', 'title', 'published_date',
+                  'sentiment', 'compound', 'topics', 'summary')
+
+
+class SentimentStore:
+    """Class for storing per-article sentiment over time with hourly and daily rollups."""
+
+    def __init__(self, path='data/sentiment.db'):
+        """
+        Args:
+            path (str): Path of the SQLite database file
+        """
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        # Databases created before summaries were stored lack the column
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(articles)')}
+        if 'summary' not in columns:
+            self._conn.execute('ALTER TABLE articles ADD COLUMN summary TEXT')
+
+    @staticmethod
+    def _company_key(company):
+        return company.strip().lower()
+
+    def add_articles(self, company, articles, analyzed_at=None):
+        """
+        Append analyzed articles and update the rollups in the same transaction.
+
+        Args:
+            company (str): Name of the company the articles were analyzed for
+            articles (list): Processed article dictionaries with sentiment, sentiment_score, topics and summary
+            analyzed_at (float): Unix timestamp of the analysis, defaults to now
+
+        Returns:
+            int: Number of articles stored
+        """
+        if not articles:
+            return 0
+        company = self._company_key(company)
+        analyzed_at = time.time() if analyzed_at is None else analyzed_at
+
+        rows = []
+        positive = negative = neutral = 0
+        compound_sum = 0.0
+        for article in articles:
+            compound = float(article.get('sentiment_score', 0.0))
+            rows.append((
+                company, analyzed_at, article.get('url'), article.get('title'),
+                article.get('published_date'), article['sentiment'], compound,
+                json.dumps(article.get('topics', [])), article.get('summary')
+            ))
+            positive += article['sentiment'] == 'Positive'
+            negative += article['sentiment'] == 'Negative'
+            neutral += article['sentiment'] == 'Neutral'
+            compound_sum += compound
+
+        # All articles of one analysis share a timestamp, so each rollup gets a single upsert
+        rollups = [
+            (company, granularity, int(analyzed_at // size) * size, positive, negative, neutral, compound_sum)
+            for granularity, size in GRANULARITIES.items()
+        ]
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO articles (company, analyzed_at, url, title, published_date, sentiment, compound, topics, summary) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self._conn.executemany(
+                'INSERT INTO rollups (company, granularity, bucket, positive, negative, neutral, compound_sum) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (company, granularity, bucket) DO UPDATE SET '
+                'positive = positive + excluded.positive, '
+                'negative = negative + excluded.negative, '
+                'neutral = neutral + excluded.neutral, '
+                'compound_sum = compound_sum + excluded.compound_sum', rollups)
+        return len(rows)
+
+    def trends(self, company, granularity='day', start=None, end=None):
+        """
+        Get the sentiment trend for a company from the rollups.
+
+        Args:
+            company (str): Name of the company
+            granularity (str): "hour" or "day"
+            start (float): Unix timestamp of the earliest bucket to include
+            end (float): Unix timestamp after which buckets are excluded
+
+        Returns:
+            list: One dict per bucket with counts per sentiment and the mean compound score
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity {granularity!r}, expected one of {', '.join(GRANULARITIES)}")
+        size = GRANULARITIES[granularity]
+
+        query = ('SELECT bucket, positive, negative, neutral, compound_sum FROM rollups '
+                 'WHERE company = ? AND granularity = ?')
+        params = [self._company_key(company), granularity]
+        if start is not None:
+            query += ' AND bucket >= ?'
+            params.append(int(start // size) * size)
+        if end is not None:
+            query += ' AND bucket < ?'
+            params.append(end)
+        query += ' ORDER BY bucket'
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        trend = []
+        for bucket, positive, negative, neutral, compound_sum in rows:
+            count = positive + negative + neutral
+            trend.append({
+                'bucket': datetime.fromtimestamp(bucket, tz=timezone.utc).isoformat(),
+                'Positive': positive,
+                'Negative': negative,
+                'Neutral': neutral,
+                'count': count,
+                'mean_compound': compound_sum / count if count else 0.0
+            })
+        return trend
+
+    def iter_articles(self, columns=EXPORT_COLUMNS, company=None, start=None, end=None, batch_size=10000):
+        """
+        Read stored articles in batches of columns, oldest first.
+
+        Each call opens its own read-only, memory-mapped connection, so a long
+        export reads a consistent snapshot without holding the store's lock
+        and without blocking new articles from being written.
+
+        Args:
+            columns (tuple): Names from EXPORT_COLUMNS to read
+            company (str): Only read articles of this company
+            start (float): Unix timestamp of the earliest analysis to include
+            end (float): Unix timestamp after which analyses are excluded
+            batch_size (int): Most rows per batch
+
+        Yields:
+            dict: Column name to list of values; topics are decoded to lists
+
+        Raises:
+            ValueError: If a column is unknown
+        """
+        unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}. Valid columns are: {', '.join(EXPORT_COLUMNS)}")
+
+        conditions = []
+        params = []
+        if company is not None:
+            conditions.append('company = ?')
+            params.append(self._company_key(company))
+        if start is not None:
+            conditions.append('analyzed_at >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('analyzed_at < ?')
+            params.append(end)
+        # Keyset pagination on id, so each batch is an index seek rather than an OFFSET scan
+        query = (f"SELECT id, {', '.join(columns)} FROM articles WHERE "
+                 + ' AND '.join(conditions + ['id > ?']) + ' ORDER BY id LIMIT ?')
+
+        conn = sqlite3.connect(f'file:{os.path.abspath(self.path)}?mode=ro', uri=True, check_same_thread=False)
+        try:
+            conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+            conn.execute('BEGIN')
+            last_id = 0
+            while True:
+                rows = conn.execute(query, params + [last_id, batch_size]).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                batch = {column: [row[i + 1] for row in rows] for i, column in enumerate(columns)}
+                if 'topics' in batch:
+                    batch['topics'] = [json.loads(topics) for topics in batch['topics']]
+                yield batch
+                if len(rows) < batch_size:
+                    break
+        finally:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,263 @@
+import os
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+# Usage counters kept for every tenant
+USAGE_COUNTERS = ('requests', 'rate_limited', 'overloaded', 'errors', 'articles', 'queue_seconds', 'model_seconds')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    tenant TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usage (
+    tenant TEXT NOT NULL,
+    counter TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (tenant, counter)
+);
+"""
+
+
+class RateLimited(Exception):
+    """Raised when a tenant has used up its request rate."""
+
+    def __init__(self, tenant, retry_after):
+        super().__init__(f"Rate limit of tenant {tenant} exceeded, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class UnknownAPIKey(Exception):
+    """Raised when a request carries no API key, or one that belongs to no tenant, and anonymous access is off."""
+
+
+class Tenant:
+    """Limits, scheduling weight and token bucket of one API client."""
+
+    def __init__(self, name, weight=1.0, rate_per_minute=None, burst=None, max_concurrent=None,
+                 max_articles=None, admin=False):
+        """
+        Args:
+            name (str): Tenant name, as shown in usage reports
+            weight (float): Share of model capacity relative to other tenants with queued work
+            rate_per_minute (float): Sustained /analyze requests per minute, or None for no limit
+            burst (int): Requests allowed at once above the sustained rate, defaults to rate_per_minute
+            max_concurrent (int): Requests of this tenant holding a model slot at once, or None for no cap
+            max_articles (int): Most articles one request may ask for, or None for no cap
+            admin (bool): May read every tenant's usage and use the operational endpoints
+
+        Raises:
+            ValueError: If the weight or rate is not a positive number
+        """
+        # Fair queuing divides by the weight, and the bucket by the rate
+        if not (math.isfinite(float(weight)) and weight > 0):
+            raise ValueError(f"Tenant {name!r} needs a positive weight, got {weight!r}")
+        if rate_per_minute is not None and not (math.isfinite(float(rate_per_minute)) and rate_per_minute > 0):
+            raise ValueError(f"Tenant {name!r} needs a positive rate_per_minute, got {rate_per_minute!r}")
+        self.name = name
+        self.weight = float(weight)
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst if burst is not None else rate_per_minute
+        self.max_concurrent = max_concurrent
+        self.max_articles = max_articles
+        self.admin = admin
+        self.tokens = float(self.burst) if self.burst is not None else None
+        self.updated = time.time()
+
+    def take(self, now):
+        """
+        Take a request token from the tenant's bucket.
+
+        Args:
+            now (float): Current time in seconds, on the clock the bucket was last updated by
+
+        Returns:
+            float: 0 if a token was taken, else seconds until one is available
+        """
+        if self.rate_per_minute is None:
+            return 0.0
+        rate = self.rate_per_minute / 60.0
+        # Wall-clock time is shared by the workers, but can step back; never drain the bucket for that
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+    def limits(self):
+        return {
+            'weight': self.weight,
+            'rate_per_minute': self.rate_per_minute,
+            'burst': self.burst,
+            'max_concurrent': self.max_concurrent,
+            'max_articles': self.max_articles
+        }
+
+
+class TenantRegistry:
+    """
+    Class for resolving API keys to tenants and enforcing their request rates.
+
+    Tenants are read from a JSON file:
+
+        {
+            "tenants": [
+                {"name": "streamlit", "api_key_sha256": "<hex>", "weight": 4, "max_concurrent": 2},
+                {"name": "batch", "api_key_sha256": "<hex>", "weight": 1, "rate_per_minute": 10,
+                 "max_concurrent": 1, "max_articles": 20}
+            ],
+            "anonymous": {"weight": 1, "rate_per_minute": 30}
+        }
+
+    Only SHA-256 digests of the keys are stored. Requests without a key are
+    served as the "anonymous" tenant if it is configured and rejected
+    otherwise. Without a file, every request is anonymous and unlimited.
+
+    Token buckets and usage counters are kept in a SQLite database, so the
+    API workers sharing it enforce one rate per tenant and report usage
+    across all of them. Scheduling state (model slots, fair-queuing
+    virtual time) stays per worker, as each worker has its own slots.
+    """
+
+    ANONYMOUS = 'anonymous'
+
+    def __init__(self, path=None, state_path='data/tenants.db'):
+        """
+        Args:
+            path (str): Path of the tenants JSON file, or None to serve everyone as one unlimited tenant
+            state_path (str): Path of the SQLite database holding token buckets and usage counters
+
+        Raises:
+            ValueError: If the file configures a tenant with an invalid limit or a duplicate name
+        """
+        self._lock = threading.Lock()
+        self._by_digest = {}
+        self.tenants = {}
+        self.anonymous = None
+        if os.path.dirname(state_path):
+            os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        self._conn = sqlite3.connect(state_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+        if path is None:
+            # An open deployment: everyone is unlimited and may use the admin endpoints
+            self.anonymous = self._add(Tenant(self.ANONYMOUS, admin=True))
+            return
+
+        with open(path) as f:
+            config = json.load(f)
+        for entry in config.get('tenants', []):
+            entry = dict(entry)
+            digest = entry.pop('api_key_sha256').lower()
+            self._by_digest[digest] = self._add(Tenant(**entry))
+        if config.get('anonymous') is not None:
+            self.anonymous = self._add(Tenant(self.ANONYMOUS, **config['anonymous']))
+
+    def _add(self, tenant):
+        if tenant.name in self.tenants:
+            raise ValueError(f"Duplicate tenant name {tenant.name!r}")
+        self.tenants[tenant.name] = tenant
+        return tenant
+
+    def resolve(self, api_key):
+        """
+        Find the tenant a request belongs to.
+
+        Args:
+            api_key (str): Value of the X-API-Key header, or None
+
+        Returns:
+            Tenant: The tenant
+
+        Raises:
+            UnknownAPIKey: If the key matches no tenant, or there is no key and anonymous access is off
+        """
+        if api_key:
+            tenant = self._by_digest.get(hashlib.sha256(api_key.encode('utf-8')).hexdigest())
+            if tenant is None:
+                raise UnknownAPIKey("Unknown API key")
+            return tenant
+        if self.anonymous is None:
+            raise UnknownAPIKey("An X-API-Key header is required")
+        return self.anonymous
+
+    def check_rate(self, tenant):
+        """
+        Count a request against the tenant's rate limit, shared by every worker.
+
+        Raises:
+            RateLimited: If the tenant's bucket is empty
+        """
+        if tenant.rate_per_minute is None:
+            return
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers can't spend the same token
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                row = self._conn.execute(
+                    'SELECT tokens, updated FROM buckets WHERE tenant = ?', (tenant.name,)).fetchone()
+                tenant.tokens, tenant.updated = row if row is not None else (float(tenant.burst), now)
+                wait = tenant.take(now)
+                self._conn.execute(
+                    'INSERT INTO buckets (tenant, tokens, updated) VALUES (?, ?, ?) '
+                    'ON CONFLICT (tenant) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                    (tenant.name, tenant.tokens, tenant.updated))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        if wait > 0:
+            self.record(tenant, rate_limited=1)
+            raise RateLimited(tenant.name, max(1, int(wait + 0.999)))
+
+    def record(self, tenant, **counts):
+        """Add to a tenant's usage counters, e.g. record(tenant, requests=1, articles=5)."""
+        for name in counts:
+            if name not in USAGE_COUNTERS:
+                raise ValueError(f"Unknown usage counter {name!r}")
+        with self._lock:
+            self._conn.executemany(
+                'INSERT INTO usage (tenant, counter, value) VALUES (?, ?, ?) '
+                'ON CONFLICT (tenant, counter) DO UPDATE SET value = value + excluded.value',
+                [(tenant.name, name, value) for name, value in counts.items()])
+
+    def usage(self, tenant=None):
+        """
+        Report usage counters and limits, summed over every worker.
+
+        Args:
+            tenant (Tenant): Only report this tenant, or None for all
+
+        Returns:
+            dict: Tenant name to limits and usage
+        """
+        tenants = [tenant] if tenant is not None else list(self.tenants.values())
+        with self._lock:
+            rows = self._conn.execute('SELECT tenant, counter, value FROM usage').fetchall()
+        counters = {}
+        for name, counter, value in rows:
+            counters.setdefault(name, {})[counter] = value
+
+        report = {}
+        for t in tenants:
+            values = counters.get(t.name, {})
+            usage = {}
+            for name in USAGE_COUNTERS:
+                value = values.get(name, 0)
+                usage[name] = round(value, 3) if name.endswith('_seconds') else int(value)
+            report[t.name] = {'limits': t.limits(), 'usage': usage}
+        return report
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Overloaded
+
+
+async def hold(controller, tenant, weight, started, release, cost=1.0, max_concurrent=None):
+    """Take a slot through the controller, record the order slots were granted in, and hold it until released."""
+    async with controller.admit(tenant, weight, cost=cost, max_concurrent=max_concurrent) as tier:
+        started.append((tenant, tier))
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_backlog_of_one_tenant_does_not_degrade_another():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=2)
+        started, release = [], asyncio.Event()
+        batch = [asyncio.create_task(hold(controller, 'batch', 1, started, release, max_concurrent=1))
+                 for _ in range(8)]
+        await settle()
+        assert controller.load == 8
+        assert controller.tenant_in_flight['batch'] == 1
+
+        # The batch tenant is now past its own limits, but the interactive one gets full quality at once
+        with pytest.raises(Overloaded):
+            controller.choose_tier('batch', 1)
+        assert controller.choose_tier('interactive', 4) == 'full'
+        interactive = asyncio.create_task(hold(controller, 'interactive', 4, started, release))
+        await settle()
+        assert started[-1] == ('interactive', 'full')
+
+        release.set()
+        await asyncio.gather(interactive, *batch)
+        assert controller.load == 0
+
+    asyncio.run(scenario())
+
+
+def test_lone_tenant_uses_whole_capacity_thresholds():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, reduced_at=2, minimal_at=4, reject_at=8)
+        started, release = [], asyncio.Event()
+        tasks = [asyncio.create_task(hold(controller, 'a', 1, started, release)) for _ in range(8)]
+        await settle()
+        with pytest.raises(Overloaded):
+            controller.choose_tier('a', 1)
+        release.set()
+        await asyncio.gather(*tasks)
+        assert [tier for _, tier in started] == ['full'] * 2 + ['reduced'] * 2 + ['minimal'] * 4
+
+    asyncio.run(scenario())
+
+
+def test_dispatch_by_weighted_finish_time():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, reject_at=100)
+        started, release = [], asyncio.Event()
+        blocker_release = asyncio.Event()
+        blocker = asyncio.create_task(hold(controller, 'blocker', 1, [], blocker_release))
+        await settle()
+
+        # Queued while the only slot is taken: a heavy tenant first, then a light one with four times the weight
+        tasks = [asyncio.create_task(hold(controller, 'heavy', 1, started, release)) for _ in range(3)]
+        await settle()
+        tasks += [asyncio.create_task(hold(controller, 'light', 4, started, release)) for _ in range(3)]
+        await settle()
+
+        release.set()
+        blocker_release.set()
+        await asyncio.gather(blocker, *tasks)
+        order = [tenant for tenant, _ in started]
+        # Light finish tags are 0.25, 0.5 and 0.75 past the virtual time, heavy ones 1, 2 and 3
+        assert order == ['light', 'light', 'light', 'heavy', 'heavy', 'heavy']
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1)
+        started, release = [], asyncio.Event()
+        first = asyncio.create_task(hold(controller, 'a', 1, started, release))
+        waiting = asyncio.create_task(hold(controller, 'b', 1, started, release))
+        await settle()
+        assert controller.queued == 1
+
+        waiting.cancel()
+        await settle()
+        assert waiting.cancelled()
+        assert controller.queued == 0 and controller.in_flight == 1
+
+        release.set()
+        await first
+        assert controller.load == 0 and not controller.tenant_in_flight
+        assert started == [('a', 'full')]
+
+    asyncio.run(scenario())
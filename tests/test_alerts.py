@@ -0,0 +1,86 @@
+import pytest
+
+from alerts import SentimentMonitor
+
+
+def article(url, sentiment, score):
+    return {'url': url, 'sentiment': sentiment, 'sentiment_score': score}
+
+
+def test_rules_and_windows_are_shared_between_monitors(tmp_path):
+    path = str(tmp_path / 'alerts.db')
+    first, second = SentimentMonitor(path, rules_ttl=0), SentimentMonitor(path, rules_ttl=0)
+    rule = first.add_rule('Tesla', 'negative_share', 0.5, 'above', 'https://hooks.example.com/a', min_articles=2)
+    assert [r['id'] for r in second.rules()] == [rule['id']]
+
+    assert first.observe('Tesla', article('https://a.example.com/1', 'Negative', -0.6), now=1000) == []
+    fired = second.observe('tesla ', article('https://a.example.com/2', 'Negative', -0.4), now=1001)
+    assert [alert['rule_id'] for alert in fired] == [rule['id']]
+    assert fired[0]['window_articles'] == 2
+    assert first.stats('Tesla', now=1002)['articles'] == 2
+
+    assert second.remove_rule(rule['id'])
+    assert first.observe('Tesla', article('https://a.example.com/3', 'Negative', -0.5), now=1003) == []
+
+
+def test_emptied_windows_are_evicted(tmp_path):
+    monitor = SentimentMonitor(str(tmp_path / 'alerts.db'), window_seconds=100, sweep_interval=0)
+    monitor.add_rule('*', 'negative_share', 0.5, 'above', 'https://hooks.example.com/a', min_articles=1,
+                     cooldown_seconds=150)
+    for i in range(3):
+        assert monitor.observe(f"Company {i}", article(f"https://a.example.com/{i}", 'Negative', -0.5), now=1000)
+
+    # Company 0's window has emptied but its rule is still cooling down
+    monitor.observe('Tesla', article('https://a.example.com/t', 'Positive', 0.5), now=1120)
+    count = lambda table: monitor._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    assert (count('alert_articles'), count('alert_windows'), count('alert_state')) == (1, 1, 3)
+
+    monitor.observe('Tesla', article('https://a.example.com/u', 'Positive', 0.5), now=1160)
+    assert (count('alert_articles'), count('alert_windows'), count('alert_state')) == (2, 1, 0)
+    assert monitor.stats('Company 0', now=1160) == {'articles': 0, 'negative_share': 0.0, 'compound_ewma': 0.0}
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.alerts = []
+
+    def enqueue(self, alert):
+        self.alerts.append(alert)
+
+
+def test_rule_fires_once_per_crossing_and_respects_the_cooldown(tmp_path):
+    dispatcher = RecordingDispatcher()
+    monitor = SentimentMonitor(str(tmp_path / 'alerts.db'), dispatcher=dispatcher)
+    rule = monitor.add_rule('Acme', 'negative_share', 0.5, 'above', 'https://hooks.example.com/a', min_articles=2,
+                            cooldown_seconds=300)
+    observe = lambda i, sentiment, now: monitor.observe('Acme', article(f"https://a.example.com/{i}", sentiment,
+                                                                        -0.5 if sentiment == 'Negative' else 0.5), 1000 + now)
+
+    assert observe(0, 'Negative', 0) == []  # below min_articles
+    fired = observe(1, 'Negative', 10)
+    assert [(alert['rule_id'], alert['triggering_url']) for alert in fired] == [(rule['id'], 'https://a.example.com/1')]
+    assert dispatcher.alerts == fired
+    # Still above the threshold, or the same article again: no new alert
+    assert observe(2, 'Negative', 20) == []
+    assert observe(2, 'Negative', 25) == []
+
+    # The condition clears (3 of 6 negative) and crosses again, but within the cooldown
+    for i in range(3, 6):
+        assert observe(i, 'Positive', 30 + i) == []
+    assert observe(6, 'Negative', 60) == []
+    # Cleared again (4 of 8); the next crossing after the cooldown fires
+    assert observe(7, 'Positive', 70) == []
+    fired = observe(8, 'Negative', 400)
+    assert [alert['window_articles'] for alert in fired] == [9]
+    assert len(dispatcher.alerts) == 2
+
+
+def test_ewma_rule_below_threshold(tmp_path):
+    monitor = SentimentMonitor(str(tmp_path / 'alerts.db'), alpha=0.5)
+    monitor.add_rule('*', 'compound_ewma', -0.2, 'below', 'https://hooks.example.com/a', min_articles=1)
+    assert monitor.observe('Acme', article('https://a.example.com/1', 'Positive', 0.4), now=1000) == []
+    assert monitor.observe('Acme', article('https://a.example.com/2', 'Negative', -0.6), now=1001) == []
+    fired = monitor.observe('Acme', article('https://a.example.com/3', 'Negative', -0.8), now=1002)
+    assert [alert['value'] for alert in fired] == [pytest.approx(-0.45)]
+    # Rules for other companies don't see Acme's window
+    assert monitor.observe('Globex', article('https://g.example.com/1', 'Positive', 0.9), now=1003) == []
@@ -0,0 +1,58 @@
+import io
+from datetime import datetime, timezone
+
+import pytest
+
+from arrow_export import export_schema, stream_export
+from sentiment_store import EXPORT_COLUMNS, SentimentStore
+
+pa = pytest.importorskip('pyarrow')
+pa_ipc = pytest.importorskip('pyarrow.ipc')
+pq = pytest.importorskip('pyarrow.parquet')
+
+ANALYZED_AT = datetime(2024, 1, 1, 10, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SentimentStore(str(tmp_path / 'sentiment.db'))
+    store.add_articles('Tesla', [
+        {'url': f"https://example.com/{i}", 'title': f"Story {i}", 'sentiment': 'Positive',
+         'sentiment_score': i / 10, 'topics': ['Finance', 'Cars'][:i % 3], 'summary': f"Summary {i}"}
+        for i in range(5)
+    ], analyzed_at=ANALYZED_AT.timestamp())
+    yield store
+    store.close()
+
+
+def test_arrow_stream_round_trips_batch_by_batch(store):
+    chunks = list(stream_export(store.iter_articles(batch_size=2), export_schema(EXPORT_COLUMNS), 'arrow'))
+    # The schema and each of the three batches are sent as they are encoded
+    assert len(chunks) >= 3
+
+    reader = pa_ipc.open_stream(io.BytesIO(b''.join(chunks)))
+    batches = list(reader)
+    table = pa.Table.from_batches(batches)
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert table.schema == export_schema(EXPORT_COLUMNS)
+    assert table.column('url').to_pylist() == [f"https://example.com/{i}" for i in range(5)]
+    assert table.column('topics').to_pylist()[:3] == [[], ['Finance'], ['Finance', 'Cars']]
+    assert table.column('compound').to_pylist()[4] == pytest.approx(0.4)
+    assert set(table.column('analyzed_at').to_pylist()) == {ANALYZED_AT}
+
+
+def test_parquet_writes_one_row_group_per_batch(store):
+    columns = ('url', 'sentiment', 'compound')
+    data = b''.join(stream_export(store.iter_articles(columns, batch_size=2), export_schema(columns), 'parquet'))
+
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column_names == list(columns)
+    assert table.column('sentiment').to_pylist() == ['Positive'] * 5
+
+
+def test_empty_export_is_a_valid_stream(store):
+    schema = export_schema(EXPORT_COLUMNS)
+    table = pa_ipc.open_stream(io.BytesIO(b''.join(stream_export(iter([]), schema, 'arrow')))).read_all()
+    assert table.num_rows == 0 and table.schema == schema
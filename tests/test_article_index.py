@@ -0,0 +1,29 @@
+from article_index import ArticleIndex
+
+
+def article(i, text):
+    return {'url': f"https://example.com/{i}", 'title': f"Article {i}", 'content': text}
+
+
+def test_two_writers_share_an_index(tmp_path):
+    first = ArticleIndex(str(tmp_path), initial_capacity=2)
+    second = ArticleIndex(str(tmp_path), initial_capacity=2)
+
+    assert first.add('Acme', [article(1, 'acme revenue record quarter cloud software')]) == 1
+    assert second.add('Acme', [article(2, 'acme factory strike production halted'),
+                               article(1, 'duplicate of an article the other writer added')]) == 1
+    assert first.add('Acme', [article(3, 'acme shares fall after weak guidance'),
+                              article(4, 'acme cloud software revenue beats forecasts')]) == 2
+
+    ids = [row[0] for row in first._conn.execute('SELECT id FROM articles ORDER BY id')]
+    assert ids == [0, 1, 2, 3]
+
+    # The second writer sees rows the first one added, vectors included
+    results = second.search(text='factory strike halted production', k=1)
+    assert results[0]['url'] == 'https://example.com/2'
+    results = second.search(url='https://example.com/1', k=1)
+    assert results[0]['url'] == 'https://example.com/4'
+    assert second.count == 4
+
+    first.close()
+    second.close()
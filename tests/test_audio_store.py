@@ -0,0 +1,178 @@
+import os
+import time
+import threading
+
+import pytest
+
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+from fastapi.testclient import TestClient
+
+from audio_store import AudioStore, parse_byte_range, etag_matches, if_range_matches
+
+
+def make_store(tmp_path, **kwargs):
+    # Laid out like api.py: audio under the served static/ tree, pending texts outside it
+    return AudioStore(str(tmp_path / 'static' / 'audio'), pending_directory=str(tmp_path / 'data' / 'audio_pending'),
+                      **kwargs)
+
+
+def test_parse_byte_range():
+    assert parse_byte_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_byte_range("bytes=900-", 1000) == (900, 999)
+    assert parse_byte_range("bytes=-100", 1000) == (900, 999)
+    assert parse_byte_range("bytes=0-5000", 1000) == (0, 999)
+
+
+def test_parse_byte_range_ignores_malformed_and_multiple_ranges():
+    assert parse_byte_range("bytes=-", 1000) is None
+    assert parse_byte_range("items=0-1", 1000) is None
+    assert parse_byte_range("bytes=0-1,5-6", 1000) is None
+
+
+def test_parse_byte_range_unsatisfiable():
+    with pytest.raises(ValueError):
+        parse_byte_range("bytes=1000-", 1000)
+    with pytest.raises(ValueError):
+        parse_byte_range("bytes=5-2", 1000)
+    with pytest.raises(ValueError):
+        parse_byte_range("bytes=-0", 1000)
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_if_range_needs_a_strong_match():
+    assert if_range_matches(None, 'W/"abc"')
+    assert if_range_matches('"abc"', '"abc"')
+    assert not if_range_matches('W/"abc"', 'W/"abc"')
+    assert not if_range_matches('"abc"', 'W/"abc"')
+    assert not if_range_matches('Wed, 21 Oct 2015 07:28:00 GMT', '"abc"')
+
+
+def test_registered_text_streams_from_another_store(tmp_path):
+    key, token = make_store(tmp_path).register('namaste')
+    other = make_store(tmp_path)
+
+    with pytest.raises(KeyError):
+        other.stream(key, None, token='guess')
+    audio = b''.join(other.stream(key, lambda text: iter([text.encode('utf-8'), b'!']), token=token))
+    assert audio == b'namaste!'
+    # Once complete, the file is served as it is, without a token, and the text is forgotten
+    assert b''.join(other.stream(key, None)) == b'namaste!'
+    assert other._pending(key) is None
+
+
+def test_failed_synthesis_leaves_nothing_behind(tmp_path):
+    store = make_store(tmp_path)
+    key, token = store.register('namaste')
+    assert store.register('namaste') == (key, token)
+
+    def synthesize(text):
+        yield b'first segment'
+        raise RuntimeError('translation failed')
+
+    with pytest.raises(RuntimeError):
+        b''.join(store.stream(key, synthesize, token=token))
+    assert not os.path.exists(store.path_for(f"{key}.mp3"))
+    assert [name for name in os.listdir(store.directory) if name.endswith('.tmp')] == []
+    assert store._pending(key)['text'] == 'namaste'
+
+
+def test_unknown_key(tmp_path):
+    with pytest.raises(KeyError):
+        make_store(tmp_path).stream('0' * 64, None)
+
+
+def test_pending_texts_are_bounded(tmp_path):
+    store = make_store(tmp_path, max_pending=2)
+    (older, _), (newer, _) = store.register('text 1'), store.register('text 2')
+    for age, key in ((20, older), (10, newer)):
+        os.utime(store._pending_path(key), (time.time() - age,) * 2)
+
+    latest, _ = store.register('text 3')
+    assert store._pending(older) is None
+    assert store._pending(newer)['text'] == 'text 2'
+    assert store._pending(latest)['text'] == 'text 3'
+
+
+def test_pending_tokens_are_not_served_as_static_files(tmp_path):
+    store = make_store(tmp_path)
+    key, token = store.register('namaste')
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory=str(tmp_path / 'static')), name="static")
+    client = TestClient(app)
+
+    for url in (f"/static/audio/pending/{key}.json", f"/static/audio/{key}.json",
+                f"/static/../data/audio_pending/{key}.json"):
+        response = client.get(url)
+        assert response.status_code == 404
+        assert token not in response.text
+    for root, _, files in os.walk(str(tmp_path / 'static')):
+        for name in files:
+            with open(os.path.join(root, name), 'rb') as f:
+                assert token.encode('utf-8') not in f.read()
+
+
+def test_legacy_pending_directory_is_removed(tmp_path):
+    legacy = tmp_path / 'static' / 'audio' / 'pending'
+    legacy.mkdir(parents=True)
+    (legacy / f"{'0' * 64}.json").write_text('{"text": "namaste", "token": "secret"}')
+    make_store(tmp_path)
+    assert not legacy.exists()
+
+
+def test_generation_locks_are_released(tmp_path):
+    store = make_store(tmp_path)
+
+    def generate(text, path):
+        with open(path, 'wb') as f:
+            f.write(text.encode('utf-8'))
+        return path
+
+    assert store.get_or_create('namaste', generate) == store.get_or_create('namaste', generate)
+    key, token = store.register('dhanyavaad')
+    assert b''.join(store.stream(key, lambda text: iter([b'mp3']), token=token)) == b'mp3'
+    # An abandoned stream gives its lock back when the generator is closed
+    key, token = store.register('shukriya')
+    audio = store.stream(key, lambda text: iter([b'a', b'b']), token=token)
+    next(audio)
+    assert len(store._locks) == 1
+    audio.close()
+    assert store._locks == {}
+
+
+def test_concurrent_streams_synthesize_once(tmp_path):
+    store = make_store(tmp_path)
+    key, token = store.register('namaste')
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def synthesize(text):
+        calls.append(text)
+        started.set()
+        release.wait(5)
+        yield b'mp3'
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(b''.join(store.stream(key, synthesize, token=token))))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(b''.join(store.stream(key, synthesize, token=token))))
+    second.start()
+    # Let the second stream queue up behind the first before synthesis finishes
+    for _ in range(500):
+        if store._locks[f"{key}.mp3"][1] == 2:
+            break
+        time.sleep(0.01)
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert results == [b'mp3', b'mp3'] and calls == ['namaste']
+    assert store._locks == {}
@@ -0,0 +1,33 @@
+import pytest
+
+from body_store import BodyStore
+
+zstandard = pytest.importorskip('zstandard')
+
+BOILERPLATE = ("Subscribe to our newsletter for the latest business news. All rights reserved. "
+               "This article was written by the markets desk and edited for clarity. ") * 4
+
+
+def bodies(start, count):
+    return [(f"https://www.example.com/news/{i}", f"{BOILERPLATE} Story {i}: Acme shares moved {i % 7} percent. "
+             f"{BOILERPLATE}") for i in range(start, start + count)]
+
+
+def test_processes_share_dictionaries(tmp_path):
+    path = str(tmp_path / 'bodies.db')
+    first = BodyStore(path, train_samples=8, dict_size=4096)
+    second = BodyStore(path, train_samples=8, dict_size=4096)
+
+    first.put_many(bodies(0, 10))
+    assert 'example.com' in first._publisher_dicts
+
+    # The second store didn't train a dictionary of its own, and reads bodies compressed with the first one's
+    second.put_many(bodies(10, 10))
+    assert second._publisher_dicts['example.com'] == first._publisher_dicts['example.com']
+    assert second.stats()['publishers']['example.com']['dictionary']
+    assert second._conn.execute('SELECT COUNT(*) FROM dictionaries').fetchone()[0] == 1
+    assert second.get_url('https://www.example.com/news/3') == bodies(3, 1)[0][1]
+    assert first.get_url('https://www.example.com/news/15') == bodies(15, 1)[0][1]
+
+    first.close()
+    second.close()
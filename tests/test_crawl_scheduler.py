@@ -0,0 +1,122 @@
+import os
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from crawl_scheduler import CrawlScheduler, DomainState, HTTPCache, _retry_after_seconds
+
+
+class UnreachableSession:
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        raise requests.ConnectionError("connection refused")
+
+
+def test_unreachable_robots_allows_with_backoff():
+    scheduler = CrawlScheduler(rate=2.0, cache_dir=None, robots_retry=60)
+    scheduler.session = UnreachableSession()
+
+    assert scheduler.allowed('https://news.example.com/a')
+    state = scheduler._domains['news.example.com']
+    assert state.rate == 1.0
+    assert state.robots_expires - time.monotonic() == pytest.approx(60, abs=1)
+
+    # The policy is cached until the retry, then each failure doubles the wait
+    assert scheduler.allowed('https://news.example.com/b')
+    assert scheduler.session.urls == ['https://news.example.com/robots.txt']
+    state.robots_expires = 0
+    assert scheduler.allowed('https://news.example.com/c')
+    assert state.robots_expires - time.monotonic() == pytest.approx(120, abs=1)
+
+
+def put(cache, url, size):
+    cache.put(url, 'x' * size, {'ETag': '"v1"'})
+    return cache._path(url)
+
+
+def test_cache_evicts_least_recently_used_beyond_quota(tmp_path):
+    cache = HTTPCache(str(tmp_path), max_bytes=2500, sweep_interval=3600)
+    paths = [put(cache, f"https://example.com/{i}", 1000) for i in range(3)]
+    for age, path in zip((30, 20, 10), paths):
+        os.utime(path, (time.time() - age,) * 2)
+    # Reading the oldest entry makes it the most recently used
+    assert cache.get('https://example.com/0')['text'] == 'x' * 1000
+
+    assert cache.enforce_quota() == 1
+    assert os.path.exists(paths[0]) and not os.path.exists(paths[1]) and os.path.exists(paths[2])
+
+
+def test_cache_expires_unused_entries_and_stale_temporary_files(tmp_path):
+    cache = HTTPCache(str(tmp_path), max_age=100, sweep_interval=0)
+    old = put(cache, 'https://example.com/old', 10)
+    os.utime(old, (time.time() - 200,) * 2)
+    tmp = os.path.join(str(tmp_path), 'abandoned.json.1234.tmp')
+    with open(tmp, 'w') as f:
+        f.write('{')
+    os.utime(tmp, (time.time() - 10,) * 2)
+
+    # Writes sweep when sweep_interval has passed
+    new = put(cache, 'https://example.com/new', 10)
+    assert sorted(os.listdir(str(tmp_path))) == [os.path.basename(new)]
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    state = DomainState(rate=2.0, burst=3, max_rate=4.0)
+    now = state.updated
+    for _ in range(3):
+        assert state.delay(now) == 0
+        state.take(now)
+    assert state.delay(now) == pytest.approx(0.5)
+    assert state.delay(now + 0.25) == pytest.approx(0.25)
+    # Idle time refills the bucket, but never past the burst
+    assert state.delay(now + 100) == 0
+    assert state.tokens == 3
+
+
+def test_token_bucket_waits_out_a_block():
+    state = DomainState(rate=2.0, burst=3, max_rate=4.0)
+    now = state.updated
+    state.blocked_until = now + 30
+    assert state.delay(now) == pytest.approx(30)
+    assert state.delay(now + 31) == 0
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_push_back_halves_the_rate_and_honours_retry_after():
+    scheduler = CrawlScheduler(rate=2.0, max_rate=4.0, cache_dir=None)
+    state = scheduler._state('news.example.com')
+    scheduler._adjust_rate(state, Response(429, {'Retry-After': '120'}))
+    assert state.rate == 1.0
+    assert state.blocked_until - time.monotonic() == pytest.approx(120, abs=1)
+
+    # Successes creep back up to the ceiling
+    for _ in range(20):
+        scheduler._adjust_rate(state, Response(200))
+    assert state.rate == 4.0
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, None),
+    ('', None),
+    ('30', 30.0),
+    ('1.5', 1.5),
+    ('-5', 0.0),
+    ('soon', None),
+    (formatdate(time.time() - 60, usegmt=True), 0.0),
+])
+def test_retry_after_seconds(value, expected):
+    assert _retry_after_seconds(value) == expected
+
+
+def test_retry_after_http_date():
+    assert _retry_after_seconds(formatdate(time.time() + 90, usegmt=True)) == pytest.approx(90, abs=2)
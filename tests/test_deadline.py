@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from deadline import Deadline
+
+
+def test_no_deadline_never_expires():
+    deadline = Deadline()
+    assert deadline.remaining() is None
+    assert not deadline.expired()
+    assert deadline.timeout(10) == 10
+
+
+def test_budget_counts_down_and_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    deadline = Deadline(2500)
+
+    assert deadline.remaining() == pytest.approx(2.5)
+    assert deadline.timeout(10) == pytest.approx(2.5)
+    assert deadline.timeout(1) == 1
+    now[0] = 101.0
+    assert deadline.elapsed_ms() == 1000
+    assert not deadline.expired()
+
+    now[0] = 103.0
+    assert deadline.remaining() == 0
+    assert deadline.expired()
+    # HTTP clients reject a zero timeout, so an expired budget still gives a tiny positive one
+    assert deadline.timeout(10) == 0.001
+
+
+def test_zero_budget_is_expired_at_once():
+    assert Deadline(0).expired()
@@ -0,0 +1,52 @@
+import os
+from xml.etree.ElementTree import ParseError
+
+import pytest
+
+from feed_source import parse_feed, parse_feed_file
+
+FEED_PATH = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'fixtures', 'feed.xml')
+
+ATOM = '''<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <title>Acme &amp; partners</title>
+    <link rel="self" href="https://example.com/self"/>
+    <link href="https://example.com/acme"/>
+    <summary type="html">&lt;b&gt;Acme&lt;/b&gt;   grows</summary>
+    <updated>2024-03-05T09:30:00Z</updated>
+    <author><name>Priya Sharma</name></author>
+  </entry>
+</feed>'''
+
+
+def test_parse_rss_file():
+    entries = list(parse_feed_file(FEED_PATH))
+    assert len(entries) == 6
+    assert entries[0]['title'] == 'Acme Reports Record Quarterly Revenue'
+    assert entries[0]['url'] == 'http://fixtures.invalid/news/article-1.html'
+    assert entries[0]['author'] == 'Priya Sharma'
+    assert entries[0]['summary'].startswith('Acme Corp reported record revenue')
+
+
+def test_parse_atom_text_and_bytes():
+    for source in (ATOM, ATOM.encode('utf-8')):
+        entry, = parse_feed(source)
+        assert entry['title'] == 'Acme & partners'
+        assert entry['url'] == 'https://example.com/acme'
+        assert entry['summary'] == 'Acme grows'
+        assert entry['published_date'] == '2024-03-05T09:30:00Z'
+        assert entry['author'] == 'Priya Sharma'
+
+
+def test_text_is_never_opened_as_a_path():
+    # Remote content that isn't XML must fail to parse, not be read as a local file
+    with pytest.raises(ParseError):
+        list(parse_feed(FEED_PATH))
+
+
+def test_declared_encoding_is_honoured_for_bytes():
+    feed = '<?xml version="1.0" encoding="ISO-8859-1"?><rss><channel><item><title>Nestlé</title>' \
+           '<link>https://example.com/n</link></item></channel></rss>'
+    entry, = parse_feed(feed.encode('iso-8859-1'))
+    assert entry['title'] == 'Nestlé'
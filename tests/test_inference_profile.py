@@ -0,0 +1,38 @@
+import types
+
+import inference_profile
+
+
+class FakeTorch:
+    def __init__(self):
+        self.calls = []
+
+    def set_num_threads(self, count):
+        self.calls.append(('intra', count))
+
+    def set_num_interop_threads(self, count):
+        # Like torch, the inter-op pool can only be sized once
+        if any(name == 'inter' for name, _ in self.calls):
+            raise RuntimeError("cannot set number of interop threads after parallel work has started")
+        self.calls.append(('inter', count))
+
+
+def test_thread_counts_are_applied_once_per_process(monkeypatch, capsys):
+    torch = FakeTorch()
+    monkeypatch.setattr(inference_profile, 'torch', torch)
+    monkeypatch.setattr(inference_profile, '_threads_applied_pid', None)
+    profile = {'settings': {'intra_op_threads': 4, 'inter_op_threads': 2, 'summary_batch_size': 8}}
+    first, second = types.SimpleNamespace(), types.SimpleNamespace()
+
+    assert inference_profile.apply_profile(profile, first)
+    assert inference_profile.apply_profile(profile, second)
+
+    assert torch.calls == [('intra', 4), ('inter', 2)]
+    assert first.summary_batch_size == second.summary_batch_size == 8
+    assert 'Could not set' not in capsys.readouterr().out
+
+
+def test_no_profile_leaves_defaults():
+    analyzer = types.SimpleNamespace(summary_batch_size=4)
+    assert not inference_profile.apply_profile(None, analyzer)
+    assert analyzer.summary_batch_size == 4
@@ -0,0 +1,27 @@
+import gzip
+
+from json_response import accepted_encodings, compressed_json_response
+
+
+BODY = {'text': 'x' * 4096}
+
+
+def test_accepted_encodings_parses_q_values():
+    assert accepted_encodings('gzip;q=0.5, br') == {'gzip': 0.5, 'br': 1.0}
+    assert accepted_encodings('') == {}
+
+
+def test_q_zero_refuses_encoding():
+    response = compressed_json_response(BODY, 'br;q=0, gzip;q=0')
+    assert 'content-encoding' not in response.headers
+
+
+def test_falls_back_to_gzip_when_br_refused():
+    response = compressed_json_response(BODY, 'br;q=0, gzip')
+    assert response.headers['content-encoding'] == 'gzip'
+    assert gzip.decompress(response.body).startswith(b'{"text"')
+
+
+def test_wildcard_applies_to_unlisted_encodings():
+    response = compressed_json_response(BODY, '*;q=0, gzip')
+    assert response.headers['content-encoding'] == 'gzip'
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from language_id import LanguageIdentifier
+
+
+@pytest.fixture
+def profile_dir(tmp_path):
+    # Tiny langdetect-format profiles: English and French trigrams only
+    profiles = {
+        'en': {' th': 50, 'the': 40, 'he ': 30, 'ing': 20},
+        'fr': {' le': 50, 'les': 40, 'es ': 30, 'ent': 20, ' de': 20, 'de ': 20}
+    }
+    for language, freq in profiles.items():
+        (tmp_path / language).write_text(json.dumps({'name': language, 'freq': freq, 'n_words': [0, 0, 1000]}))
+    return str(tmp_path)
+
+
+def test_script_fast_path_skips_the_profiles(tmp_path):
+    identifier = LanguageIdentifier(profile_dir=str(tmp_path / 'missing'))
+    assert identifier.identify('भारत की अर्थव्यवस्था तेजी से बढ़ रही है')[0] == 'hi'
+    assert identifier.identify('Экономика России растёт')[0] == 'ru'
+    assert identifier._profiles is None
+
+
+def test_english_stopword_fast_path(tmp_path):
+    identifier = LanguageIdentifier(profile_dir=str(tmp_path / 'missing'))
+    language, confidence = identifier.identify('The company said that it was on track for the quarter.')
+    assert language == 'en' and 0.85 <= confidence <= 1.0
+    assert identifier._profiles is None
+
+
+def test_ngram_model_for_other_latin_text(profile_dir):
+    identifier = LanguageIdentifier(profile_dir=profile_dir)
+    language, confidence = identifier.identify('les entreprises de les marches de les pays')
+    assert language == 'fr' and 0 < confidence <= 1
+
+
+def test_unknown_without_words_or_profiles(tmp_path):
+    identifier = LanguageIdentifier(profile_dir=str(tmp_path / 'missing'))
+    assert identifier.identify('12345 !!!') == (None, 0.0)
+    assert identifier.identify('zzkx qqvw') == (None, 0.0)
+
+
+def test_results_are_cached_by_content(tmp_path, monkeypatch):
+    identifier = LanguageIdentifier(profile_dir=str(tmp_path / 'missing'), cache_size=2)
+    calls = []
+    original = identifier._identify_uncached
+    monkeypatch.setattr(identifier, '_identify_uncached', lambda text: calls.append(text) or original(text))
+
+    texts = ['The market is up.', 'It is a deal for the company.', 'The shares of the firm fell.']
+    assert identifier.identify_batch([texts[0], texts[0]]) == [identifier.identify(texts[0])] * 2
+    assert calls == [texts[0]]
+    # The least recently used entry is evicted beyond cache_size
+    identifier.identify(texts[1])
+    identifier.identify(texts[2])
+    identifier.identify(texts[0])
+    assert calls == [texts[0], texts[1], texts[2], texts[0]]
@@ -0,0 +1,34 @@
+from request_profiler import TraceStore
+
+
+def finished_trace(store, name, elapsed_ms, profile=False):
+    trace = store.start_trace(name, profile=profile)
+    trace.add_span('summarize', 0, elapsed_ms)
+    trace.samples[('main (api.py:1)', 'summarize_text (utils.py:2)')] += 3
+    trace.finish()
+    trace.elapsed_ms = elapsed_ms
+    store.add(trace)
+    return trace
+
+
+def test_trace_is_visible_to_another_store(tmp_path):
+    path = str(tmp_path / 'traces.db')
+    writer, reader = TraceStore(path), TraceStore(path)
+    trace = finished_trace(writer, 'analyze Tesla', 120.0, profile=True)
+
+    stored = reader.get(trace.id)
+    assert stored.summary() == trace.summary()
+    assert stored.collapsed() == trace.collapsed()
+    assert reader.get('missing') is None
+
+
+def test_keeps_slowest_and_recent_profiled(tmp_path):
+    store = TraceStore(str(tmp_path / 'traces.db'), slowest=2, recent_profiles=1)
+    profiled = finished_trace(store, 'profiled', 1.0, profile=True)
+    fast = finished_trace(store, 'fast', 2.0)
+    slow = finished_trace(store, 'slow', 50.0)
+    slower = finished_trace(store, 'slower', 60.0)
+
+    assert [summary['id'] for summary in store.slowest()] == [slower.id, slow.id]
+    assert store.get(profiled.id) is not None
+    assert store.get(fast.id) is None
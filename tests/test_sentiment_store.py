@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from sentiment_store import SentimentStore
+
+
+def timestamp(text):
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp()
+
+
+def article(sentiment, score):
+    return {'url': f"https://example.com/{sentiment}/{score}", 'sentiment': sentiment, 'sentiment_score': score,
+            'topics': ['Finance'], 'summary': ''}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SentimentStore(str(tmp_path / 'sentiment.db'))
+    store.add_articles('Tesla', [article('Positive', 0.8), article('Negative', -0.4)],
+                       analyzed_at=timestamp('2024-01-01T10:15:00'))
+    store.add_articles(' tesla', [article('Neutral', 0.0)], analyzed_at=timestamp('2024-01-01T10:45:00'))
+    store.add_articles('Tesla', [article('Positive', 0.6)], analyzed_at=timestamp('2024-01-02T09:00:00'))
+    store.add_articles('Apple', [article('Negative', -0.9)], analyzed_at=timestamp('2024-01-01T10:30:00'))
+    yield store
+    store.close()
+
+
+def test_hourly_rollups(store):
+    trend = store.trends('Tesla', 'hour')
+    assert [bucket['bucket'] for bucket in trend] == ['2024-01-01T10:00:00+00:00', '2024-01-02T09:00:00+00:00']
+    first = trend[0]
+    assert (first['Positive'], first['Negative'], first['Neutral'], first['count']) == (1, 1, 1, 3)
+    assert first['mean_compound'] == pytest.approx(0.4 / 3)
+
+
+def test_daily_rollups_within_a_range(store):
+    trend = store.trends('TESLA', 'day', start=timestamp('2024-01-01T12:00:00'), end=timestamp('2024-01-02T00:00:00'))
+    # The start is rounded down to its bucket, so the whole first day is included
+    assert [(bucket['bucket'], bucket['count']) for bucket in trend] == [('2024-01-01T00:00:00+00:00', 3)]
+    assert store.trends('Tesla', 'day', start=timestamp('2024-01-02T00:00:00'))[0]['Positive'] == 1
+
+
+def test_unknown_granularity(store):
+    with pytest.raises(ValueError):
+        store.trends('Tesla', 'week')
@@ -0,0 +1,72 @@
+import json
+import hashlib
+
+import pytest
+
+from tenants import Tenant, TenantRegistry, RateLimited, UnknownAPIKey
+
+
+def test_take_refills_at_the_sustained_rate():
+    tenant = Tenant('batch', rate_per_minute=60, burst=2)
+    tenant.updated = 100.0
+    assert tenant.take(100.0) == 0
+    assert tenant.take(100.0) == 0
+    assert tenant.take(100.0) == pytest.approx(1.0)
+    assert tenant.take(100.5) == pytest.approx(0.5)
+    assert tenant.take(101.0) == 0
+    # A clock stepping back doesn't drain the bucket
+    assert tenant.take(50.0) == pytest.approx(1.0)
+
+
+def test_take_without_a_rate_never_waits():
+    tenant = Tenant('interactive')
+    assert all(tenant.take(0) == 0 for _ in range(100))
+
+
+@pytest.fixture
+def tenants_file(tmp_path):
+    path = tmp_path / 'tenants.json'
+    path.write_text(json.dumps({
+        'tenants': [{'name': 'batch', 'api_key_sha256': hashlib.sha256(b'secret').hexdigest(),
+                     'rate_per_minute': 1, 'burst': 2}]
+    }))
+    return str(path)
+
+
+def test_workers_share_rate_limits_and_usage(tmp_path, tenants_file):
+    state_path = str(tmp_path / 'state.db')
+    first = TenantRegistry(tenants_file, state_path=state_path)
+    second = TenantRegistry(tenants_file, state_path=state_path)
+
+    first.check_rate(first.resolve('secret'))
+    second.check_rate(second.resolve('secret'))
+    with pytest.raises(RateLimited) as excinfo:
+        first.check_rate(first.resolve('secret'))
+    assert excinfo.value.retry_after > 50
+
+    first.record(first.resolve('secret'), requests=2, queue_seconds=0.25)
+    second.record(second.resolve('secret'), requests=1, queue_seconds=0.5)
+    usage = second.usage()['batch']['usage']
+    assert (usage['requests'], usage['rate_limited'], usage['queue_seconds']) == (3, 1, 0.75)
+
+    first.close()
+    second.close()
+
+
+def test_unknown_key_and_anonymous_access(tmp_path, tenants_file):
+    registry = TenantRegistry(tenants_file, state_path=str(tmp_path / 'state.db'))
+    with pytest.raises(UnknownAPIKey):
+        registry.resolve('wrong')
+    with pytest.raises(UnknownAPIKey):
+        registry.resolve(None)
+
+    open_registry = TenantRegistry(state_path=str(tmp_path / 'open.db'))
+    assert open_registry.resolve(None).name == TenantRegistry.ANONYMOUS
+
+
+@pytest.mark.parametrize('limits', [{'weight': 0}, {'weight': -1}, {'weight': float('nan')}, {'rate_per_minute': 0}])
+def test_invalid_limits_reject_the_config(tmp_path, limits):
+    path = tmp_path / 'tenants.json'
+    path.write_text(json.dumps({'tenants': [], 'anonymous': limits}))
+    with pytest.raises(ValueError):
+        TenantRegistry(str(path), state_path=str(tmp_path / 'tenants.db'))
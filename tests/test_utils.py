@@ -0,0 +1,397 @@
+import importlib.util
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+UTILS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils (1).py')
+
+
+@pytest.fixture(scope='module')
+def utils():
+    # The API imports "utils (1).py" as utils; load it the same way
+    spec = importlib.util.spec_from_file_location('utils', UTILS_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def slow_news_server():
+    # The benchmark fixtures, with article pages slowed down like a distant publisher
+    from benchmarks.harness import FixtureRequestHandler
+
+    class SlowHandler(FixtureRequestHandler):
+        def do_GET(self):
+            if self.path.startswith('/news/'):
+                time.sleep(0.2)
+            super().do_GET()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def converter(utils):
+    converter = utils.TextToSpeechConverter()
+    converter.tts_available = True
+    converter.translate_to_hindi = lambda text: text
+    converter._speech_segments = lambda text, max_chars: text.split('|')
+    return converter
+
+
+def test_stream_speech_yields_segments_in_order(converter):
+    converter._synthesize = lambda text: text.encode('utf-8')
+    assert list(converter.stream_speech('one|two|three', prefetch=1)) == [b'one', b'two', b'three']
+
+
+def test_stream_speech_raises_synthesis_errors(converter):
+    def synthesize(text):
+        if text == 'two':
+            raise RuntimeError('synthesis failed')
+        return text.encode('utf-8')
+
+    converter._synthesize = synthesize
+    stream = converter.stream_speech('one|two|three')
+    assert next(stream) == b'one'
+    with pytest.raises(RuntimeError):
+        next(stream)
+
+
+def reference_comparative_analysis(articles):
+    """The original, non-incremental comparative analysis the aggregate must reproduce."""
+    sentiment_count = {'Positive': 0, 'Negative': 0, 'Neutral': 0}
+    for article in articles:
+        sentiment_count[article['sentiment']] += 1
+    positive_topics = {topic for a in articles if a['sentiment'] == 'Positive' for topic in a['topics']}
+    negative_topics = {topic for a in articles if a['sentiment'] == 'Negative' for topic in a['topics']}
+    topic_counter = Counter(topic for article in articles for topic in article['topics'])
+    return {
+        'sentiment_distribution': sentiment_count,
+        'contrast': (sorted(positive_topics), sorted(negative_topics))
+        if sentiment_count['Positive'] and sentiment_count['Negative'] else None,
+        'common_topics': [topic for topic, count in topic_counter.items() if count > 1],
+        'unique_topics': [topic for topic, count in topic_counter.items() if count == 1],
+        'article_unique_topics': {
+            f"Article {i + 1}": [topic for topic in article['topics']
+                                 if sum(1 for a in articles if topic in a['topics']) == 1]
+            for i, article in enumerate(articles)
+        }
+    }
+
+
+def normalized(result):
+    """Reduce a comparative analysis to the reference's shape; set iteration order isn't part of the contract."""
+    contrast = None
+    if result['coverage_differences'] and result['coverage_differences'][0]['comparison'].startswith('Positive'):
+        match = re.match(r"Positive articles focus on (.*), while negative articles discuss (.*)\.$",
+                         result['coverage_differences'][0]['comparison'])
+        contrast = tuple(sorted(filter(None, group.split(', '))) for group in match.groups())
+    return {
+        'sentiment_distribution': result['sentiment_distribution'],
+        'contrast': contrast,
+        'common_topics': result['topic_overlap']['common_topics'],
+        'unique_topics': result['topic_overlap']['unique_topics'],
+        'article_unique_topics': result['topic_overlap']['article_unique_topics']
+    }
+
+
+def random_articles(rng, count):
+    topics = ['earnings', 'cloud', 'layoffs', 'lawsuit', 'ai', 'chips', 'merger', 'guidance']
+    return [{
+        'url': f"https://example.com/{rng.random()}",
+        'sentiment': rng.choice(['Positive', 'Negative', 'Neutral']),
+        'topics': rng.sample(topics, rng.randint(0, 4))
+    } for _ in range(count)]
+
+
+def test_comparative_analysis_matches_reference(utils):
+    rng = random.Random(7)
+    analyzer = utils.ComparativeAnalyzer()
+    for _ in range(200):
+        articles = random_articles(rng, rng.randint(1, 8))
+        assert normalized(analyzer.perform_comparative_analysis(articles)) == reference_comparative_analysis(articles)
+
+
+def test_incremental_aggregate_matches_batch(utils):
+    rng = random.Random(11)
+    aggregate = utils.ComparativeAggregate()
+    current = {}
+    for _ in range(300):
+        if current and rng.random() < 0.3:
+            url = rng.choice(list(current))
+            aggregate.remove(key=url)
+            del current[url]
+        elif current and rng.random() < 0.2:
+            # Re-analysis of a stored article replaces it in place
+            url = rng.choice(list(current))
+            article = dict(random_articles(rng, 1)[0], url=url)
+            aggregate.add(article)
+            current[url] = article
+        else:
+            article = random_articles(rng, 1)[0]
+            aggregate.add(article)
+            current[article['url']] = article
+        if current:
+            expected = reference_comparative_analysis(list(current.values()))
+            assert normalized(aggregate.result()) == expected
+
+
+def test_profile_samples_the_fetch_threads(utils, slow_news_server):
+    from crawl_scheduler import CrawlScheduler
+    from feed_source import FeedSource
+    from request_profiler import RequestTrace
+
+    extractor = utils.NewsExtractor(
+        search_url_templates=[f"{slow_news_server}/search?q={{company}}"],
+        scheduler=CrawlScheduler(rate=10000, burst=10000, max_rate=10000, cache_dir=None),
+        feed_source=FeedSource([]))
+    trace = RequestTrace('analyze Acme', profile=True, interval=0.002)
+    with trace.sampling():
+        articles = list(extractor.stream_articles('Acme', 4, trace=trace))
+
+    assert len(articles) == 4
+    assert {'[request]', '[news-search]', '[crawl-fetch]'} <= {stack[0] for stack in trace.samples}
+    # The time goes to the page fetches on the scheduler's pool, not just the request thread waiting for them
+    assert any(stack[0] == '[crawl-fetch]' and any(frame.startswith('_request (crawl_scheduler.py') for frame in stack)
+               for stack in trace.samples)
+    assert '[crawl-fetch];' in trace.collapsed()
+
+
+def test_aggregate_reports_in_position_order(utils):
+    rng = random.Random(5)
+    for _ in range(50):
+        articles = random_articles(rng, rng.randint(1, 8))
+        aggregate = utils.ComparativeAggregate()
+        # Articles finish in any order but are reported in search-result order
+        for position in rng.sample(range(len(articles)), len(articles)):
+            aggregate.add(articles[position], key=position, position=position)
+        result, expected = aggregate.result(), utils.ComparativeAnalyzer().perform_comparative_analysis(articles)
+        assert normalized(result) == normalized(expected)
+        assert result['final_sentiment_analysis'] == expected['final_sentiment_analysis']
+
+
+class StallingScheduler:
+    """Search pages without links; the first article arrives, then fetching hangs."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def fetch(self, url, deadline=None):
+        from crawl_scheduler import CrawlResponse
+        return CrawlResponse(url, 404, '')
+
+    def fetch_stream(self, source, deadline=None, trace=None):
+        from crawl_scheduler import CrawlResponse
+        url = source.get()
+        yield url, CrawlResponse(url, 500, '')
+        self.release.wait(10)
+
+
+def test_stream_articles_stops_at_the_deadline_when_fetching_hangs(utils):
+    from deadline import Deadline
+    from feed_source import FeedSource
+
+    scheduler = StallingScheduler()
+    extractor = utils.NewsExtractor(search_url_templates=['https://search.example.com/?q={company}'],
+                                    scheduler=scheduler, feed_source=FeedSource([]))
+    start = time.monotonic()
+    articles = list(extractor.stream_articles('Acme', 3, deadline=Deadline(300)))
+    assert time.monotonic() - start < 2
+    assert [position for position, _ in articles] == [0]
+    scheduler.release.set()
+
+
+@pytest.fixture
+def sentiment_analyzer(utils):
+    import nltk
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+        return utils.SentimentAnalyzer()
+    except LookupError as e:
+        pytest.skip(f"NLTK data not installed: {e}")
+
+
+def test_entity_sentiment_weights_sentences_that_mention_the_entity(sentiment_analyzer):
+    text = ("Acme Corp reported excellent results and strong growth. "
+            "Globex suffered a terrible loss and a painful lawsuit. "
+            "The weather was mild.")
+    plain = sentiment_analyzer.analyze_entity_sentiment(text, 'Acme', entity_weight=1.0, translate=False)
+    weighted = sentiment_analyzer.analyze_entity_sentiment(text, 'Acme', translate=False)
+
+    assert weighted['entity_mentions'] == 1
+    assert [sentence['mentions_entity'] for sentence in weighted['sentences']] == [True, False, False]
+    assert weighted['scores']['compound'] > plain['scores']['compound']
+    assert weighted['category'] == 'Positive'
+    assert sum(weighted['scores'][key] for key in ('neg', 'neu', 'pos')) == pytest.approx(1.0, abs=0.01)
+
+
+def test_entity_sentiment_matches_aliases_as_whole_words(sentiment_analyzer):
+    text = "Alphabet shares fell sharply after a weak, disappointing quarter. Googleplex visitors were delighted."
+    result = sentiment_analyzer.analyze_entity_sentiment(text, 'Google', aliases=['Alphabet', ' '],
+                                                         translate=False)
+    assert [sentence['mentions_entity'] for sentence in result['sentences']] == [True, False]
+    assert result['category'] == 'Negative'
+
+
+def test_entity_sentiment_of_empty_text(sentiment_analyzer):
+    result = sentiment_analyzer.analyze_entity_sentiment('', 'Acme', translate=False)
+    assert result['entity_mentions'] == 0 and result['sentences'] == []
+    assert result['category'] == 'Neutral'
+
+
+class WordTokenizer:
+    """One token per word, like a tokenizer with a tiny vocabulary."""
+    model_max_length = 28
+
+    def __call__(self, texts, add_special_tokens=True):
+        if isinstance(texts, str):
+            return {'input_ids': list(range(len(texts.split())))}
+        return {'input_ids': [list(range(len(text.split()))) for text in texts]}
+
+
+class RecordingSummarizer:
+    tokenizer = WordTokenizer()
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, max_length, **kwargs):
+        self.calls.append((list(texts), max_length, kwargs.get('batch_size')))
+        # The first word of each sentence stands in for its summary
+        return [{'summary_text': ' '.join(sentence.split()[0] for sentence in text.split('. '))} for text in texts]
+
+
+@pytest.fixture
+def summarizing_analyzer(utils, monkeypatch):
+    # Split sentences on full stops so the test doesn't need NLTK's punkt data
+    monkeypatch.setattr(utils.nltk, 'sent_tokenize',
+                        lambda text: [sentence.strip() for sentence in re.findall(r'[^.]+\.', text)])
+    monkeypatch.setattr(utils, 'SentimentIntensityAnalyzer', lambda: None)
+    analyzer = utils.SentimentAnalyzer(max_chunks=8, summary_batch_size=2)
+    analyzer._summarizer = RecordingSummarizer()
+    return analyzer
+
+
+def sentence(word, length):
+    return ' '.join([word] * (length - 1) + [word + '.'])
+
+
+def test_chunks_fill_the_window_at_sentence_boundaries(summarizing_analyzer):
+    lengths = [8, 8, 5, 12, 25, 3]
+    text = ' '.join(sentence(f"w{i}", length) for i, length in enumerate(lengths))
+    chunks = summarizing_analyzer._chunk_by_tokens(text, WordTokenizer(), 20)
+
+    assert [tokens for _, tokens in chunks] == [16, 17, 25, 3]
+    # A sentence longer than the window gets a chunk of its own; nothing is lost or reordered
+    assert ' '.join(chunk for chunk, _ in chunks) == text
+    assert summarizing_analyzer._chunk_by_tokens('', WordTokenizer(), 20) == []
+
+
+def test_long_text_is_summarized_map_reduce(summarizing_analyzer):
+    text = ' '.join(sentence(word, 10) for word in ('alpha', 'beta', 'gamma', 'delta', 'epsilon'))
+    summary = summarizing_analyzer.summarize_text(text, max_length=150)
+
+    summarizer = summarizing_analyzer._summarizer
+    # Map: three chunks of the 20-token window, the shortest batched first; reduce: one call over the joined summaries
+    assert [(texts, batch_size) for texts, _, batch_size in summarizer.calls[:2]] == [
+        ([sentence('epsilon', 10), ' '.join(sentence(word, 10) for word in ('alpha', 'beta'))], 2),
+        ([' '.join(sentence(word, 10) for word in ('gamma', 'delta'))], 1)]
+    assert summarizer.calls[2][0] == ['alpha beta gamma delta epsilon']
+    assert summary == 'alpha'
+    assert len(summarizer.calls) == 3
+
+
+def test_short_text_is_summarized_once(summarizing_analyzer):
+    assert summarizing_analyzer.summarize_text(sentence('alpha', 6), max_length=150) == 'alpha'
+    texts, max_length, _ = summarizing_analyzer._summarizer.calls[0]
+    # The summary may not be longer than the chunk
+    assert len(summarizing_analyzer._summarizer.calls) == 1 and max_length == 16
+
+
+def test_chunks_beyond_max_chunks_are_dropped(summarizing_analyzer):
+    summarizing_analyzer.max_chunks = 2
+    text = ' '.join(sentence(word, 15) for word in ('alpha', 'beta', 'gamma', 'delta'))
+    assert summarizing_analyzer.summarize_text(text, max_length=150) == 'alpha'
+    assert [texts for texts, _, _ in summarizing_analyzer._summarizer.calls] == [
+        [sentence('alpha', 15), sentence('beta', 15)], ['alpha beta']]
+
+
+class ReorderingScheduler:
+    """Completes fetches in reverse order; a URL mapped to an exception fails, and fail_after ends the stream."""
+
+    def __init__(self, errors=None, fail_after=None):
+        self.errors = errors or {}
+        self.fail_after = fail_after
+
+    def fetch_stream(self, source, deadline=None, trace=None):
+        from crawl_scheduler import CrawlResponse
+        urls = list(iter(source.get, None))
+        for count, url in enumerate(reversed(urls)):
+            if count == self.fail_after:
+                raise RuntimeError("scheduler shut down")
+            if url in self.errors:
+                yield url, self.errors[url]
+            else:
+                yield url, CrawlResponse(url, 200, f"<html><title>{url}</title><p>{'Acme news. ' * 20}</p></html>")
+
+
+def streaming_extractor(utils, scheduler, urls):
+    from feed_source import FeedSource
+
+    extractor = utils.NewsExtractor(search_url_templates=['https://search.example.com/?q={company}'],
+                                    scheduler=scheduler, feed_source=FeedSource([]))
+    extractor.iter_search_results = lambda company_name, num_articles, deadline=None: iter(urls[:num_articles])
+    return extractor
+
+
+def test_stream_articles_yields_search_positions_in_completion_order(utils):
+    urls = [f"https://news.example.com/acme-{i}" for i in range(5)]
+    extractor = streaming_extractor(utils, ReorderingScheduler(), urls)
+    articles = list(extractor.stream_articles('Acme', 4, max_buffered=1))
+
+    assert [position for position, _ in articles] == [3, 2, 1, 0]
+    assert [article['url'] for _, article in articles] == urls[3::-1]
+    assert articles[0][1]['title'] == urls[3]
+
+
+def test_stream_articles_survives_fetch_errors(utils, capsys):
+    import requests
+
+    urls = [f"https://news.example.com/acme-{i}" for i in range(3)]
+    scheduler = ReorderingScheduler(errors={urls[1]: requests.ConnectionError("connection reset")})
+    articles = dict(streaming_extractor(utils, scheduler, urls).stream_articles('Acme', 3))
+
+    # The failed page falls back to a placeholder article instead of ending the stream
+    assert sorted(articles) == [0, 1, 2]
+    assert articles[1]['url'] == urls[1] and articles[1]['title'] != urls[1]
+    assert f"Error extracting content from {urls[1]}" in capsys.readouterr().out
+
+
+def test_stream_articles_ends_when_the_fetch_stream_fails(utils, capsys):
+    urls = [f"https://news.example.com/acme-{i}" for i in range(3)]
+    start = time.monotonic()
+    articles = list(streaming_extractor(utils, ReorderingScheduler(fail_after=1), urls).stream_articles('Acme', 3))
+
+    assert [position for position, _ in articles] == [2]
+    assert time.monotonic() - start < 2
+    assert "Error fetching articles for Acme: scheduler shut down" in capsys.readouterr().out
+
+
+def test_closing_the_stream_stops_its_threads(utils):
+    urls = [f"https://news.example.com/acme-{i}" for i in range(5)]
+    before = set(threading.enumerate())
+    stream = streaming_extractor(utils, ReorderingScheduler(), urls).stream_articles('Acme', 5, max_buffered=1)
+    assert next(stream)[0] == 4
+    stream.close()
+    assert not [thread for thread in set(threading.enumerate()) - before if thread.name.startswith('news-')]
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from work_queue import WorkQueue, SQLiteWorkQueue, open_work_queue
+from worker import run_task
+
+
+@pytest.fixture
+def queue(tmp_path):
+    work_queue = open_work_queue(f"sqlite:///{tmp_path / 'queue.db'}")
+    yield work_queue
+    work_queue.close()
+
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        WorkQueue()
+
+
+def test_claim_takes_each_task_once(queue):
+    assert isinstance(queue, SQLiteWorkQueue)
+    queue.submit('job', 0, {'n': 0})
+    queue.submit('job', 1, {'n': 1})
+    queue.submit('other', 0, {'n': 2})
+
+    first = queue.claim('w1')
+    second = queue.claim('w2', job_id='job')
+    assert (first['position'], first['payload'], first['attempts']) == (0, {'n': 0}, 1)
+    assert second['position'] == 1
+    assert queue.claim('w3', job_id='job') is None
+
+    assert queue.complete(first['id'], 'w1', {'ok': True})
+    assert not queue.complete(second['id'], 'w1', {'ok': True})
+    done, = queue.finished('job')
+    assert (done['position'], done['status'], done['result']) == (0, 'done', {'ok': True})
+
+
+def test_expired_lease_is_claimed_again(queue):
+    queue.submit('job', 0, {})
+    task = queue.claim('w1', lease_seconds=-1)
+    retry = queue.claim('w2')
+    assert retry['id'] == task['id']
+    assert retry['attempts'] == 2
+
+    # The first worker lost its lease, so its late result is discarded
+    assert not queue.complete(task['id'], 'w1', 'late')
+    assert queue.complete(retry['id'], 'w2', 'on time')
+    assert queue.finished('job')[0]['result'] == 'on time'
+
+
+def test_failed_task_is_retried_until_max_attempts(queue):
+    queue.submit('job', 0, {})
+    for attempt in range(1, 3):
+        task = queue.claim('w1')
+        assert task['attempts'] == attempt
+        assert queue.fail(task['id'], 'w1', RuntimeError('boom'), max_attempts=2)
+    assert queue.claim('w1') is None
+    failed, = queue.finished('job')
+    assert (failed['status'], failed['error']) == ('failed', 'boom')
+
+    queue.delete_job('job')
+    assert queue.finished('job') == []
+
+
+class RecordingAnalyzer:
+    def process_article(self, article, company_name, deadline=None, **kwargs):
+        return {'remaining': None if deadline is None else deadline.remaining()}
+
+
+def test_task_deadline_includes_time_spent_queued():
+    payload = {'article': {}, 'company_name': 'Acme', 'sentiment_mode': 'document',
+               'translate': False, 'extractive': False}
+    assert run_task(RecordingAnalyzer(), dict(payload, deadline_at=None))['remaining'] is None
+    assert run_task(RecordingAnalyzer(), dict(payload, deadline_at=time.time() - 5))['remaining'] == 0
+    remaining = run_task(RecordingAnalyzer(), dict(payload, deadline_at=time.time() + 10))['remaining']
+    assert 9 < remaining <= 10
@@ -1,100 +1,331 @@
+import io
 import os
 import re
 import json
-import requests
-import pandas as pd
+import queue
+import threading
 import nltk
 from nltk.sentiment import SentimentIntensityAnalyzer
-from bs4 import BeautifulSoup
-from langdetect import detect
-from googletrans import Translator
-from transformers import pipeline
-from sklearn.feature_extraction.text import TfidfVectorizer
 from collections import Counter
-import nltk
-nltk.download('punkt')
+from contextlib import nullcontext
+from lazy_import import lazy_import
+from language_id import LanguageIdentifier
+from crawl_scheduler import CrawlScheduler
+from feed_source import FeedSource
+
+# Heavy modules are only imported on the code paths that use them
+bs4 = lazy_import('bs4')
+googletrans = lazy_import('googletrans')
+transformers = lazy_import('transformers')
+
 
+# Download NLTK resources, skipping the network round trip when they are already installed
+NLTK_RESOURCES = {
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+    'punkt': 'tokenizers/punkt',
+    'stopwords': 'corpora/stopwords'
+}
+for resource, path in NLTK_RESOURCES.items():
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        nltk.download(resource, quiet=True)
 
-# Download NLTK resources
-nltk.download('vader_lexicon', quiet=True)
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
+# Model pipelines shared by every analyzer in the process
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+def shared_pipeline(task, model):
+    """
+    Get a transformers pipeline, loading it the first time it is asked for in this process.
+    
+    Args:
+        task (str): Pipeline task, e.g. "summarization"
+        model (str): Model name on the Hugging Face hub
+        
+    Returns:
+        Pipeline: The loaded pipeline
+    """
+    with _pipelines_lock:
+        if (task, model) not in _pipelines:
+            _pipelines[(task, model)] = transformers.pipeline(task, model=model)
+        return _pipelines[(task, model)]
 
 class NewsExtractor:
     """Class for extracting news articles about a company."""
     
-    def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+    # Using a search engine API or creating a custom Google search
+    # For this example, we'll use a dummy search URL
+    SEARCH_URL_TEMPLATES = [
+        "https://news.google.com/search?q={company}",
+        "https://www.reuters.com/search/news?blob={company}",
+        "https://www.bbc.co.uk/search?q={company}&filter=news"
+    ]
+    
+    def __init__(self, search_url_templates=None, scheduler=None, feed_source=None):
+        """
+        Args:
+            search_url_templates (list): Search page URLs with a {company} placeholder, defaults to SEARCH_URL_TEMPLATES
+            scheduler (CrawlScheduler): Rate-limited, robots-aware fetcher shared by all requests, defaults to a new one
+            feed_source (FeedSource): RSS/Atom feeds tried before the search pages, defaults to FeedSource.FEED_URL_TEMPLATES
+        """
+        self.search_url_templates = search_url_templates or self.SEARCH_URL_TEMPLATES
+        self.scheduler = scheduler or CrawlScheduler()
+        self.feed_source = feed_source or FeedSource()
         
-    def search_news(self, company_name, num_articles=10):
+    def search_news(self, company_name, num_articles=10, deadline=None):
         """
         Search for news articles about the given company.
         
         Args:
             company_name (str): The name of the company
             num_articles (int): Number of articles to return
+            deadline (Deadline): Optional time budget; remaining search pages are skipped once it runs out
             
         Returns:
             list: List of article URLs
         """
-        # Using a search engine API or creating a custom Google search
-        # For this example, we'll use a dummy search URL
-        search_urls = [
-            f"https://news.google.com/search?q={company_name}",
-            f"https://www.reuters.com/search/news?blob={company_name}",
-            f"https://www.bbc.co.uk/search?q={company_name}&filter=news"
-        ]
+        return list(self.iter_search_results(company_name, num_articles, deadline=deadline))
+    
+    def iter_search_results(self, company_name, num_articles=10, deadline=None):
+        """
+        Yield article URLs for the given company as each search page is parsed.
+        
+        Search pages are fetched in order and no more are fetched once
+        num_articles URLs have been found.
+        
+        Args:
+            company_name (str): The name of the company
+            num_articles (int): Number of articles to yield
+            deadline (Deadline): Optional time budget; remaining search pages are skipped once it runs out
+            
+        Yields:
+            str: Article URL
+        """
+        search_urls = [template.format(company=company_name) for template in self.search_url_templates]
         
-        article_urls = []
+        article_urls = set()
         
         for search_url in search_urls:
+            if len(article_urls) >= num_articles or (deadline is not None and deadline.expired()):
+                break
             try:
-                response = requests.get(search_url, headers=self.headers, timeout=10)
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Extract article URLs (this would need to be adapted based on the actual website structure)
-                    links = soup.find_all('a', href=True)
-                    for link in links:
-                        # Filter for news article links
-                        href = link['href']
-                        if any(term in href.lower() for term in ['article', 'news', 'story']):
-                            # Ensure it's a complete URL
-                            if not href.startswith('http'):
-                                base_url = '/'.join(search_url.split('/')[:3])
-                                href = f"{base_url}{href if href.startswith('/') else '/' + href}"
-                            
-                            if href not in article_urls:
-                                article_urls.append(href)
-                                if len(article_urls) >= num_articles:
-                                    break
+                response = self.scheduler.fetch(search_url, deadline=deadline)
+                links = self._article_links(search_url, response.text) if response.status_code == 200 else []
             except Exception as e:
                 print(f"Error fetching search results from {search_url}: {e}")
+                continue
+            
+            for href in links:
+                if href not in article_urls:
+                    article_urls.add(href)
+                    yield href
+                    if len(article_urls) >= num_articles:
+                        break
         
         # For demonstration, if we couldn't find enough real articles, we'll add some dummy URLs
-        if len(article_urls) < num_articles:
-            for i in range(len(article_urls), num_articles):
-                article_urls.append(f"https://example.com/news/{company_name.lower()}-article-{i}")
+        for i in range(len(article_urls), num_articles):
+            yield f"https://example.com/news/{company_name.lower()}-article-{i}"
+    
+    def _article_links(self, search_url, html):
+        """Get the article links on a search results page, as absolute URLs."""
+        soup = bs4.BeautifulSoup(html, 'html.parser')
         
-        return article_urls[:num_articles]
+        # Extract article URLs (this would need to be adapted based on the actual website structure)
+        hrefs = []
+        links = soup.find_all('a', href=True)
+        for link in links:
+            # Filter for news article links
+            href = link['href']
+            if any(term in href.lower() for term in ['article', 'news', 'story']):
+                # Ensure it's a complete URL
+                if not href.startswith('http'):
+                    base_url = '/'.join(search_url.split('/')[:3])
+                    href = f"{base_url}{href if href.startswith('/') else '/' + href}"
+                hrefs.append(href)
+        return hrefs
     
-    def extract_article_content(self, url):
+    def extract_article_content(self, url, deadline=None):
         """
         Extract content from a news article URL.
         
         Args:
             url (str): URL of the news article
+            deadline (Deadline): Optional time budget used to clamp the fetch timeout
             
         Returns:
             dict: Dictionary containing title, content, and other metadata
         """
         try:
             # For real implementation, fetch the actual article content
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.scheduler.fetch(url, deadline=deadline)
+        except Exception as e:
+            response = e
+        return self._parse_article(url, response)
+    
+    def extract_articles(self, urls, deadline=None):
+        """
+        Extract content from several news article URLs, fetching them concurrently.
+        
+        Requests are spread across the sources' domains in turn and each domain
+        is held to its own rate limit.
+        
+        Args:
+            urls (list): URLs of the news articles
+            deadline (Deadline): Optional time budget; articles not fetched before it runs out are None
+            
+        Returns:
+            list: Article dictionaries in the same order as urls, or None for articles that were not fetched
+        """
+        responses = self.scheduler.fetch_many(urls, deadline=deadline)
+        return [self._parse_article(url, responses[url]) if url in responses else None for url in urls]
+    
+    def stream_articles(self, company_name, num_articles=10, deadline=None, max_buffered=4, aliases=None,
+                        trace=None):
+        """
+        Search for, fetch and parse articles as connected stages, yielding each article as soon as it is ready.
+        
+        Articles come from the RSS/Atom feeds first. Entries that don't
+        mention the company are dropped before anything is fetched, and an
+        entry whose feed summary is long enough is used as it is, with no
+        page fetch. Search pages are only scraped for whatever the feeds
+        didn't supply.
+        
+        A search thread feeds URLs to the crawl scheduler as each feed or
+        results page is parsed, so fetching starts with the first URL found. A fetch
+        thread parses the pages as they arrive and hands the articles over
+        through a queue of max_buffered entries; when the consumer falls
+        behind, the queue fills and fetching pauses until it catches up.
+        
+        The consumer waits for articles in short polls, so the stream ends
+        when the deadline runs out, or when the fetch thread is gone without
+        having reported its end, instead of blocking forever. Closing the
+        generator stops the search and fetch threads.
+        
+        Args:
+            company_name (str): The name of the company
+            num_articles (int): Number of articles to fetch
+            deadline (Deadline): Optional time budget; no new searches or fetches start once it runs out
+            max_buffered (int): Parsed articles held for the consumer before fetching pauses
+            aliases (list): Other names the company is mentioned by, for filtering feed entries
+            trace (RequestTrace): Optional trace whose profile also samples the search and fetch threads
+            
+        Yields:
+            tuple: Position of the article in the search results, and the article dictionary, in completion order
+        """
+        urls = queue.Queue()
+        articles = queue.Queue(maxsize=max_buffered)
+        positions = {}
+        feed_entries = {}
+        stop = threading.Event()
+        done = object()
+        traced = trace.thread if trace is not None else (lambda name: nullcontext())
+        
+        def put(item):
+            # Give up instead of blocking forever if the consumer has gone away
+            while not stop.is_set():
+                try:
+                    articles.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        def search():
+            with traced('news-search'):
+                try:
+                    for entry in self.feed_source.entries(self.scheduler, company_name, aliases, deadline=deadline):
+                        if stop.is_set() or len(positions) >= num_articles:
+                            break
+                        positions[entry['url']] = len(positions)
+                        if self.feed_source.is_self_sufficient(entry):
+                            if not put((positions[entry['url']], self.feed_source.to_article(entry))):
+                                return
+                        else:
+                            feed_entries[entry['url']] = entry
+                            urls.put(entry['url'])
+                
+                    remaining = num_articles - len(positions)
+                    if remaining > 0 and not stop.is_set():
+                        for url in self.iter_search_results(company_name, remaining, deadline=deadline):
+                            if stop.is_set():
+                                break
+                            if url not in positions:
+                                positions[url] = len(positions)
+                                urls.put(url)
+                except Exception as e:
+                    print(f"Error searching news for {company_name}: {e}")
+                finally:
+                    urls.put(None)
+        
+        def fetch():
+            with traced('news-fetch'):
+                try:
+                    for url, response in self.scheduler.fetch_stream(urls, deadline=deadline, trace=trace):
+                        if url in feed_entries:
+                            article = self._merge_feed_entry(url, response, feed_entries[url])
+                        else:
+                            article = self._parse_article(url, response)
+                        if not put((positions[url], article)):
+                            break
+                except Exception as e:
+                    print(f"Error fetching articles for {company_name}: {e}")
+                finally:
+                    put(done)
+        
+        threads = [
+            threading.Thread(target=search, name='news-search', daemon=True),
+            threading.Thread(target=fetch, name='news-fetch', daemon=True)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                try:
+                    item = articles.get(timeout=deadline.timeout(0.5) if deadline is not None else 0.5)
+                except queue.Empty:
+                    if deadline is not None and deadline.expired():
+                        break
+                    # Nothing more can arrive once the fetch thread has exited
+                    if not threads[1].is_alive() and articles.empty():
+                        print(f"Article fetching for {company_name} stopped without finishing")
+                        break
+                    continue
+                if item is done:
+                    break
+                yield item
+        finally:
+            stop.set()
+            # Unblock the fetcher if it is waiting for URLs; both threads check stop between steps
+            urls.put(None)
+            for thread in threads:
+                thread.join(timeout=0.5)
+    
+    def _merge_feed_entry(self, url, response, entry):
+        """Parse a fetched page, filling gaps from its feed entry, or use the entry alone if the fetch failed."""
+        if isinstance(response, Exception) or response.status_code != 200:
+            print(f"Using feed entry for {url}, page fetch failed: "
+                  f"{response if isinstance(response, Exception) else response.status_code}")
+            return self.feed_source.to_article(entry)
+        
+        article = self._parse_article(url, response)
+        feed_article = self.feed_source.to_article(entry)
+        if not article['content']:
+            article['content'] = feed_article['content']
+        for key, missing in (('title', "No title found"), ('published_date', "Date not found"), ('author', "Author not found")):
+            if article[key] == missing:
+                article[key] = feed_article[key]
+        return article
+    
+    def _parse_article(self, url, response):
+        if isinstance(response, Exception):
+            print(f"Error extracting content from {url}: {response}")
+            # Return dummy data for demonstration
+            return self._generate_dummy_article(url)
+        
+        try:
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = bs4.BeautifulSoup(response.text, 'html.parser')
                 
                 # Extract title
                 title = soup.find('title')
@@ -199,68 +430,302 @@ class NewsExtractor:
 class SentimentAnalyzer:
     """Class for performing sentiment analysis on news articles."""
     
-    def __init__(self):
+    def __init__(self, translation_threshold=0.7, max_chunks=8, summary_batch_size=4):
+        """
+        Args:
+            translation_threshold (float): Minimum language identification confidence before non-English text is translated
+            max_chunks (int): Most model-sized chunks of one article that are summarized; the rest is dropped
+            summary_batch_size (int): Chunks summarized per model call
+        """
         self.sia = SentimentIntensityAnalyzer()
-        self.translator = Translator()
-        self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-        self.tfidf = TfidfVectorizer(stop_words='english', max_features=100)
+        self._translator = None
+        self.language_identifier = LanguageIdentifier()
+        self.translation_threshold = translation_threshold
+        self.max_chunks = max_chunks
+        self.summary_batch_size = summary_batch_size
+        self._summarizer = None
+    
+    @property
+    def translator(self):
+        """Google Translate client, created on first use."""
+        if self._translator is None:
+            self._translator = googletrans.Translator()
+        return self._translator
+    
+    @property
+    def summarizer(self):
+        """BART summarization pipeline, loaded on first use."""
+        if self._summarizer is None:
+            self._summarizer = shared_pipeline("summarization", "facebook/bart-large-cnn")
+        return self._summarizer
+    
+    def load_models(self):
+        """Load the models now instead of on the first request that needs them."""
+        return self.summarizer
+    
+    def process_article(self, article, company_name, sentiment_mode='document', aliases=None, translate=True,
+                        extractive=False, deadline=None, trace=None):
+        """
+        Run sentiment analysis, summarization and topic extraction on one article.
+        
+        Args:
+            article (dict): Article with title, content, url and published_date
+            company_name (str): Name of the company the article was found for
+            sentiment_mode (str): "document" to score the whole text, "entity" to weight sentences about the company
+            aliases (list): Other names the company is mentioned by, for entity mode
+            translate (bool): Translate non-English text to English first
+            extractive (bool): Use the cheap extractive summary instead of BART
+            deadline (Deadline): Optional time budget; the summary falls back to extractive once it runs out
+            trace (RequestTrace): Optional trace that records how long each stage takes
+            
+        Returns:
+            dict: Processed article as returned by /analyze
+        """
+        span = trace.span if trace is not None else (lambda name, **attrs: nullcontext())
+        
+        # Analyze sentiment of the whole page, or of the sentences about the company
+        with span('sentiment', url=article['url']):
+            if sentiment_mode == 'entity':
+                sentiment_result = self.analyze_entity_sentiment(
+                    article['content'], company_name, aliases=aliases, translate=translate)
+            else:
+                sentiment_result = self.analyze_sentiment(article['content'], translate=translate)
+        
+        # Generate summary, falling back to the extractive one if the budget ran out mid-article
+        with span('summarize', url=article['url']):
+            summary = self.summarize_text(
+                article['content'], extractive=extractive or (deadline is not None and deadline.expired()))
+        
+        # Extract topics
+        with span('topics', url=article['url']):
+            topics = self.extract_topics(article['content'])
+        
+        processed_article = {
+            'title': article['title'],
+            'summary': summary,
+            'content': article['content'],
+            'url': article['url'],
+            'sentiment': sentiment_result['category'],
+            'sentiment_score': sentiment_result['scores']['compound'],
+            'published_date': article.get('published_date'),
+            'topics': topics
+        }
+        if sentiment_mode == 'entity':
+            processed_article['entity_sentiment'] = {
+                'entity_mentions': sentiment_result['entity_mentions'],
+                'sentences': sentiment_result['sentences']
+            }
+        return processed_article
     
-    def analyze_sentiment(self, text):
+    def analyze_sentiment(self, text, translate=True):
         """
         Analyze sentiment of the given text.
         
         Args:
             text (str): Text to analyze
+            translate (bool): Translate non-English text to English first
             
         Returns:
             dict: Sentiment scores and category
         """
-        # Detect language and translate if not English
-        try:
-            lang = detect(text[:100])
-            if lang != 'en':
-                text = self.translator.translate(text, dest='en').text
-        except Exception as e:
-            print(f"Error in language detection/translation: {e}")
+        if translate:
+            text = self._to_english(text)
         
         # Perform sentiment analysis
         sentiment_scores = self.sia.polarity_scores(text)
         
-        # Determine sentiment category
-        if sentiment_scores['compound'] >= 0.05:
-            category = 'Positive'
-        elif sentiment_scores['compound'] <= -0.05:
-            category = 'Negative'
+        return {
+            'scores': sentiment_scores,
+            'category': self._categorize(sentiment_scores['compound'])
+        }
+    
+    def analyze_entity_sentiment(self, text, entity, aliases=None, entity_weight=3.0, translate=True):
+        """
+        Analyze sentiment sentence by sentence, weighting sentences that mention the entity.
+        
+        The text is split into sentences once and each sentence is scored with
+        VADER in a single pass, so the cost is close to one whole-document call.
+        
+        Args:
+            text (str): Text to analyze
+            entity (str): Name of the company the sentiment should be about
+            aliases (list): Other names the company is mentioned by
+            entity_weight (float): Weight of sentences that mention the entity, relative to 1 for the rest
+            translate (bool): Translate non-English text to English first
+            
+        Returns:
+            dict: Entity-weighted scores and category, the number of sentences mentioning the entity, and per-sentence scores
+        """
+        if translate:
+            text = self._to_english(text)
+        
+        names = [entity] + list(aliases or [])
+        pattern = re.compile(r'\b(?:' + '|'.join(re.escape(name.strip()) for name in names if name.strip()) + r')\b',
+                             re.IGNORECASE)
+        
+        sentences = []
+        totals = {'neg': 0.0, 'neu': 0.0, 'pos': 0.0, 'compound': 0.0}
+        total_weight = 0.0
+        mentions = 0
+        for sentence in nltk.sent_tokenize(text):
+            scores = self.sia.polarity_scores(sentence)
+            mentions_entity = bool(pattern.search(sentence))
+            weight = entity_weight if mentions_entity else 1.0
+            for key in totals:
+                totals[key] += scores[key] * weight
+            total_weight += weight
+            mentions += mentions_entity
+            sentences.append({
+                'text': sentence,
+                'compound': scores['compound'],
+                'mentions_entity': mentions_entity
+            })
+        
+        if total_weight:
+            entity_scores = {key: value / total_weight for key, value in totals.items()}
         else:
-            category = 'Neutral'
+            entity_scores = dict(totals)
         
         return {
-            'scores': sentiment_scores,
-            'category': category
+            'scores': entity_scores,
+            'category': self._categorize(entity_scores['compound']),
+            'entity_mentions': mentions,
+            'sentences': sentences
         }
     
-    def summarize_text(self, text, max_length=150):
+    def _to_english(self, text):
+        """Translate text to English when it is confidently identified as another language."""
+        try:
+            lang, confidence = self.language_identifier.identify(text)
+            if lang is not None and lang != 'en' and confidence >= self.translation_threshold:
+                return self.translator.translate(text, dest='en').text
+        except Exception as e:
+            print(f"Error in language detection/translation: {e}")
+        return text
+    
+    def _categorize(self, compound):
+        """Map a compound score to a sentiment category."""
+        if compound >= 0.05:
+            return 'Positive'
+        elif compound <= -0.05:
+            return 'Negative'
+        return 'Neutral'
+    
+    def summarize_text(self, text, max_length=150, extractive=False, long_document=True):
         """
         Generate a summary of the given text.
         
+        Long texts are summarized map-reduce style: the text is split at
+        sentence boundaries into chunks that fill the model's input window,
+        the chunks are summarized, and the joined chunk summaries are
+        summarized again. Text that fits in one chunk is summarized once.
+        
         Args:
             text (str): Text to summarize
             max_length (int): Maximum length of the summary
+            extractive (bool): Use the cheap extractive summary instead of BART
+            long_document (bool): Summarize the whole text instead of only its first 1024 characters
             
         Returns:
             str: Summarized text
         """
-        # Limit input text to prevent errors with large inputs
-        text = text[:1024]
+        if extractive:
+            return self.extractive_summary(text)
         
         try:
-            summary = self.summarizer(text, max_length=max_length, min_length=30, do_sample=False)
-            return summary[0]['summary_text']
+            if not long_document:
+                # Limit input text to prevent errors with large inputs
+                summary = self.summarizer(text[:1024], max_length=max_length, min_length=30, do_sample=False)
+                return summary[0]['summary_text']
+            return self._map_reduce_summary(text, max_length)
         except Exception as e:
             print(f"Error in summarization: {e}")
             # Fallback to a simple summary if model fails
-            sentences = nltk.sent_tokenize(text)
-            return ' '.join(sentences[:3])
+            return self.extractive_summary(text)
+    
+    def _map_reduce_summary(self, text, max_length, depth=0):
+        tokenizer = self.summarizer.tokenizer
+        # Leave room for the special tokens the pipeline adds
+        window = min(tokenizer.model_max_length, 1024) - 8
+        chunks = self._chunk_by_tokens(text, tokenizer, window)[:self.max_chunks]
+        if not chunks:
+            return ''
+        
+        summaries = self._summarize_chunks(chunks, max_length)
+        if len(summaries) == 1:
+            return summaries[0]
+        
+        # Reduce; in the rare case the joined summaries still overflow the window, reduce them again
+        joined = ' '.join(summaries)
+        if depth < 2 and len(tokenizer(joined, add_special_tokens=False)['input_ids']) > window:
+            return self._map_reduce_summary(joined, max_length, depth + 1)
+        return self._summarize_chunks([(joined, window)], max_length)[0]
+    
+    def _chunk_by_tokens(self, text, tokenizer, window):
+        """
+        Split text at sentence boundaries into chunks of at most window tokens.
+        
+        Returns:
+            list: (chunk text, token count) tuples in document order
+        """
+        sentences = nltk.sent_tokenize(text)
+        if not sentences:
+            return []
+        lengths = [len(ids) for ids in tokenizer(sentences, add_special_tokens=False)['input_ids']]
+        
+        chunks = []
+        current = []
+        current_tokens = 0
+        for sentence, length in zip(sentences, lengths):
+            # A sentence longer than the window gets a chunk of its own and is truncated by the model
+            if current and current_tokens + length > window:
+                chunks.append((' '.join(current), current_tokens))
+                current = []
+                current_tokens = 0
+            current.append(sentence)
+            current_tokens += length
+        if current:
+            chunks.append((' '.join(current), current_tokens))
+        return chunks
+    
+    def _summarize_chunks(self, chunks, max_length):
+        """
+        Summarize chunks in batches of similar length, so little of each batch is padding.
+        
+        Args:
+            chunks (list): (chunk text, token count) tuples
+            max_length (int): Maximum length of each summary in tokens
+        
+        Returns:
+            list: Summaries in the same order as chunks
+        """
+        order = sorted(range(len(chunks)), key=lambda i: chunks[i][1])
+        summaries = [None] * len(chunks)
+        for start in range(0, len(order), self.summary_batch_size):
+            batch = order[start:start + self.summary_batch_size]
+            # Don't ask for a summary longer than the shortest chunk in the batch
+            shortest = chunks[batch[0]][1]
+            batch_max = max(16, min(max_length, shortest))
+            outputs = self.summarizer([chunks[i][0] for i in batch], max_length=batch_max,
+                                      min_length=min(30, shortest // 2), do_sample=False, truncation=True,
+                                      batch_size=len(batch))
+            for i, output in zip(batch, outputs):
+                summaries[i] = output['summary_text']
+        return summaries
+    
+    def extractive_summary(self, text, num_sentences=3):
+        """
+        Summarize text by keeping its leading sentences, without running a model.
+        
+        Args:
+            text (str): Text to summarize
+            num_sentences (int): Number of sentences to keep
+            
+        Returns:
+            str: Summarized text
+        """
+        sentences = nltk.sent_tokenize(text)
+        return ' '.join(sentences[:num_sentences])
     
     def extract_topics(self, text):
         """
@@ -317,66 +782,124 @@ class SentimentAnalyzer:
         return list(detected_topics)
 
 
-class ComparativeAnalyzer:
-    """Class for performing comparative analysis across articles."""
+class ComparativeAggregate:
+    """Class for maintaining a comparative analysis incrementally as articles are added and removed."""
     
     def __init__(self):
-        self.tfidf = TfidfVectorizer(stop_words='english')
+        self.sentiment_count = {'Positive': 0, 'Negative': 0, 'Neutral': 0}
+        # key -> (sequence number, article)
+        self.articles = {}
+        # sequence number -> article
+        self._by_seq = {}
+        # topic -> {article sequence number: occurrences in that article}
+        self.topic_articles = {}
+        # topic -> total occurrences across articles
+        self.topic_occurrences = Counter()
+        # sentiment -> topic -> occurrences across articles with that sentiment
+        self.sentiment_topics = {sentiment: Counter() for sentiment in self.sentiment_count}
+        self._next_seq = 0
     
-    def perform_comparative_analysis(self, articles):
+    def __len__(self):
+        return len(self.articles)
+    
+    def add(self, article, key=None, position=None):
         """
-        Perform comparative analysis across multiple articles.
+        Add an article, replacing any article already stored under the same key.
         
         Args:
-            articles (list): List of article dictionaries with sentiment analysis
-            
-        Returns:
-            dict: Comparative analysis results
+            article (dict): Article dictionary with sentiment and topics
+            key: Identity of the article, defaults to its URL
+            position (int): Place of the article in the report, e.g. its search rank, for articles
+                that arrive out of order; unique per article. Defaults to after every article so far,
+                or the replaced article's place
         """
-        # Count sentiment distribution
-        sentiment_count = {'Positive': 0, 'Negative': 0, 'Neutral': 0}
-        for article in articles:
-            sentiment_count[article['sentiment']] += 1
+        key = article['url'] if key is None else key
+        if key in self.articles:
+            seq, stored = self.articles[key]
+            self._unapply(seq, stored)
+            del self._by_seq[seq]
+        else:
+            seq = self._next_seq
+        if position is not None:
+            seq = position
+        self._next_seq = max(self._next_seq, seq + 1)
         
-        # Analyze content similarity
-        article_texts = [article['content'] for article in articles]
+        self.articles[key] = (seq, article)
+        self._by_seq[seq] = article
+        self.sentiment_count[article['sentiment']] += 1
+        for topic, occurrences in Counter(article['topics']).items():
+            self.topic_articles.setdefault(topic, {})[seq] = occurrences
+            self.topic_occurrences[topic] += occurrences
+            self.sentiment_topics[article['sentiment']][topic] += occurrences
+    
+    def remove(self, article=None, key=None):
+        """
+        Remove an article.
         
-        # Create coverage differences comparisons
-        coverage_differences = []
+        Args:
+            article (dict): Article to remove, matched by its URL
+            key: Identity the article was added under, instead of its URL
+        """
+        key = article['url'] if key is None else key
+        seq, stored = self.articles.pop(key)
+        del self._by_seq[seq]
+        self._unapply(seq, stored)
+    
+    def _unapply(self, seq, article):
+        self.sentiment_count[article['sentiment']] -= 1
+        for topic, occurrences in Counter(article['topics']).items():
+            del self.topic_articles[topic][seq]
+            if not self.topic_articles[topic]:
+                del self.topic_articles[topic]
+            self.topic_occurrences[topic] -= occurrences
+            if self.topic_occurrences[topic] <= 0:
+                del self.topic_occurrences[topic]
+            sentiment_topics = self.sentiment_topics[article['sentiment']]
+            sentiment_topics[topic] -= occurrences
+            if sentiment_topics[topic] <= 0:
+                del sentiment_topics[topic]
+    
+    def _first_mention(self, topic):
+        seq = min(self.topic_articles[topic])
+        return seq, self._by_seq[seq]['topics'].index(topic)
+    
+    def result(self):
+        """
+        Build the comparative analysis for the current articles.
         
-        # Compare articles with different sentiments
-        positive_articles = [a for a in articles if a['sentiment'] == 'Positive']
-        negative_articles = [a for a in articles if a['sentiment'] == 'Negative']
-        neutral_articles = [a for a in articles if a['sentiment'] == 'Neutral']
+        Returns:
+            dict: Same structure as ComparativeAnalyzer.perform_comparative_analysis
+        """
+        sentiment_count = dict(self.sentiment_count)
+        coverage_differences = []
         
         # Compare positive vs negative articles
-        if positive_articles and negative_articles:
-            positive_topics = set(sum([a['topics'] for a in positive_articles], []))
-            negative_topics = set(sum([a['topics'] for a in negative_articles], []))
+        if sentiment_count['Positive'] and sentiment_count['Negative']:
+            positive_topics = set(self.sentiment_topics['Positive'])
+            negative_topics = set(self.sentiment_topics['Negative'])
             
             coverage_differences.append({
                 'comparison': f"Positive articles focus on {', '.join(positive_topics)}, while negative articles discuss {', '.join(negative_topics)}.",
                 'impact': "The contrast in coverage highlights the company's areas of strength and challenges."
             })
         
-        # Analyze topic overlap
-        all_topics = [topic for article in articles for topic in article['topics']]
-        topic_counter = Counter(all_topics)
-        common_topics = [topic for topic, count in topic_counter.items() if count > 1]
-        unique_topics = [topic for topic, count in topic_counter.items() if count == 1]
+        # Topics in order of first mention: by article, then by position within the article
+        ordered_topics = sorted(self.topic_occurrences, key=self._first_mention)
+        common_topics = [topic for topic in ordered_topics if self.topic_occurrences[topic] > 1]
+        unique_topics = [topic for topic in ordered_topics if self.topic_occurrences[topic] == 1]
         
-        # For each article, find unique topics
+        # For each article, find topics no other article mentions
         article_unique_topics = {}
-        for i, article in enumerate(articles):
+        for i, (_, article) in enumerate(sorted(self._by_seq.items())):
             article_unique_topics[f"Article {i+1}"] = [
-                topic for topic in article['topics'] 
-                if sum(1 for a in articles if topic in a['topics']) == 1
+                topic for topic in article['topics']
+                if len(self.topic_articles[topic]) == 1
             ]
         
         # Overall sentiment analysis
         dominant_sentiment = max(sentiment_count, key=sentiment_count.get)
-        total_articles = len(articles)
-        sentiment_percentage = (sentiment_count[dominant_sentiment] / total_articles) * 100
+        total_articles = len(self.articles)
+        sentiment_percentage = (sentiment_count[dominant_sentiment] / total_articles) * 100 if total_articles else 0.0
         
         if dominant_sentiment == 'Positive':
             final_sentiment = f"Overall sentiment is positive ({sentiment_percentage:.1f}% of articles), suggesting favorable news coverage."
@@ -411,16 +934,34 @@ class ComparativeAnalyzer:
         }
         
         return result
+
+
+class ComparativeAnalyzer:
+    """Class for performing comparative analysis across articles."""
+    
+    def perform_comparative_analysis(self, articles):
+        """
+        Perform comparative analysis across multiple articles.
+        
+        Args:
+            articles (list): List of article dictionaries with sentiment analysis
+            
+        Returns:
+            dict: Comparative analysis results
+        """
+        aggregate = ComparativeAggregate()
+        for i, article in enumerate(articles):
+            aggregate.add(article, key=i)
+        return aggregate.result()
 import os
-from googletrans import Translator
-from gtts import gTTS
+import uuid
 import nltk
 
 class TextToSpeechConverter:
     """Class for converting text to speech in Hindi and generating summaries."""
     
     def __init__(self):
-        self.translator = Translator()
+        self._translator = None
         try:
             from gtts import gTTS
             self.tts_engine = gTTS
@@ -429,6 +970,13 @@ class TextToSpeechConverter:
             print("Warning: gTTS not available. Install it using 'pip install gtts'.")
             self.tts_available = False
     
+    @property
+    def translator(self):
+        """Google Translate client, created on first use."""
+        if self._translator is None:
+            self._translator = googletrans.Translator()
+        return self._translator
+    
     def translate_to_hindi(self, text):
         """
         Translate text to Hindi.
@@ -460,21 +1008,109 @@ class TextToSpeechConverter:
         hindi_text = self.translate_to_hindi(text)
         
         if self.tts_available:
+            tmp_file = None
             try:
                 # Ensure the directory exists
-                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
                 
-                # Generate and save the audio file
+                # Generate into a temporary file and rename it into place, so
+                # readers never see a half-written mp3
+                tmp_file = f"{output_file}.{uuid.uuid4().hex}.tmp"
                 tts = self.tts_engine(text=hindi_text, lang='hi')
-                tts.save(output_file)
+                tts.save(tmp_file)
+                os.replace(tmp_file, output_file)
                 return output_file
             except Exception as e:
                 print(f"Error generating speech: {e}")
+                if tmp_file and os.path.exists(tmp_file):
+                    os.remove(tmp_file)
                 return None
         else:
             print("TTS engine not available. Would generate speech here.")
             return output_file
     
+    def stream_speech(self, text, max_segment_chars=300, prefetch=2):
+        """
+        Translate and synthesize text segment by segment, yielding MP3 data as each segment is ready.
+        
+        The first segment is a single sentence so playback can start quickly;
+        later ones group sentences up to max_segment_chars. A background
+        thread works up to prefetch segments ahead of the consumer, so the
+        next segment is usually ready before the current one has played.
+        MP3 frames are self-contained, so the segments concatenate into one
+        playable stream.
+        
+        Args:
+            text (str): English text to speak in Hindi
+            max_segment_chars (int): Longest run of sentences translated and synthesized together
+            prefetch (int): Segments synthesized ahead of the consumer
+            
+        Yields:
+            bytes: MP3 data of one segment
+            
+        Raises:
+            Exception: Whatever translation or synthesis of a segment raised, after the segments before it
+        """
+        if not self.tts_available:
+            print("TTS engine not available. Would stream speech here.")
+            return
+        
+        segments = self._speech_segments(text, max_segment_chars)
+        ready = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        
+        def synthesize():
+            try:
+                for segment in segments:
+                    if stop.is_set():
+                        return
+                    ready.put(self._synthesize(self.translate_to_hindi(segment)))
+            except Exception as e:
+                # Hand the error to the consumer, so a truncated stream isn't taken for a complete one
+                print(f"Error streaming speech: {e}")
+                ready.put(e)
+            finally:
+                ready.put(None)
+        
+        worker = threading.Thread(target=synthesize, name='speech-stream', daemon=True)
+        worker.start()
+        try:
+            while True:
+                data = ready.get()
+                if data is None:
+                    break
+                if isinstance(data, Exception):
+                    raise data
+                yield data
+        finally:
+            # The consumer may stop early (e.g. the client disconnected); let the worker finish its segment and exit
+            stop.set()
+            while worker.is_alive():
+                try:
+                    ready.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+    
+    def _speech_segments(self, text, max_chars):
+        """Split text into sentence groups of at most max_chars, the first holding one sentence."""
+        segments = []
+        current = ''
+        for sentence in nltk.sent_tokenize(text):
+            if current and (len(segments) == 0 or len(current) + len(sentence) + 1 > max_chars):
+                segments.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}".strip()
+        if current:
+            segments.append(current)
+        return segments
+    
+    def _synthesize(self, hindi_text):
+        """Synthesize Hindi text to MP3 data in memory."""
+        buffer = io.BytesIO()
+        self.tts_engine(text=hindi_text, lang='hi').write_to_fp(buffer)
+        return buffer.getvalue()
+    
     def create_hindi_summary(self, company_name, articles):
         """
         Create a natural-sounding Hindi summary of all articles.
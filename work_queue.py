@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+
+class WorkQueue(ABC):
+    """
+    Interface of the shared task queue used in distributed mode.
+
+    A job is the set of per-article tasks of one /analyze request. Workers
+    claim tasks with a lease; a task whose lease runs out before it is
+    completed can be claimed again, so a worker that dies only delays its
+    task. Backends implement every method below.
+    """
+
+    @abstractmethod
+    def submit(self, job_id, position, payload):
+        """
+        Add a task to a job.
+
+        Args:
+            job_id (str): Identifier of the job
+            position (int): Position of the task within the job
+            payload (dict): JSON-serializable input of the task
+
+        Returns:
+            str: Task identifier
+        """
+
+    @abstractmethod
+    def claim(self, worker_id, lease_seconds=600, job_id=None):
+        """
+        Take the oldest available task.
+
+        Args:
+            worker_id (str): Identifier of the claiming worker
+            lease_seconds (float): Seconds the task is reserved for the worker
+            job_id (str): Only claim tasks of this job
+
+        Returns:
+            dict: Task with id, job_id, position, payload and attempts, or None if there is none
+        """
+
+    @abstractmethod
+    def complete(self, task_id, worker_id, result):
+        """Store the result of a claimed task. Returns False if the worker no longer holds the lease."""
+
+    @abstractmethod
+    def fail(self, task_id, worker_id, error, max_attempts=3):
+        """Record a failed attempt; the task becomes available again until max_attempts is reached."""
+
+    @abstractmethod
+    def finished(self, job_id):
+        """
+        Get the tasks of a job that are done or have failed for good.
+
+        Returns:
+            list: Tasks with id, position, status, result and error
+        """
+
+    @abstractmethod
+    def delete_job(self, job_id):
+        """Remove every task of a job, including ones that are pending or claimed."""
+
+    @abstractmethod
+    def close(self):
+        """Release the backend's connections."""
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker_id TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status_created ON tasks (status, created_at);
+CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job_id);
+"""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """Work queue backed by a SQLite database file, for a single host or tests."""
+
+    def __init__(self, path='data/work_queue.db', busy_timeout=30):
+        """
+        Args:
+            path (str): Path of the SQLite database file
+            busy_timeout (float): Seconds to wait for another process's write lock
+        """
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def submit(self, job_id, position, payload):
+        task_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO tasks (id, job_id, position, payload, created_at) VALUES (?, ?, ?, ?, ?)',
+                (task_id, job_id, position, json.dumps(payload), time.time()))
+        return task_id
+
+    def claim(self, worker_id, lease_seconds=600, job_id=None):
+        now = time.time()
+        query = ("SELECT id, job_id, position, payload, attempts FROM tasks "
+                 "WHERE (status = 'pending' OR (status = 'claimed' AND lease_until < ?))")
+        params = [now]
+        if job_id is not None:
+            query += ' AND job_id = ?'
+            params.append(job_id)
+        query += ' ORDER BY created_at LIMIT 1'
+
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers can't claim the same task
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(query, params).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE tasks SET status = 'claimed', worker_id = ?, lease_until = ?, attempts = attempts + 1 "
+                        "WHERE id = ?", (worker_id, now + lease_seconds, row[0]))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'job_id': row[1],
+            'position': row[2],
+            'payload': json.loads(row[3]),
+            'attempts': row[4] + 1
+        }
+
+    def complete(self, task_id, worker_id, result):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, lease_until = NULL "
+                "WHERE id = ? AND status = 'claimed' AND worker_id = ?",
+                (json.dumps(result), task_id, worker_id))
+        return cursor.rowcount == 1
+
+    def fail(self, task_id, worker_id, error, max_attempts=3):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, worker_id = NULL, lease_until = NULL "
+                "WHERE id = ? AND status = 'claimed' AND worker_id = ?",
+                (max_attempts, str(error), task_id, worker_id))
+        return cursor.rowcount == 1
+
+    def finished(self, job_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, position, status, result, error FROM tasks "
+                "WHERE job_id = ? AND status IN ('done', 'failed')", (job_id,)).fetchall()
+        return [
+            {
+                'id': task_id,
+                'position': position,
+                'status': status,
+                'result': json.loads(result) if result is not None else None,
+                'error': error
+            }
+            for task_id, position, status, result, error in rows
+        ]
+
+    def delete_job(self, job_id):
+        with self._lock:
+            self._conn.execute('DELETE FROM tasks WHERE job_id = ?', (job_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Backends by URL scheme; register another backend here to make it available to open_work_queue
+BACKENDS = {
+    'sqlite': SQLiteWorkQueue
+}
+
+
+def open_work_queue(url):
+    """
+    Open a work queue from a URL such as "sqlite:///data/work_queue.db".
+
+    Args:
+        url (str): Backend scheme, "://", then the backend-specific location
+
+    Returns:
+        WorkQueue: The opened queue
+
+    Raises:
+        ValueError: If the scheme has no registered backend
+    """
+    scheme, _, location = url.partition('://')
+    if scheme not in BACKENDS:
+        raise ValueError(f"Unknown work queue backend {scheme!r}, expected one of {', '.join(BACKENDS)}")
+    # sqlite:///relative/path and sqlite:////absolute/path, as in SQLAlchemy URLs
+    if scheme == 'sqlite' and location.startswith('/'):
+        location = location[1:]
+    return BACKENDS[scheme](location)
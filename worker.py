@@ -0,0 +1,85 @@
+"""
+Article analysis worker for distributed mode.
+
+Claims per-article tasks from the work queue the API submits to (set with
+WORK_QUEUE_URL), runs sentiment analysis, summarization and topic
+extraction on them, and stores the results back in the queue. Start as
+many workers as the hardware allows; a worker that dies mid-task only
+delays that task until its lease runs out.
+
+Usage:
+    python worker.py --queue sqlite:///data/work_queue.db
+    python worker.py --queue sqlite:///data/work_queue.db --lease 300 --max-attempts 5
+"""
+import os
+import time
+import socket
+import argparse
+
+from deadline import Deadline
+from work_queue import open_work_queue
+from inference_profile import DEFAULT_PATH as INFERENCE_PROFILE_PATH, load_profile, apply_profile
+
+
+def run_task(analyzer, payload):
+    """
+    Process one article task.
+
+    Args:
+        analyzer (SentimentAnalyzer): Analyzer with its models loaded
+        payload (dict): Task payload as submitted by the API
+
+    Returns:
+        dict: Processed article
+    """
+    # The API's deadline as a wall-clock time, so the time the task waited in the queue is already spent
+    deadline = None
+    if payload.get('deadline_at') is not None:
+        deadline = Deadline(max(0, int((payload['deadline_at'] - time.time()) * 1000)))
+    return analyzer.process_article(
+        payload['article'], payload['company_name'],
+        sentiment_mode=payload['sentiment_mode'], aliases=payload.get('aliases'),
+        translate=payload['translate'], extractive=payload['extractive'], deadline=deadline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Process article analysis tasks from the work queue')
+    parser.add_argument('--queue', default=os.environ.get('WORK_QUEUE_URL', 'sqlite:///data/work_queue.db'),
+                        help='Work queue URL, defaults to WORK_QUEUE_URL')
+    parser.add_argument('--lease', type=float, default=600, help='Seconds a claimed task is reserved for')
+    parser.add_argument('--max-attempts', type=int, default=3, help='Attempts before a task is failed for good')
+    parser.add_argument('--idle-sleep', type=float, default=0.2, help='Seconds to wait when the queue is empty')
+    args = parser.parse_args()
+
+    from utils import SentimentAnalyzer
+
+    work_queue = open_work_queue(args.queue)
+    analyzer = SentimentAnalyzer()
+    apply_profile(load_profile(os.environ.get('INFERENCE_PROFILE', INFERENCE_PROFILE_PATH)), analyzer)
+    analyzer.load_models()
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Worker {worker_id} processing tasks from {args.queue}")
+
+    try:
+        while True:
+            task = work_queue.claim(worker_id, lease_seconds=args.lease)
+            if task is None:
+                time.sleep(args.idle_sleep)
+                continue
+            try:
+                result = run_task(analyzer, task['payload'])
+            except Exception as e:
+                print(f"Error processing task {task['id']} (attempt {task['attempts']}): {e}")
+                work_queue.fail(task['id'], worker_id, e, max_attempts=args.max_attempts)
+                continue
+            if not work_queue.complete(task['id'], worker_id, result):
+                # The lease ran out and the task was claimed elsewhere, or its job was dropped
+                print(f"Discarding result of task {task['id']}, no longer held by this worker")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        work_queue.close()
+
+
+if __name__ == '__main__':
+    main()